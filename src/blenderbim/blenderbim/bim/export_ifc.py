@@ -21,8 +21,6 @@ import bpy
 import json
 import numpy as np
 import datetime
-import zipfile
-import tempfile
 import addon_utils
 import ifcopenshell
 import ifcopenshell.api
@@ -49,15 +47,7 @@ class IfcExporter:
             self.sync_edited_objects()
         extension = self.ifc_export_settings.output_file.split(".")[-1].lower()
         if extension == "ifczip":
-            with tempfile.TemporaryDirectory() as unzipped_path:
-                filename, ext = os.path.splitext(os.path.basename(self.ifc_export_settings.output_file))
-                tmp_filename = f"{filename}.ifc"
-                tmp_file = os.path.join(unzipped_path, tmp_filename)
-                self.file.write(tmp_file)
-                with zipfile.ZipFile(
-                    self.ifc_export_settings.output_file, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=9
-                ) as zf:
-                    zf.write(tmp_file, arcname=tmp_filename)
+            self.file.write(self.ifc_export_settings.output_file, format=".ifcZIP")
         elif extension == "ifc":
             self.file.write(self.ifc_export_settings.output_file)
         elif extension == "ifcjson":
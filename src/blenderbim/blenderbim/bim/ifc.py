@@ -20,12 +20,9 @@ import os
 import bpy
 import uuid
 import hashlib
-import zipfile
-import tempfile
 import ifcopenshell
 import blenderbim.bim.handler
 import blenderbim.tool as tool
-from pathlib import Path
 
 
 class IfcStore:
@@ -122,12 +119,7 @@ class IfcStore:
     def load_file(path):
         extension = path.split(".")[-1]
         if extension.lower() == "ifczip":
-            with tempfile.TemporaryDirectory() as unzipped_path:
-                with zipfile.ZipFile(path, "r") as zip_ref:
-                    zip_ref.extractall(unzipped_path)
-                for filename in Path(unzipped_path).glob("**/*.ifc"):
-                    IfcStore.file = ifcopenshell.open(filename)
-                    return
+            IfcStore.file = ifcopenshell.open(path, format=".ifcZIP")
         elif extension.lower() == "ifcxml":
             IfcStore.file = ifcopenshell.file(ifcopenshell.ifcopenshell_wrapper.parse_ifcxml(path))
         elif extension.lower() == "ifc":
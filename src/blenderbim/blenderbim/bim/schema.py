@@ -57,13 +57,10 @@ class IfcSchema:
     def load_pset_templates(self):
         property_paths = self.data_dir.joinpath("pset").glob("*.ifc")
         self.psetqto = ifcopenshell.util.pset.get_template(self.schema_name)
-        # Keep only the first template, which is the official buildingSMART one
-        self.psetqto.templates = self.psetqto.templates[0:1]
-        self.psetqto.get_applicable.cache_clear()
-        self.psetqto.get_applicable_names.cache_clear()
-        self.psetqto.get_by_name.cache_clear()
+        # Keep only the official buildingSMART templates, which are loaded lazily
+        self.psetqto.reset_templates()
         for path in property_paths:
-            self.psetqto.templates.append(ifcopenshell.open(path))
+            self.psetqto.add_template(ifcopenshell.open(path))
 
     def load(self):
         # TODO: need to update for ifc4x3?
@@ -29,10 +29,17 @@ parser.add_argument("input", type=str, help="A JSON dataset describing a series
 parser.add_argument(
     "-o", "--output", type=str, help="The JSON diff file to output. Defaults to output.json", default="output.json"
 )
+parser.add_argument(
+    "-c",
+    "--cache",
+    type=str,
+    help="A SQLite file to store geometry and results in, so that unchanged elements are not clashed again",
+)
 args = parser.parse_args()
 
 settings = ClashSettings()
 settings.output = args.output
+settings.cache = args.cache
 settings.logger = logging.getLogger("Clash")
 settings.logger.setLevel(logging.DEBUG)
 handler = logging.StreamHandler(sys.stdout)
@@ -16,24 +16,38 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcClash.  If not, see <http://www.gnu.org/licenses/>.
 
+import time
 import hppfcl
 import numpy as np
+import multiprocessing
+import concurrent.futures
 import ifcopenshell
 
+worker_collider = None
+
+
+def collide_pairs(name1, name2, potential_collisions):
+    # Forked workers inherit the collider (and its BVHs) from the parent process
+    return worker_collider.collide_pairs(name1, name2, potential_collisions)
+
 
 class Collider:
-    def __init__(self, logger):
+    def __init__(self, logger, workers=None, use_processes=None):
         self.logger = logger
         self.groups = {}
+        self.bvhs = {}
         self.tree = ifcopenshell.geom.tree()
+        self.workers = workers or multiprocessing.cpu_count()
+        if use_processes is None:
+            # hppfcl holds the GIL, so only forked processes truly run pairs concurrently
+            use_processes = "fork" in multiprocessing.get_all_start_methods()
+        self.use_processes = use_processes
 
     def create_group(self, name):
         self.logger.info(f"Creating group {name}")
-        self.groups[name] = {"elements": {}, "objects": {}}
+        self.groups[name] = {"elements": {}, "objects": {}, "boxes": {}}
 
     def create_objects(self, name, ifc_file, iterator, elements):
-        import time
-
         start = time.time()
         self.logger.info(f"Adding objects {name}")
         assert iterator.initialize()
@@ -51,10 +65,26 @@ class Collider:
 
     def create_object(self, group_name, id, shape):
         obj = hppfcl.CollisionObject(
-            self.create_bvh(shape.geometry), self.create_transform(shape.transformation.matrix.data)
+            self.get_bvh(shape.geometry), self.create_transform(shape.transformation.matrix.data)
         )
         self.groups[group_name]["objects"][id] = obj
 
+    def create_object_from_arrays(self, group_name, id, mesh_id, verts, faces, matrix):
+        bvh = self.bvhs.get(mesh_id, None)
+        if bvh is None:
+            bvh = self.bvhs[mesh_id] = self.create_bvh_from_arrays(verts.reshape(-1, 3), faces.reshape(-1, 3))
+        self.groups[group_name]["objects"][id] = hppfcl.CollisionObject(bvh, self.create_transform(matrix))
+        mat = np.asarray(matrix, dtype=np.float64).reshape(4, 3).T
+        world_verts = verts.reshape(-1, 3) @ mat[:, :3].T + mat[:, 3]
+        self.groups[group_name]["boxes"][id] = (world_verts.min(axis=0), world_verts.max(axis=0))
+
+    def get_bvh(self, mesh):
+        # Mapped and type instanced geometry shares a representation, so its BVH is only built once
+        bvh = self.bvhs.get(mesh.id, None)
+        if bvh is None:
+            bvh = self.bvhs[mesh.id] = self.create_bvh(mesh)
+        return bvh
+
     def collide_internal(self, name):
         return self.collide_narrowphase(name, name, self.collide_broadphase(name, name))
 
@@ -62,8 +92,6 @@ class Collider:
         return self.collide_narrowphase(name1, name2, self.collide_broadphase(name1, name2))
 
     def collide_broadphase(self, name1, name2):
-        import time
-
         start = time.time()
         self.logger.info("Starting broadphase")
         potential_collisions = []
@@ -80,23 +108,81 @@ class Collider:
         self.logger.info(f"Finished broadphase {time.time() - start}")
         return potential_collisions
 
+    def collide_broadphase_boxes(self, name1, name2):
+        """Finds potential collisions from the boxes of objects created from arrays
+
+        This is equivalent to :meth:`collide_broadphase`, but does not need
+        the geometry tree to be populated by an iterator. Boxes are swept
+        along the X axis.
+        """
+        start = time.time()
+        self.logger.info("Starting broadphase")
+        potential_collisions = []
+        boxes1 = self.groups[name1]["boxes"]
+        boxes2 = self.groups[name2]["boxes"]
+        if not boxes1 or not boxes2:
+            return potential_collisions
+        ids2 = np.array(list(boxes2.keys()), dtype=object)
+        mins2 = np.array([b[0] for b in boxes2.values()])
+        maxs2 = np.array([b[1] for b in boxes2.values()])
+        order = np.argsort(mins2[:, 0])
+        ids2, mins2, maxs2 = ids2[order], mins2[order], maxs2[order]
+        max_size = (maxs2[:, 0] - mins2[:, 0]).max()
+        checked_collisions = set()
+        for id, (box_min, box_max) in boxes1.items():
+            checked_collisions.add(id)
+            first = np.searchsorted(mins2[:, 0], box_min[0] - max_size, side="left")
+            last = np.searchsorted(mins2[:, 0], box_max[0], side="right")
+            is_overlapping = np.all(mins2[first:last] <= box_max, axis=1) & np.all(maxs2[first:last] >= box_min, axis=1)
+            potential_collisions.extend(
+                {"id1": id, "id2": id2} for id2 in ids2[first:last][is_overlapping] if id2 not in checked_collisions
+            )
+        self.logger.info(f"Finished broadphase {time.time() - start}")
+        return potential_collisions
+
     def collide_narrowphase(self, name1, name2, potential_collisions):
-        import time
+        global worker_collider
 
         start = time.time()
         self.logger.info("Starting narrowphase")
+        chunk_size = max(1, -(-len(potential_collisions) // (self.workers * 4)))
+        chunks = [potential_collisions[i : i + chunk_size] for i in range(0, len(potential_collisions), chunk_size)]
+        if self.workers < 2 or len(chunks) < 2:
+            collisions = self.collide_pairs(name1, name2, potential_collisions)
+        elif self.use_processes:
+            worker_collider = self
+            try:
+                context = multiprocessing.get_context("fork")
+                with concurrent.futures.ProcessPoolExecutor(self.workers, mp_context=context) as executor:
+                    futures = [executor.submit(collide_pairs, name1, name2, chunk) for chunk in chunks]
+                    collisions = [c for future in futures for c in future.result()]
+            finally:
+                worker_collider = None
+        else:
+            with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+                futures = [executor.submit(self.collide_pairs, name1, name2, chunk) for chunk in chunks]
+                collisions = [c for future in futures for c in future.result()]
+        self.logger.info(f"Finished narrowphase {time.time() - start}")
+        return collisions
+
+    def collide_pairs(self, name1, name2, potential_collisions):
         collisions = []
+        objects1 = self.groups[name1]["objects"]
+        objects2 = self.groups[name2]["objects"]
         for data in potential_collisions:
             result = hppfcl.CollisionResult()
-            hppfcl.collide(
-                self.groups[name1]["objects"][data["id1"]],
-                self.groups[name2]["objects"][data["id2"]],
-                hppfcl.CollisionRequest(),
-                result,
-            )
+            hppfcl.collide(objects1[data["id1"]], objects2[data["id2"]], hppfcl.CollisionRequest(), result)
             if result.isCollision():
-                collisions.append({"id1": data["id1"], "id2": data["id2"], "collision": result})
-        self.logger.info(f"Finished narrowphase {time.time() - start}")
+                contact = result.getContacts()[0]
+                collisions.append(
+                    {
+                        "id1": data["id1"],
+                        "id2": data["id2"],
+                        "normal": list(contact.normal),
+                        "position": list(contact.pos),
+                        "penetration_depth": contact.penetration_depth,
+                    }
+                )
         return collisions
 
     def create_transform(self, m):
@@ -104,18 +190,17 @@ class Collider:
         mat.transpose()
         return hppfcl.Transform3f(mat[:3, :3], mat[:3, 3])
 
+    def get_arrays(self, mesh):
+        return np.array(mesh.verts, dtype=np.float64), np.array(mesh.faces, dtype=np.int32)
+
     def create_bvh(self, mesh):
-        v = mesh.verts
-        f = mesh.faces
-        mesh_verts = np.array([[v[i], v[i + 1], v[i + 2]] for i in range(0, len(v), 3)])
-        mesh_faces = [(int(f[i]), int(f[i + 1]), int(f[i + 2])) for i in range(0, len(f), 3)]
+        mesh_verts, mesh_faces = self.get_arrays(mesh)
+        return self.create_bvh_from_arrays(mesh_verts.reshape(-1, 3), mesh_faces.reshape(-1, 3))
 
+    def create_bvh_from_arrays(self, mesh_verts, mesh_faces):
         bvh = hppfcl.BVHModelOBB()
         bvh.beginModel(len(mesh_faces), len(mesh_verts))
-        vertices = hppfcl.StdVec_Vec3f()
-        [vertices.append(v) for v in mesh_verts]
-        triangles = hppfcl.StdVec_Triangle()
-        [triangles.append(hppfcl.Triangle(f[0], f[1], f[2])) for f in mesh_faces]
-        bvh.addSubModel(vertices, triangles)
+        bvh.addVertices(mesh_verts)
+        bvh.addTriangles(mesh_faces.astype(np.int64))
         bvh.endModel()
         return bvh
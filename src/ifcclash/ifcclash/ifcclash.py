@@ -26,7 +26,9 @@ import multiprocessing
 import ifcopenshell
 import ifcopenshell.geom
 import ifcopenshell.util.selector
+import ifcopenshell.util.fingerprint
 from . import collider
+from . import store
 
 
 class Clasher:
@@ -37,24 +39,43 @@ class Clasher:
         self.collider = collider.Collider(self.settings.logger)
         self.selector = ifcopenshell.util.selector.Selector()
         self.ifcs = {}
+        self.store = None
+        self.fingerprints = {}
 
     def clash(self):
         existing_limit = sys.getrecursionlimit()
-        for clash_set in self.clash_sets:
-            self.process_clash_set(clash_set)
+        if self.settings.cache:
+            self.store = store.ClashStore(self.settings.cache)
+        try:
+            for clash_set in self.clash_sets:
+                self.process_clash_set(clash_set)
+        finally:
+            if self.store:
+                self.store.close()
+                self.store = None
 
     def process_clash_set(self, clash_set):
         self.collider.create_group("a")
+        self.fingerprints = {"a": {}, "b": {}}
         for source in clash_set["a"]:
             source["ifc"] = self.load_ifc(source["file"])
-            self.add_collision_objects("a", source["ifc"], source.get("mode", None), source.get("selector", None))
+            self.add_collision_objects(
+                "a", source["ifc"], source.get("mode", None), source.get("selector", None), path=source["file"]
+            )
 
         if "b" in clash_set:
             self.collider.create_group("b")
             for source in clash_set["b"]:
                 source["ifc"] = self.load_ifc(source["file"])
-                self.add_collision_objects("b", source["ifc"], source.get("mode", None), source.get("selector", None))
-            results = self.collider.collide_group("a", "b")
+                self.add_collision_objects(
+                    "b", source["ifc"], source.get("mode", None), source.get("selector", None), path=source["file"]
+                )
+            if self.store:
+                results = self.collide_incrementally(clash_set.get("name", ""), "a", "b")
+            else:
+                results = self.collider.collide_group("a", "b")
+        elif self.store:
+            results = self.collide_incrementally(clash_set.get("name", ""), "a", "a")
         else:
             results = self.collider.collide_internal("a")
 
@@ -66,7 +87,6 @@ class Clasher:
             else:
                 element2 = self.get_element(clash_set["a"], result["id2"])
 
-            contact = result["collision"].getContacts()[0]
             processed_results[f"{result['id1']}-{result['id2']}"] = {
                 "a_global_id": result["id1"],
                 "b_global_id": result["id2"],
@@ -74,9 +94,9 @@ class Clasher:
                 "b_ifc_class": element2.is_a(),
                 "a_name": element1.Name,
                 "b_name": element2.Name,
-                "normal": list(contact.normal),
-                "position": list(contact.pos),
-                "penetration_depth": contact.penetration_depth,
+                "normal": result["normal"],
+                "position": result["position"],
+                "penetration_depth": result["penetration_depth"],
             }
         clash_set["clashes"] = processed_results
 
@@ -92,23 +112,109 @@ class Clasher:
         self.settings.logger.info(f"Loading finished {time.time() - start}")
         return ifc
 
-    def add_collision_objects(self, name, ifc_file, mode=None, selector=None):
+    def add_collision_objects(self, name, ifc_file, mode=None, selector=None, path=None):
         import time
 
         start = time.time()
-        self.settings.logger.info("Creating iterator")
         if not mode:
             elements = ifc_file.by_type("IfcElement")
         elif mode == "e":
             elements = set(ifc_file.by_type("IfcElement")) - set(self.selector.parse(ifc_file, selector))
         elif mode == "i":
             elements = self.selector.parse(ifc_file, selector)
+        if self.store:
+            return self.add_stored_collision_objects(name, ifc_file, elements, path)
+        self.settings.logger.info("Creating iterator")
         iterator = ifcopenshell.geom.iterator(
             self.geom_settings, ifc_file, multiprocessing.cpu_count(), include=elements
         )
         self.settings.logger.info(f"Iterator creation finished {time.time() - start}")
         self.collider.create_objects(name, ifc_file, iterator, elements)
 
+    def add_stored_collision_objects(self, name, ifc_file, elements, path):
+        import time
+
+        start = time.time()
+        hasher = ifcopenshell.util.fingerprint.Hasher()
+        meshes = {}
+        fingerprints = {}
+        for element in elements:
+            meshes[element.GlobalId], fingerprints[element.GlobalId] = self.get_fingerprint(hasher, element)
+        self.fingerprints[name].update(fingerprints)
+        stored_elements = self.store.get_elements(path, fingerprints)
+        for global_id, (mesh, matrix) in list(stored_elements.items()):
+            if mesh is None:
+                continue
+            arrays = self.store.get_mesh(mesh)
+            if arrays is None:
+                del stored_elements[global_id]
+                continue
+            self.collider.create_object_from_arrays(name, global_id, mesh, *arrays, matrix)
+        changed_elements = [e for e in elements if e.GlobalId not in stored_elements]
+        self.settings.logger.info(
+            f"Fingerprinting finished {time.time() - start}, {len(changed_elements)} of {len(elements)} changed"
+        )
+
+        new_elements = {e.GlobalId: (fingerprints[e.GlobalId], None, None) for e in changed_elements}
+        if changed_elements:
+            iterator = ifcopenshell.geom.iterator(
+                self.geom_settings, ifc_file, multiprocessing.cpu_count(), include=changed_elements
+            )
+            # Elements may have no geometry at all, such as after non-geometric edits
+            if iterator.initialize():
+                while True:
+                    shape = iterator.get()
+                    mesh = meshes[shape.guid]
+                    verts, faces = self.collider.get_arrays(shape.geometry)
+                    matrix = np.array(shape.transformation.matrix.data, dtype=np.float64)
+                    if mesh not in self.collider.bvhs:
+                        self.store.save_mesh(mesh, verts, faces)
+                    self.collider.create_object_from_arrays(name, shape.guid, mesh, verts, faces, matrix)
+                    new_elements[shape.guid] = (fingerprints[shape.guid], mesh, matrix)
+                    if not iterator.next():
+                        break
+            self.store.save_elements(path, [(k,) + v for k, v in new_elements.items()])
+        self.collider.groups[name]["elements"].update({e.GlobalId: e for e in elements})
+        self.settings.logger.info(f"Stored objects finished {time.time() - start}")
+
+    def get_fingerprint(self, hasher, element):
+        # The mesh is in local coordinates, so it depends on the representation and any openings
+        mesh = hasher.combine(
+            hasher.get_digest(element.Representation),
+            *sorted(
+                hasher.combine(
+                    hasher.get_digest(rel.RelatedOpeningElement.ObjectPlacement),
+                    hasher.get_digest(rel.RelatedOpeningElement.Representation),
+                )
+                for rel in getattr(element, "HasOpenings", [])
+            ),
+        )
+        return mesh, hasher.combine(mesh, hasher.get_digest(element.ObjectPlacement))
+
+    def collide_incrementally(self, clash_set, name1, name2):
+        fingerprints1 = self.fingerprints[name1]
+        fingerprints2 = self.fingerprints[name2]
+        potential_collisions = self.collider.collide_broadphase_boxes(name1, name2)
+        if name1 == name2:
+            # Pairs within a group are found in dictionary order, which is not stable between runs
+            potential_collisions = [
+                {"id1": min(d["id1"], d["id2"]), "id2": max(d["id1"], d["id2"])} for d in potential_collisions
+            ]
+        stored_results = self.store.get_results(clash_set, fingerprints1, fingerprints2)
+        results = []
+        untested_collisions = []
+        for data in potential_collisions:
+            key = (data["id1"], data["id2"])
+            if key in stored_results:
+                if stored_results[key]:
+                    results.append(stored_results[key])
+            else:
+                untested_collisions.append(data)
+        self.settings.logger.info(f"Reusing {len(potential_collisions) - len(untested_collisions)} stored results")
+        collisions = self.collider.collide_narrowphase(name1, name2, untested_collisions)
+        self.store.save_results(clash_set, fingerprints1, fingerprints2, untested_collisions, collisions)
+        return results + collisions
+
     def export(self):
         if len(self.settings.output) > 4 and self.settings.output[-4:] == ".bcf":
             return self.export_bcfxml()
@@ -245,3 +351,4 @@ class ClashSettings:
     def __init__(self):
         self.logger = None
         self.output = "clashes.json"
+        self.cache = None
@@ -0,0 +1,132 @@
+# IfcClash - IFC-based clash detection.
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcClash.
+#
+# IfcClash is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcClash is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcClash.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import sqlite3
+import numpy as np
+
+
+class ClashStore:
+    """A persistent SQLite store of tessellated elements and clash results
+
+    Elements are stored against a fingerprint of their placement and geometry.
+    As long as the fingerprint of an element does not change between runs, its
+    tessellation is reused, and so are the results of any pair of elements
+    which both have unchanged fingerprints.
+    """
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS elements (
+                source TEXT, global_id TEXT, fingerprint TEXT, mesh TEXT, matrix BLOB,
+                PRIMARY KEY (source, global_id)
+            );
+            CREATE TABLE IF NOT EXISTS meshes (mesh TEXT PRIMARY KEY, verts BLOB, faces BLOB);
+            CREATE TABLE IF NOT EXISTS results (
+                clash_set TEXT, id1 TEXT, id2 TEXT, fingerprint1 TEXT, fingerprint2 TEXT, is_collision INTEGER,
+                normal TEXT, position TEXT, penetration_depth REAL,
+                PRIMARY KEY (clash_set, id1, id2)
+            );
+            """
+        )
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def get_elements(self, source, fingerprints):
+        """Gets stored elements which have not changed
+
+        :param source: The path of the IFC file the elements come from
+        :param fingerprints: A dictionary of GlobalIds to current fingerprints
+        :return: A dictionary of GlobalIds to ``(mesh, matrix)``, where mesh
+            is None for elements without geometry
+        """
+        results = {}
+        for global_id, fingerprint, mesh, matrix in self.db.execute(
+            "SELECT global_id, fingerprint, mesh, matrix FROM elements WHERE source = ?", (source,)
+        ):
+            if fingerprints.get(global_id, None) == fingerprint:
+                results[global_id] = (mesh, None if matrix is None else np.frombuffer(matrix, dtype=np.float64))
+        return results
+
+    def save_elements(self, source, elements):
+        """Saves elements, given as tuples of ``(global_id, fingerprint, mesh, matrix)``"""
+        self.db.executemany(
+            "INSERT OR REPLACE INTO elements VALUES (?, ?, ?, ?, ?)",
+            [
+                (source, global_id, fingerprint, mesh, None if matrix is None else np.asarray(matrix, "f8").tobytes())
+                for global_id, fingerprint, mesh, matrix in elements
+            ],
+        )
+
+    def get_mesh(self, mesh):
+        row = self.db.execute("SELECT verts, faces FROM meshes WHERE mesh = ?", (mesh,)).fetchone()
+        if row:
+            return np.frombuffer(row[0], dtype=np.float64), np.frombuffer(row[1], dtype=np.int32)
+
+    def save_mesh(self, mesh, verts, faces):
+        self.db.execute(
+            "INSERT OR REPLACE INTO meshes VALUES (?, ?, ?)",
+            (mesh, np.asarray(verts, "f8").tobytes(), np.asarray(faces, "i4").tobytes()),
+        )
+
+    def get_results(self, clash_set, fingerprints1, fingerprints2):
+        """Gets stored pair results where both elements have not changed
+
+        :param clash_set: The name of the clash set
+        :param fingerprints1: A dictionary of GlobalIds to current fingerprints
+            for the first group
+        :param fingerprints2: A dictionary of GlobalIds to current fingerprints
+            for the second group
+        :return: A dictionary of ``(id1, id2)`` to a collision dictionary, or
+            None if the pair was tested and does not collide
+        """
+        results = {}
+        for row in self.db.execute("SELECT * FROM results WHERE clash_set = ?", (clash_set,)):
+            _, id1, id2, fingerprint1, fingerprint2, is_collision, normal, position, penetration_depth = row
+            if fingerprints1.get(id1, None) != fingerprint1 or fingerprints2.get(id2, None) != fingerprint2:
+                continue
+            results[(id1, id2)] = None
+            if is_collision:
+                results[(id1, id2)] = {
+                    "id1": id1,
+                    "id2": id2,
+                    "normal": json.loads(normal),
+                    "position": json.loads(position),
+                    "penetration_depth": penetration_depth,
+                }
+        return results
+
+    def save_results(self, clash_set, fingerprints1, fingerprints2, potential_collisions, collisions):
+        """Saves the results of testing pairs, including pairs which did not collide"""
+        collisions = {(c["id1"], c["id2"]): c for c in collisions}
+        rows = []
+        for data in potential_collisions:
+            id1, id2 = data["id1"], data["id2"]
+            collision = collisions.get((id1, id2), None)
+            row = (clash_set, id1, id2, fingerprints1[id1], fingerprints2[id2])
+            if collision:
+                normal, position = json.dumps(collision["normal"]), json.dumps(collision["position"])
+                rows.append(row + (1, normal, position, collision["penetration_depth"]))
+            else:
+                rows.append(row + (0, None, None, None))
+        self.db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.db.commit()
@@ -22,8 +22,10 @@
 
 import time
 import json
+import hashlib
 import logging
 import argparse
+import concurrent.futures
 import numpy as np
 import multiprocessing
 import ifcopenshell
@@ -32,9 +34,17 @@ import ifcopenshell.util.element
 import ifcopenshell.util.placement
 import ifcopenshell.util.classification
 import ifcopenshell.util.selector
+import ifcopenshell.util.fingerprint
 from deepdiff import DeepDiff
 
 
+worker_diff = None
+
+
+def get_digests(model, global_ids):
+    return worker_diff.get_digests(getattr(worker_diff, model), global_ids)
+
+
 class IfcDiff:
     """Main IfcDiff application
 
@@ -54,6 +64,10 @@ class IfcDiff:
     :param filter_elements: An IFC filter query if you only want to compare a
         subset of elements. For example: ``.IfcWall`` to only compare walls.
     :type filter_elements: string
+    :param workers: The number of processes used to hash elements. Elements
+        whose content hashes are identical in both models are not compared in
+        detail. Defaults to the number of CPUs.
+    :type workers: int
 
     Example::
 
@@ -65,7 +79,7 @@ class IfcDiff:
         ifc_diff.export()
     """
 
-    def __init__(self, old, new, relationships=None, is_shallow=True, filter_elements=None):
+    def __init__(self, old, new, relationships=None, is_shallow=True, filter_elements=None, workers=None):
         self.old = old
         self.new = new
         self.change_register = {}
@@ -74,6 +88,7 @@ class IfcDiff:
         self.precision = 1e-4
         self.is_shallow = is_shallow
         self.filter_elements = filter_elements
+        self.workers = workers or multiprocessing.cpu_count()
 
     def diff(self):
         logging.disable(logging.CRITICAL)
@@ -85,18 +100,8 @@ class IfcDiff:
             old_elements = set(e.GlobalId for e in selector.parse(self.old, self.filter_elements))
             new_elements = set(e.GlobalId for e in selector.parse(self.new, self.filter_elements))
         else:
-            old_elements = self.old.by_type("IfcElement")
-            if self.old.schema == "IFC2X3":
-                old_elements += self.old.by_type("IfcSpatialStructureElement")
-            else:
-                old_elements += self.old.by_type("IfcSpatialElement")
-            old_elements = set(e.GlobalId for e in old_elements if not e.is_a("IfcFeatureElement"))
-            new_elements = self.new.by_type("IfcElement")
-            if self.new.schema == "IFC2X3":
-                new_elements += self.new.by_type("IfcSpatialStructureElement")
-            else:
-                new_elements += self.new.by_type("IfcSpatialElement")
-            new_elements = set(e.GlobalId for e in new_elements if not e.is_a("IfcFeatureElement"))
+            old_elements = set(self.get_global_ids(self.old))
+            new_elements = set(self.get_global_ids(self.new))
 
         print(" - {} item(s) are in the old model".format(len(old_elements)))
         print(" - {} item(s) are in the new model".format(len(new_elements)))
@@ -110,6 +115,12 @@ class IfcDiff:
         print(" - {} item(s) were deleted".format(len(self.deleted_elements)))
         print(" - {} item(s) are common to both models".format(total_same_elements))
 
+        old_digests, new_digests = self.get_all_digests(same_elements)
+        same_elements = [g for g in same_elements if old_digests[g] != new_digests[g]]
+        total_same_elements = len(same_elements)
+
+        print(" - {} item(s) have different content hashes".format(total_same_elements))
+
         total_diffed = 0
 
         potential_old_changes = []
@@ -243,6 +254,107 @@ class IfcDiff:
                 indent=4,
             )
 
+    def get_global_ids(self, ifc):
+        spatial_class = "IfcSpatialStructureElement" if ifc.schema == "IFC2X3" else "IfcSpatialElement"
+        for ifc_class in ("IfcElement", spatial_class):
+            for element in ifc.iter_type(ifc_class):
+                if not element.is_a("IfcFeatureElement"):
+                    yield element.GlobalId
+
+    def get_all_digests(self, global_ids):
+        global worker_diff
+
+        global_ids = sorted(global_ids)
+        if self.workers < 2 or len(global_ids) < 2 or "fork" not in multiprocessing.get_all_start_methods():
+            return self.get_digests(self.old, global_ids), self.get_digests(self.new, global_ids)
+
+        # Each shard has its own hasher, so keep shards large to limit rehashing of shared subgraphs
+        size = -(-len(global_ids) // self.workers)
+        shards = [global_ids[i : i + size] for i in range(0, len(global_ids), size)]
+        worker_diff = self
+        try:
+            context = multiprocessing.get_context("fork")
+            with concurrent.futures.ProcessPoolExecutor(self.workers, mp_context=context) as executor:
+                old_futures = [executor.submit(get_digests, "old", shard) for shard in shards]
+                new_futures = [executor.submit(get_digests, "new", shard) for shard in shards]
+                old_digests = {k: v for future in old_futures for k, v in future.result().items()}
+                new_digests = {k: v for future in new_futures for k, v in future.result().items()}
+        finally:
+            worker_diff = None
+        return old_digests, new_digests
+
+    def get_digests(self, ifc, global_ids):
+        hasher = ifcopenshell.util.fingerprint.Hasher(ignored_classes=["IfcOwnerHistory"])
+        return {global_id: self.get_digest(hasher, ifc.by_id(global_id)) for global_id in global_ids}
+
+    def get_digest(self, hasher, element):
+        """Gets a content hash of everything about an element that is diffed
+
+        The hash only covers the relationships being checked, and step ids
+        are normalised away. Properties are hashed as the merged type and
+        occurrence property sets, just like the detailed comparison. Related
+        types, containers and aggregates are hashed by GlobalId, as that is how
+        they are matched between models. If the hash of an element is identical
+        in both models, the element is treated as unchanged and is not compared
+        in detail. Differing hashes may still turn out to be equal within the
+        tolerance of the detailed comparison.
+        """
+        h = hashlib.blake2b(element.is_a().encode("utf-8"), digest_size=ifcopenshell.util.fingerprint.DIGEST_SIZE)
+        for relationship in self.relationships:
+            if relationship == "attributes":
+                value = [a for a in element if not isinstance(a, (ifcopenshell.entity_instance, tuple))]
+            elif relationship == "geometry":
+                value = [
+                    hasher.get_digest(getattr(element, "ObjectPlacement", None)),
+                    hasher.get_digest(getattr(element, "Representation", None)),
+                    sorted(
+                        self.get_feature_digest(hasher, o.RelatedOpeningElement)
+                        for o in getattr(element, "HasOpenings", []) or []
+                    ),
+                    sorted(
+                        self.get_feature_digest(hasher, o.RelatedFeatureElement)
+                        for o in getattr(element, "HasProjections", []) or []
+                    ),
+                ]
+            elif relationship == "type":
+                element_type = ifcopenshell.util.element.get_type(element)
+                value = element_type.GlobalId if element_type else None
+            elif relationship == "property":
+                psets = ifcopenshell.util.element.get_psets(element)
+                value = sorted((name, self.get_pset_value(hasher, pset)) for name, pset in psets.items())
+            elif relationship == "container":
+                container = ifcopenshell.util.element.get_container(element)
+                value = container.GlobalId if container else None
+            elif relationship == "aggregate":
+                aggregate = ifcopenshell.util.element.get_aggregate(element)
+                value = aggregate.GlobalId if aggregate else None
+            elif relationship == "classification":
+                # Kept in order, as references are compared in order in detail
+                references = ifcopenshell.util.classification.get_references(element)
+                value = [hasher.get_digest(r) for r in references]
+            else:
+                continue
+            h.update(relationship.encode("utf-8") + repr(value).encode("utf-8"))
+        return h.hexdigest()
+
+    def get_feature_digest(self, hasher, feature):
+        # Openings and projections may move or change shape without changing their GlobalId
+        return (
+            feature.GlobalId,
+            hasher.get_digest(feature.ObjectPlacement),
+            hasher.get_digest(feature.Representation),
+        )
+
+    def get_pset_value(self, hasher, value):
+        # Property set ids are step ids, which differ between models
+        if isinstance(value, dict):
+            return sorted((k, self.get_pset_value(hasher, v)) for k, v in value.items() if k != "id")
+        elif isinstance(value, (list, tuple)):
+            return [self.get_pset_value(hasher, v) for v in value]
+        elif isinstance(value, ifcopenshell.entity_instance):
+            return hasher.get_digest(value)
+        return value
+
     def get_precision(self):
         contexts = [c for c in self.new.by_type("IfcGeometricRepresentationContext") if c.ContextType == "Model"]
         if contexts:
@@ -397,6 +509,9 @@ if __name__ == "__main__":
         help='A list of space-separated relationships, chosen from "type", "property", "container", "aggregate", "classification"',
         default="",
     )
+    parser.add_argument(
+        "-w", "--workers", type=int, help="The number of processes used to hash elements. Defaults to the CPU count"
+    )
     args = parser.parse_args()
 
     print("# IFC Diff")
@@ -410,7 +525,7 @@ if __name__ == "__main__":
     print("# Loading finished in {:.2f} seconds".format(time.time() - start))
     start = time.time()
 
-    ifc_diff = IfcDiff(old, new, args.relationships.split())
+    ifc_diff = IfcDiff(old, new, args.relationships.split(), workers=args.workers)
     ifc_diff.diff()
 
     print("# Diff finished in {:.2f} seconds".format(time.time() - start))
@@ -0,0 +1,80 @@
+# IfcDiff - IFC diffing utility
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcDiff.
+#
+# IfcDiff is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcDiff is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcDiff.  If not, see <http://www.gnu.org/licenses/>.
+
+import ifcopenshell
+import ifcopenshell.api
+import ifcopenshell.util.fingerprint
+from ifcdiff import IfcDiff
+
+
+def create_model(type_value, occurrence_value):
+    ifc = ifcopenshell.file(schema="IFC4")
+    ifcopenshell.api.run("root.create_entity", ifc, ifc_class="IfcProject")
+    wall = ifcopenshell.api.run("root.create_entity", ifc, ifc_class="IfcWall")
+    wall.GlobalId = "0Wall000000000000000000"
+    wall_type = ifcopenshell.api.run("root.create_entity", ifc, ifc_class="IfcWallType")
+    wall_type.GlobalId = "0WallType00000000000000"
+    ifcopenshell.api.run("type.assign_type", ifc, related_object=wall, relating_type=wall_type)
+    for element, value in ((wall_type, type_value), (wall, occurrence_value)):
+        pset = ifcopenshell.api.run("pset.add_pset", ifc, product=element, name="Foo_Bar")
+        ifcopenshell.api.run("pset.edit_pset", ifc, pset=pset, properties={"Foo": value})
+    return ifc
+
+
+def get_digest(ifc_diff, ifc, global_id):
+    hasher = ifcopenshell.util.fingerprint.Hasher(ignored_classes=["IfcOwnerHistory"])
+    return ifc_diff.get_digest(hasher, ifc.by_id(global_id))
+
+
+class TestGetDigest:
+    def test_sharing_digests_between_identical_elements(self):
+        old = create_model("Type", "Occurrence")
+        new = create_model("Type", "Occurrence")
+        ifc_diff = IfcDiff(old, new, relationships=["attributes", "property", "type", "geometry"])
+        assert get_digest(ifc_diff, old, "0Wall000000000000000000") == get_digest(
+            ifc_diff, new, "0Wall000000000000000000"
+        )
+
+    def test_changing_digests_when_values_move_between_type_and_occurrence(self):
+        old = create_model("Type", "Occurrence")
+        new = create_model("Occurrence", "Type")
+        ifc_diff = IfcDiff(old, new, relationships=["property"])
+        assert get_digest(ifc_diff, old, "0Wall000000000000000000") != get_digest(
+            ifc_diff, new, "0Wall000000000000000000"
+        )
+
+    def test_digesting_elements_without_placements(self):
+        old = create_model("Type", "Occurrence")
+        ifc_diff = IfcDiff(old, old, relationships=["attributes", "property", "geometry"])
+        assert get_digest(ifc_diff, old, "0WallType00000000000000")
+
+
+class TestDiff:
+    def test_diffing_values_moved_between_type_and_occurrence(self):
+        old = create_model("Type", "Occurrence")
+        new = create_model("Occurrence", "Type")
+        ifc_diff = IfcDiff(old, new, relationships=["property"], workers=1)
+        ifc_diff.diff()
+        assert "properties_changed" in ifc_diff.change_register["0Wall000000000000000000"]
+
+    def test_diffing_selected_types(self):
+        old = create_model("Type", "Occurrence")
+        new = create_model("Type", "Occurrence")
+        ifc_diff = IfcDiff(old, new, relationships=["geometry"], filter_elements=".IfcWallType", workers=1)
+        ifc_diff.diff()
+        assert ifc_diff.change_register == {}
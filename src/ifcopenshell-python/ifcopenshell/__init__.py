@@ -36,12 +36,18 @@ from __future__ import print_function
 
 import os
 import sys
+import builtins
 import tempfile
 import zipfile
 from pathlib import Path
 
 import ifcopenshell.util.file
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # No zstd support
+
 if hasattr(os, "uname"):
     platform_system = os.uname()[0].lower()
 else:
@@ -91,11 +97,16 @@ def open(path: "os.PathLike | str", format: str = None) -> file:
     """Loads an IFC dataset from a filepath
 
     You can specify a file format. If no format is given, it is guessed from its extension.
-    Currently supported specified format : .ifc | .ifcZIP | .ifcXML
+    Currently supported specified format : .ifc | .ifcZIP | .ifcXML | .ifcZST
+
+    Zipped and zstd compressed .ifc files are decompressed in memory, so no
+    uncompressed copy of the model is written to disk. Reading .ifcZST files
+    requires the zstandard package.
 
     Examples:
         model = ifcopenshell.open("/path/to/model.ifc")
         model = ifcopenshell.open("/path/to/model.ifcXML")
+        model = ifcopenshell.open("/path/to/model.ifc.zst")
         model = ifcopenshell.open("/path/to/model.any_extension", ".ifc")
     """
     path = Path(path)
@@ -107,27 +118,73 @@ def open(path: "os.PathLike | str", format: str = None) -> file:
             return file(f)
         raise IOError(f"Failed to parse .ifcXML file from {path}")
     if format == ".ifcZIP":
-        with tempfile.TemporaryDirectory() as unzipped_path:
-            with zipfile.ZipFile(path) as zf:
-                for name in zf.namelist():
-                    if Path(name).suffix.lower() in (".ifc", ".ifcxml"):
+        with zipfile.ZipFile(path) as zf:
+            for name in zf.namelist():
+                suffix = Path(name).suffix.lower()
+                if suffix == ".ifc":
+                    with zf.open(name) as stream:
+                        return open_stream(stream)
+                elif suffix == ".ifcxml":
+                    # The XML parser can only read from a path
+                    with tempfile.TemporaryDirectory() as unzipped_path:
                         return open(zf.extract(name, unzipped_path))
-                else:
-                    raise LookupError(f"No .ifc or .ifcXML file found in {path}")
-    f = ifcopenshell_wrapper.open(str(path.absolute()))
+            else:
+                raise LookupError(f"No .ifc or .ifcXML file found in {path}")
+    if format == ".ifcZST":
+        if zstandard is None:
+            raise ImportError("Reading .ifcZST files requires the zstandard package")
+        with builtins.open(path, "rb") as f:
+            with zstandard.ZstdDecompressor().stream_reader(f) as stream:
+                return open_stream(stream)
+    return wrap_parsed_file(ifcopenshell_wrapper.open(str(path.absolute())))
+
+
+def wrap_parsed_file(f) -> file:
     if f.good():
         return file(f)
-    else:
-        exc, msg = {
-            READ_ERROR: (IOError, "Unable to open file for reading"),
-            NO_HEADER: (Error, "Unable to parse IFC SPF header"),
-            UNSUPPORTED_SCHEMA: (
-                SchemaError,
-                "Unsupported schema: %s"
-                % ",".join(f.header.file_schema.schema_identifiers),
-            ),
-        }[f.good().value()]
-        raise exc(msg)
+    status = f.good().value()
+    if status == UNSUPPORTED_SCHEMA:
+        # Only read the header when it was parsed, otherwise the wrapper raises
+        raise SchemaError("Unsupported schema: %s" % ",".join(f.header.file_schema.schema_identifiers))
+    exc, msg = {
+        READ_ERROR: (IOError, "Unable to open file for reading"),
+        NO_HEADER: (Error, "Unable to parse IFC SPF header"),
+    }[status]
+    raise exc(msg)
+
+
+def open_stream(stream) -> file:
+    """Loads an IFC-SPF dataset from a binary stream
+
+    The stream is read into memory and parsed from there, so this works with
+    any file-like object, such as a member of a zip file or a decompressing
+    stream, without first writing it to disk. The parser can only read text
+    which is valid UTF-8 from memory, so data with raw 8-bit characters is
+    written to a temporary file and parsed exactly like :func:`open` would.
+
+    :param stream: A binary file-like object with a read() method
+    :return: The parsed model
+    :rtype: ifcopenshell.file.file
+
+    Example:
+
+    .. code:: python
+
+        with gzip.open("/path/to/model.ifc.gz", "rb") as stream:
+            model = ifcopenshell.open_stream(stream)
+    """
+    data = stream.read()
+    try:
+        # Strings are encoded back to the same bytes when passed to the parser
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        # IFC-SPF is meant to be 7-bit, but some authoring tools write raw 8-bit characters
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "stream.ifc")
+            with builtins.open(path, "wb") as f:
+                f.write(data)
+            return wrap_parsed_file(ifcopenshell_wrapper.open(path))
+    return wrap_parsed_file(ifcopenshell_wrapper.read(text))
 
 
 def create_entity(type, schema="IFC4", *args, **kwargs):
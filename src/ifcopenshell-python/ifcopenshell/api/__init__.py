@@ -31,7 +31,7 @@ post_listeners = {}
 
 def run(usecase_path, ifc_file=None, should_run_listeners=True, **settings):
     if should_run_listeners:
-        for listener in pre_listeners.get(usecase_path, {}).values():
+        for listener in get_listeners(pre_listeners, usecase_path):
             listener(usecase_path, ifc_file, settings)
 
     def serialise_entity_instance(entity):
@@ -68,16 +68,22 @@ def run(usecase_path, ifc_file=None, should_run_listeners=True, **settings):
         result = usecase_class(**settings).execute()
 
     if should_run_listeners:
-        for listener in post_listeners.get(usecase_path, {}).values():
+        for listener in get_listeners(post_listeners, usecase_path):
             listener(usecase_path, ifc_file, settings)
 
     return result
 
 
+def get_listeners(listeners, usecase_path):
+    # Listeners registered against "*" run for every use case
+    return list(listeners.get(usecase_path, {}).values()) + list(listeners.get("*", {}).values())
+
+
 def add_pre_listener(usecase_path, name, callback):
     """Add a pre listener
 
-    :param usecase_path: string, ifcopenshell api use case path
+    :param usecase_path: string, ifcopenshell api use case path, or "*" to
+        listen to all use cases
     :param name: string, name of listener
     :param callback: callback function
     """
@@ -87,7 +93,8 @@ def add_pre_listener(usecase_path, name, callback):
 def add_post_listener(usecase_path, name, callback):
     """Add a post listener
 
-    :param usecase_path: string, ifcopenshell api use case path
+    :param usecase_path: string, ifcopenshell api use case path, or "*" to
+        listen to all use cases
     :param name: string, name of listener
     :param callback: callback function
     """
@@ -97,5 +97,6 @@ class Usecase:
 
         ifcopenshell.util.sequence.is_working_day.cache_clear()
         ifcopenshell.util.sequence.is_calendar_applicable.cache_clear()
+        ifcopenshell.util.sequence.get_calendar_days.cache_clear()
 
         return time_period
@@ -16,6 +16,8 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
+import ifcopenshell.util.sequence
+
 
 class Usecase:
     def __init__(self, file, work_calendar=None, time_type="WorkingTimes"):
@@ -82,4 +84,9 @@ class Usecase:
             exception_times = list(self.settings["work_calendar"].ExceptionTimes or [])
             exception_times.append(work_time)
             self.settings["work_calendar"].ExceptionTimes = exception_times
+
+        ifcopenshell.util.sequence.is_working_day.cache_clear()
+        ifcopenshell.util.sequence.is_calendar_applicable.cache_clear()
+        ifcopenshell.util.sequence.get_calendar_days.cache_clear()
+
         return work_time
@@ -16,6 +16,8 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
+import ifcopenshell.util.sequence
+
 
 class Usecase:
     def __init__(self, file, parent=None, recurrence_type="WEEKLY"):
@@ -125,4 +127,9 @@ class Usecase:
             if len(self.file.get_inverse(self.settings["parent"].Recurrence)) == 1:
                 self.file.remove(self.settings["parent"].Recurrence)
             self.settings["parent"].Recurrence = recurrence
+
+        ifcopenshell.util.sequence.is_working_day.cache_clear()
+        ifcopenshell.util.sequence.is_calendar_applicable.cache_clear()
+        ifcopenshell.util.sequence.get_calendar_days.cache_clear()
+
         return recurrence
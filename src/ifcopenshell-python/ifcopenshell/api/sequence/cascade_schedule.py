@@ -17,6 +17,7 @@
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
 import datetime
+import collections
 import ifcopenshell.util.date
 import ifcopenshell.util.sequence
 
@@ -34,8 +35,11 @@ class Usecase:
         changes.
 
         Dates can only cascade from predecessor to successors, not backwards.
-        Cyclical relationships are invalid and will result in a recursion error
-        being raised.
+        Successors are visited in topological order, so each task is only
+        recalculated once, and only if one of its predecessors has changed.
+        Cyclical relationships are invalid. If changed dates would cascade
+        around a cycle, a recursion error is raised. Cycles which the changed
+        dates never reach are ignored.
 
         Note that there may be differences between how different planning
         software calculate start and end dates. Some may consider Monday 5pm to
@@ -107,24 +111,101 @@ class Usecase:
 
     def execute(self):
         self.calendar_cache = {}
-        self.cascade_task(self.settings["task"], is_first_task=True)
-
-    def cascade_task(self, task, is_first_task=False, task_sequence=None):
-        if task_sequence is None:
-            task_sequence = []
-
-        if task in task_sequence:
-            print("Warning! Recursive sequence is as follows:")
-            for i, debug_task in enumerate(task_sequence):
-                if i == 0:
-                    print("Starting at", debug_task)
-                else:
-                    print("... is a predecessor to ...", debug_task)
-            print("... which is cyclically a predecessor to ...", task)
-            raise RecursionError("Recursive tasks found. Could not cascade schedule.")
-
+        first_task = self.settings["task"]
+        tasks, total_predecessors = self.get_successors(first_task)
+        changed_tasks = set()
+        cascaded_tasks = set()
+
+        def is_changed(task):
+            return any(rel.RelatingProcess.id() in changed_tasks for rel in task.IsSuccessorFrom)
+
+        def release(task):
+            for rel in task.IsPredecessorTo:
+                successor = rel.RelatedProcess
+                total_predecessors[successor.id()] -= 1
+                if not total_predecessors[successor.id()] and successor.id() not in cascaded_tasks:
+                    queue.append(successor)
+
+        # Kahn's algorithm, which is iterative and so is not limited by the recursion limit
+        queue = collections.deque([first_task])
+        while True:
+            while queue:
+                task = queue.popleft()
+                is_first_task = task == first_task
+                is_recascaded = task.id() in cascaded_tasks
+                cascaded_tasks.add(task.id())
+                if (is_first_task or is_changed(task)) and self.cascade_task(task, is_first_task=is_first_task):
+                    changed_tasks.add(task.id())
+                    for rel in task.IsPredecessorTo:
+                        successor = rel.RelatedProcess
+                        if successor.id() not in cascaded_tasks:
+                            continue
+                        if self.is_successor(task, successor):
+                            print("Warning! Recursive sequence found involving", task, "and", successor)
+                            raise RecursionError("Recursive tasks found. Could not cascade schedule.")
+                        # Cascaded early while waiting on a cycle, so it is cascaded again
+                        queue.append(successor)
+                if not is_recascaded:
+                    release(task)
+
+            # Anything left is in, or waits on, a cycle
+            remaining = [t for i, t in tasks.items() if i not in cascaded_tasks]
+            changed_remaining = [t for t in remaining if is_changed(t)]
+            if not changed_remaining:
+                break
+            # Tasks which no changes can reach keep their dates, so stop waiting on them
+            affected = self.get_affected(changed_remaining, {t.id() for t in remaining})
+            unaffected = [t for t in remaining if t.id() not in affected]
+            for task in unaffected:
+                cascaded_tasks.add(task.id())
+            for task in unaffected:
+                release(task)
+            if not queue:
+                # Cascade into the cycle, which raises if the changes come back around
+                queue.extend(changed_remaining)
+
+    def get_successors(self, task):
+        tasks = {task.id(): task}
+        total_predecessors = {task.id(): 0}
+        queue = [task]
+        while queue:
+            for rel in queue.pop().IsPredecessorTo:
+                successor = rel.RelatedProcess
+                if successor.id() not in tasks:
+                    tasks[successor.id()] = successor
+                    total_predecessors[successor.id()] = 0
+                    queue.append(successor)
+                total_predecessors[successor.id()] += 1
+        return tasks, total_predecessors
+
+    def get_affected(self, tasks, task_ids):
+        affected = {t.id() for t in tasks}
+        queue = list(tasks)
+        while queue:
+            for rel in queue.pop().IsPredecessorTo:
+                successor = rel.RelatedProcess
+                if successor.id() in task_ids and successor.id() not in affected:
+                    affected.add(successor.id())
+                    queue.append(successor)
+        return affected
+
+    def is_successor(self, task, predecessor):
+        # Whether task is a direct or indirect successor of predecessor
+        visited = set()
+        queue = [predecessor]
+        while queue:
+            for rel in queue.pop().IsPredecessorTo:
+                successor = rel.RelatedProcess
+                if successor == task:
+                    return True
+                if successor.id() not in visited:
+                    visited.add(successor.id())
+                    queue.append(successor)
+        return False
+
+    def cascade_task(self, task, is_first_task=False):
         if not task.TaskTime:
-            return
+            return False
 
         duration = (
             ifcopenshell.util.date.ifc2datetime(task.TaskTime.ScheduleDuration)
@@ -258,7 +339,7 @@ class Usecase:
             if potential_finish > finish:
                 start_ifc = ifcopenshell.util.date.datetime2ifc(start, "IfcDateTime")
                 if task.TaskTime.ScheduleStart == start_ifc and not is_first_task:
-                    return
+                    return False
                 task.TaskTime.ScheduleStart = start_ifc
                 task.TaskTime.ScheduleFinish = ifcopenshell.util.date.datetime2ifc(
                     potential_finish, "IfcDateTime"
@@ -266,7 +347,7 @@ class Usecase:
             else:
                 finish_ifc = ifcopenshell.util.date.datetime2ifc(finish, "IfcDateTime")
                 if task.TaskTime.ScheduleFinish == finish_ifc and not is_first_task:
-                    return
+                    return False
                 task.TaskTime.ScheduleFinish = finish_ifc
                 task.TaskTime.ScheduleStart = ifcopenshell.util.date.datetime2ifc(
                     ifcopenshell.util.sequence.get_start_or_finish_date(
@@ -282,7 +363,7 @@ class Usecase:
             finish = max(finishes)
             finish_ifc = ifcopenshell.util.date.datetime2ifc(finish, "IfcDateTime")
             if task.TaskTime.ScheduleFinish == finish_ifc and not is_first_task:
-                return
+                return False
             task.TaskTime.ScheduleFinish = finish_ifc
             task.TaskTime.ScheduleStart = ifcopenshell.util.date.datetime2ifc(
                 ifcopenshell.util.sequence.get_start_or_finish_date(
@@ -298,7 +379,7 @@ class Usecase:
             start = max(starts)
             start_ifc = ifcopenshell.util.date.datetime2ifc(start, "IfcDateTime")
             if task.TaskTime.ScheduleStart == start_ifc and not is_first_task:
-                return
+                return False
             task.TaskTime.ScheduleStart = start_ifc
             task.TaskTime.ScheduleFinish = ifcopenshell.util.date.datetime2ifc(
                 ifcopenshell.util.sequence.get_start_or_finish_date(
@@ -311,8 +392,7 @@ class Usecase:
                 "IfcDateTime",
             )
 
-        for rel in task.IsPredecessorTo:
-            self.cascade_task(rel.RelatedProcess, task_sequence=task_sequence + [task])
+        return True
 
     def get_lag_time_days(self, lag_time):
         return ifcopenshell.util.date.ifc2datetime(lag_time.LagValue.wrappedValue).days
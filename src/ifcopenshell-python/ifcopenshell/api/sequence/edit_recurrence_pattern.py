@@ -65,3 +65,4 @@ class Usecase:
 
         ifcopenshell.util.sequence.is_working_day.cache_clear()
         ifcopenshell.util.sequence.is_calendar_applicable.cache_clear()
+        ifcopenshell.util.sequence.get_calendar_days.cache_clear()
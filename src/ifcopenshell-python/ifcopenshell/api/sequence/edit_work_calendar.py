@@ -16,6 +16,8 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
+import ifcopenshell.util.sequence
+
 
 class Usecase:
     def __init__(self, file, work_calendar=None, attributes=None):
@@ -48,3 +50,7 @@ class Usecase:
     def execute(self):
         for name, value in self.settings["attributes"].items():
             setattr(self.settings["work_calendar"], name, value)
+
+        ifcopenshell.util.sequence.is_working_day.cache_clear()
+        ifcopenshell.util.sequence.is_calendar_applicable.cache_clear()
+        ifcopenshell.util.sequence.get_calendar_days.cache_clear()
@@ -17,11 +17,14 @@
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
 import datetime
-import networkx as nx
+import collections
 import ifcopenshell.api
 import ifcopenshell.util.date
 import ifcopenshell.util.sequence
 
+START = 0
+FINISH = 1
+
 
 class Usecase:
     def __init__(self, file, work_schedule=None):
@@ -32,6 +35,12 @@ class Usecase:
         marked as critical, and both the total and free floats will be
         populated for all task times.
 
+        The work schedule is flattened into integer indexed arrays of tasks
+        and sequence relationships which are sorted topologically once. The
+        forward pass then visits tasks in that order, and the backward pass in
+        reverse, so each task is only calculated once per pass. All task times
+        are written in a single batch at the end.
+
         Cyclical relationships are detected and will result in a recursion
         error.
 
@@ -56,50 +65,20 @@ class Usecase:
         # The method implemented is the same as shown here:
         # https://www.youtube.com/watch?v=qTErIV6OqLg
         self.start_dates = []
-        self.build_network_graph()
+        self.build_network()
 
         if not self.start_dates:
             return
 
-        is_cyclic = False
-        attempts = 0
-        self.pending_nodes = set(self.g.nodes)
-        max_worst_case_attempts = pow(len(self.pending_nodes), 2)
-        while self.pending_nodes:
-            attempts += 1
-            remaining_nodes = set()
-            for pending_node in self.pending_nodes:
-                if not self.forward_pass(pending_node):
-                    remaining_nodes.add(pending_node)
-            self.pending_nodes = remaining_nodes
-
-            # As we parse nodes, the remaining attempts can drop dramatically, so we recalculate the upper limit
-            max_remaining_attempts = pow(len(self.pending_nodes), 2)
-            if max_remaining_attempts < max_worst_case_attempts:
-                max_worst_case_attempts = max_remaining_attempts
-                attempts = 0
-
-            if attempts > max_worst_case_attempts:
-                is_cyclic = True
-                break  # We have an infinite loop due to a cyclic graph
-
-        if is_cyclic:
-            raise RecursionError(
-                "Task graph is cyclic and so critical path method cannot be performed."
-            )
-            return
-
-        self.pending_nodes = set(self.g.nodes)
-        while self.pending_nodes:
-            remaining_nodes = set()
-            for pending_node in self.pending_nodes:
-                if not self.backward_pass(pending_node):
-                    remaining_nodes.add(pending_node)
-            self.pending_nodes = remaining_nodes
+        order = self.get_topological_order()
+        for node in order:
+            self.forward_pass(node)
+        for node in reversed(order):
+            self.backward_pass(node)
 
         self.update_task_times()
 
-    def build_network_graph(self):
+    def build_network(self):
         self.sequence_type_map = {
             None: "FS",
             "START_START": "SS",
@@ -109,445 +88,307 @@ class Usecase:
             "USERDEFINED": "FS",
             "NOTDEFINED": "FS",
         }
-        self.g = nx.DiGraph()
-        self.edges = []
-        self.g.add_node("start", duration=0, duration_type="ELAPSEDTIME", calendar=None)
-        self.g.add_node(
-            "finish", duration=0, duration_type="ELAPSEDTIME", calendar=None
-        )
+
+        # Nodes are indexed by integers, where the first two are the virtual start and finish nodes
+        self.tasks = [None, None]
+        self.durations = [0, 0]
+        self.duration_types = ["ELAPSEDTIME", "ELAPSEDTIME"]
+        self.calendars = [None, None]
+        self.node_indices = {}
+
+        # Edges are keyed by the nodes they connect, so duplicate relationships are merged
+        self.edges = {}
         for rel in self.settings["work_schedule"].Controls:
             for related_object in rel.RelatedObjects:
                 if not related_object.is_a("IfcTask"):
                     continue
                 self.add_node(related_object)
-        self.g.add_edges_from(self.edges)
+        self.add_sequences()
+
+        total_nodes = len(self.tasks)
+        self.predecessor_edges = [[] for i in range(total_nodes)]
+        self.successor_edges = [[] for i in range(total_nodes)]
+        for (predecessor, successor), (lag_time, sequence_type) in self.edges.items():
+            self.successor_edges[predecessor].append((successor, lag_time, sequence_type))
+            self.predecessor_edges[successor].append((predecessor, lag_time, sequence_type))
+
+        self.early_starts = [None] * total_nodes
+        self.early_finishes = [None] * total_nodes
+        self.late_starts = [None] * total_nodes
+        self.late_finishes = [None] * total_nodes
+        self.total_floats = [None] * total_nodes
+        self.free_floats = [None] * total_nodes
 
     def add_node(self, task):
-        if task.IsNestedBy:
-            for rel in task.IsNestedBy:
-                [self.add_node(o) for o in rel.RelatedObjects]
-            return
-
-        if task.TaskTime and task.TaskTime.ScheduleDuration:
-            duration = ifcopenshell.util.date.ifc2datetime(
-                task.TaskTime.ScheduleDuration
-            ).days
-            duration_type = task.TaskTime.DurationType
-        else:
-            duration = 0
-            duration_type = "ELAPSEDTIME"
-
-        self.g.add_node(
-            task.id(),
-            duration=duration,
-            duration_type=duration_type,
-            calendar=ifcopenshell.util.sequence.derive_calendar(task),
-        )
+        queue = [task]
+        while queue:
+            task = queue.pop()
+            if task.IsNestedBy:
+                for rel in reversed(task.IsNestedBy):
+                    queue.extend(reversed(rel.RelatedObjects))
+                continue
+            if task.id() in self.node_indices:
+                continue
 
-        self.edges.extend(
-            [
-                (
-                    rel.RelatingProcess.id(),
-                    rel.RelatedProcess.id(),
-                    {
-                        "lag_time": 0
-                        if not rel.TimeLag
-                        else ifcopenshell.util.date.ifc2datetime(
-                            rel.TimeLag.LagValue.wrappedValue
-                        ).days,
-                        "type": self.sequence_type_map[rel.SequenceType],
-                    },
-                )
-                for rel in task.IsSuccessorFrom or []
-            ]
-        )
-        predecessor_types = [rel.SequenceType for rel in task.IsSuccessorFrom]
-        successor_types = [rel.SequenceType for rel in task.IsPredecessorTo]
-
-        if not predecessor_types:
-            self.edges.append(("start", task.id(), {"lag_time": 0, "type": "FS"}))
-            if task.TaskTime and task.TaskTime.ScheduleStart:
-                self.start_dates.append(
-                    ifcopenshell.util.date.ifc2datetime(task.TaskTime.ScheduleStart)
-                )
-        if not successor_types:
-            self.edges.append((task.id(), "finish", {"lag_time": 0, "type": "FF"}))
+            if task.TaskTime and task.TaskTime.ScheduleDuration:
+                duration = ifcopenshell.util.date.ifc2datetime(task.TaskTime.ScheduleDuration).days
+                duration_type = task.TaskTime.DurationType
+            else:
+                duration = 0
+                duration_type = "ELAPSEDTIME"
+
+            self.node_indices[task.id()] = len(self.tasks)
+            self.tasks.append(task)
+            self.durations.append(duration)
+            self.duration_types.append(duration_type)
+            self.calendars.append(ifcopenshell.util.sequence.derive_calendar(task))
+
+    def add_sequences(self):
+        for node, task in enumerate(self.tasks):
+            if task is None:
+                continue
+            for rel in task.IsSuccessorFrom or []:
+                predecessor = self.node_indices.get(rel.RelatingProcess.id())
+                if predecessor is None:
+                    continue
+                lag_time = 0
+                if rel.TimeLag:
+                    lag_time = ifcopenshell.util.date.ifc2datetime(rel.TimeLag.LagValue.wrappedValue).days
+                self.edges[(predecessor, node)] = (lag_time, self.sequence_type_map[rel.SequenceType])
+            if not task.IsSuccessorFrom:
+                self.edges[(START, node)] = (0, "FS")
+                if task.TaskTime and task.TaskTime.ScheduleStart:
+                    self.start_dates.append(ifcopenshell.util.date.ifc2datetime(task.TaskTime.ScheduleStart))
+            if not task.IsPredecessorTo:
+                self.edges[(node, FINISH)] = (0, "FF")
+
+    def get_topological_order(self):
+        # Kahn's algorithm, which is iterative and so is not limited by the recursion limit
+        total_predecessors = [len(edges) for edges in self.predecessor_edges]
+        queue = collections.deque(n for n, total in enumerate(total_predecessors) if not total)
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for successor, _, _ in self.successor_edges[node]:
+                total_predecessors[successor] -= 1
+                if not total_predecessors[successor]:
+                    queue.append(successor)
+        if len(order) != len(self.tasks):
+            raise RecursionError("Task graph is cyclic and so critical path method cannot be performed.")
+        return order
 
     def update_task_times(self):
-        for ifc_definition_id in self.g.nodes:
-            if ifc_definition_id in ("start", "finish"):
+        for node, task in enumerate(self.tasks):
+            if task is None or not task.TaskTime:
                 continue
-            data = self.g.nodes[ifc_definition_id]
-            task = self.file.by_id(ifc_definition_id)
-            if not task.TaskTime:
-                continue
-            ifcopenshell.api.run(
-                "sequence.edit_task_time",
-                self.file,
-                task_time=task.TaskTime,
-                attributes={
-                    "FreeFloat": ifcopenshell.util.date.datetime2ifc(
-                        data["free_float"], "IfcDuration"
-                    ),
-                    "TotalFloat": ifcopenshell.util.date.datetime2ifc(
-                        data["total_float"], "IfcDuration"
-                    ),
-                    "IsCritical": data["total_float"].days == 0,
-                    "EarlyStart": ifcopenshell.util.date.datetime2ifc(
-                        data["early_start"], "IfcDateTime"
-                    ),
-                    "EarlyFinish": ifcopenshell.util.date.datetime2ifc(
-                        data["early_finish"], "IfcDateTime"
-                    ),
-                    "LateStart": ifcopenshell.util.date.datetime2ifc(
-                        data["late_start"], "IfcDateTime"
-                    ),
-                    "LateFinish": ifcopenshell.util.date.datetime2ifc(
-                        data["late_finish"], "IfcDateTime"
-                    ),
-                },
-            )
+            task_time = task.TaskTime
+            task_time.FreeFloat = ifcopenshell.util.date.datetime2ifc(self.free_floats[node], "IfcDuration")
+            task_time.TotalFloat = ifcopenshell.util.date.datetime2ifc(self.total_floats[node], "IfcDuration")
+            task_time.IsCritical = self.total_floats[node].days == 0
+            task_time.EarlyStart = ifcopenshell.util.date.datetime2ifc(self.early_starts[node], "IfcDateTime")
+            task_time.EarlyFinish = ifcopenshell.util.date.datetime2ifc(self.early_finishes[node], "IfcDateTime")
+            task_time.LateStart = ifcopenshell.util.date.datetime2ifc(self.late_starts[node], "IfcDateTime")
+            task_time.LateFinish = ifcopenshell.util.date.datetime2ifc(self.late_finishes[node], "IfcDateTime")
 
     def offset_date(self, date, days, node):
         return ifcopenshell.util.sequence.offset_date(
-            date, datetime.timedelta(days=days), node["duration_type"], node["calendar"]
+            date, datetime.timedelta(days=days), self.duration_types[node], self.calendars[node]
         )
 
-    def forward_pass(self, node):
-        successors = self.g.successors(node)
-        predecessors = list(self.g.predecessors(node))
-        data = self.g.nodes[node]
+    def get_start_or_finish_date(self, date, node, date_type):
+        return ifcopenshell.util.sequence.get_start_or_finish_date(
+            date,
+            datetime.timedelta(days=self.durations[node]),
+            self.duration_types[node],
+            self.calendars[node],
+            date_type=date_type,
+        )
 
-        if node == "start":
-            data["early_start"] = min(self.start_dates)
+    def forward_pass(self, node):
+        if node == START:
+            self.early_starts[node] = min(self.start_dates)
         else:
             finishes = []
             starts = []
-            for predecessor in predecessors:
-                predecessor_data = self.g.nodes[predecessor]
-                edge = self.g[predecessor][node]
-                if edge["type"] == "FS":
-                    finish = predecessor_data.get("early_finish")
-                    if finish is None:
-                        return
-                    days = 0 if predecessor_data["duration"] == 0 else 1
-                    if edge["lag_time"]:
-                        days += edge["lag_time"]
+            for predecessor, lag_time, sequence_type in self.predecessor_edges[node]:
+                if sequence_type == "FS":
+                    finish = self.early_finishes[predecessor]
+                    days = 0 if self.durations[predecessor] == 0 else 1
+                    if lag_time:
+                        days += lag_time
                     if days:
+                        starts.append(datetime.datetime.combine(self.offset_date(finish, days, node), datetime.time(9)))
                         starts.append(
-                            datetime.datetime.combine(
-                                self.offset_date(finish, days, data), datetime.time(9)
-                            )
-                        )
-                        starts.append(
-                            datetime.datetime.combine(
-                                self.offset_date(finish, days, predecessor_data),
-                                datetime.time(9),
-                            )
+                            datetime.datetime.combine(self.offset_date(finish, days, predecessor), datetime.time(9))
                         )
                     else:
                         starts.append(finish)
-                elif edge["type"] == "SS":
-                    start = predecessor_data.get("early_start")
-                    if start is None:
-                        return
-                    if edge["lag_time"]:
-                        starts.append(self.offset_date(start, edge["lag_time"], data))
-                        starts.append(
-                            self.offset_date(start, edge["lag_time"], predecessor_data)
-                        )
+                elif sequence_type == "SS":
+                    start = self.early_starts[predecessor]
+                    if lag_time:
+                        starts.append(self.offset_date(start, lag_time, node))
+                        starts.append(self.offset_date(start, lag_time, predecessor))
                     else:
                         starts.append(start)
-                elif edge["type"] == "FF":
-                    finish = predecessor_data.get("early_finish")
-                    if finish is None:
-                        return
-                    if edge["lag_time"]:
-                        finishes.append(
-                            self.offset_date(finish, edge["lag_time"], data)
-                        )
-                        finishes.append(
-                            self.offset_date(finish, edge["lag_time"], predecessor_data)
-                        )
+                elif sequence_type == "FF":
+                    finish = self.early_finishes[predecessor]
+                    if lag_time:
+                        finishes.append(self.offset_date(finish, lag_time, node))
+                        finishes.append(self.offset_date(finish, lag_time, predecessor))
                     else:
                         finishes.append(finish)
-                elif edge["type"] == "SF":
-                    start = predecessor_data.get("early_start")
-                    if start is None:
-                        return
+                elif sequence_type == "SF":
+                    start = self.early_starts[predecessor]
                     days = -1
-                    if edge["lag_time"]:
-                        days += edge["lag_time"]
-                    if days or edge["lag_time"]:
+                    if lag_time:
+                        days += lag_time
+                    if days or lag_time:
                         finishes.append(
-                            datetime.datetime.combine(
-                                self.offset_date(start, days, data), datetime.time(17)
-                            )
+                            datetime.datetime.combine(self.offset_date(start, days, node), datetime.time(17))
                         )
                         finishes.append(
-                            datetime.datetime.combine(
-                                self.offset_date(start, days, predecessor_data),
-                                datetime.time(17),
-                            )
+                            datetime.datetime.combine(self.offset_date(start, days, predecessor), datetime.time(17))
                         )
                     else:
                         finishes.append(start)
             if starts and finishes:
-                data["early_start"] = max(starts)
-                data["early_finish"] = max(finishes)
-                potential_finish = ifcopenshell.util.sequence.get_start_or_finish_date(
-                    data["early_start"],
-                    datetime.timedelta(days=data["duration"]),
-                    data["duration_type"],
-                    data["calendar"],
-                    date_type="FINISH",
-                )
-                if potential_finish > data["early_finish"]:
-                    data["early_finish"] = potential_finish
+                self.early_starts[node] = max(starts)
+                self.early_finishes[node] = max(finishes)
+                potential_finish = self.get_start_or_finish_date(self.early_starts[node], node, "FINISH")
+                if potential_finish > self.early_finishes[node]:
+                    self.early_finishes[node] = potential_finish
                 else:
-                    data[
-                        "early_start"
-                    ] = ifcopenshell.util.sequence.get_start_or_finish_date(
-                        data["early_finish"],
-                        datetime.timedelta(days=data["duration"]),
-                        data["duration_type"],
-                        data["calendar"],
-                        date_type="START",
-                    )
+                    self.early_starts[node] = self.get_start_or_finish_date(self.early_finishes[node], node, "START")
             elif finishes:
-                data["early_finish"] = max(finishes)
+                self.early_finishes[node] = max(finishes)
             elif starts:
-                data["early_start"] = max(starts)
-            else:
-                print("How did this happen?")
-
-        if data.get("early_finish") is None:
-            data["early_finish"] = ifcopenshell.util.sequence.get_start_or_finish_date(
-                data["early_start"],
-                datetime.timedelta(days=data["duration"]),
-                data["duration_type"],
-                data["calendar"],
-                date_type="FINISH",
-            )
-        elif data.get("early_start") is None:
-            data["early_start"] = ifcopenshell.util.sequence.get_start_or_finish_date(
-                data["early_finish"],
-                datetime.timedelta(days=data["duration"]),
-                data["duration_type"],
-                data["calendar"],
-                date_type="START",
-            )
+                self.early_starts[node] = max(starts)
 
-        return True
+        if self.early_finishes[node] is None:
+            self.early_finishes[node] = self.get_start_or_finish_date(self.early_starts[node], node, "FINISH")
+        elif self.early_starts[node] is None:
+            self.early_starts[node] = self.get_start_or_finish_date(self.early_finishes[node], node, "START")
 
     def backward_pass(self, node):
-        successors = list(self.g.successors(node))
-        predecessors = self.g.predecessors(node)
-        data = self.g.nodes[node]
         free_floats = []
 
-        if node == "finish":
-            data["late_finish"] = data["early_finish"]
+        if node == FINISH:
+            self.late_finishes[node] = self.early_finishes[node]
         else:
             finishes = []
             starts = []
-            for successor in successors:
-                successor_data = self.g.nodes[successor]
-                edge = self.g[node][successor]
-                if edge["type"] == "FS":
-                    start = successor_data.get("late_start")
-                    if start is None:
-                        return
+            for successor, lag_time, sequence_type in self.successor_edges[node]:
+                if sequence_type == "FS":
+                    start = self.late_starts[successor]
                     days = 1
-                    if edge["lag_time"]:
-                        days += edge["lag_time"]
-                    if days or edge["lag_time"]:
-                        finishes.append(
-                            datetime.datetime.combine(
-                                self.offset_date(start, -days, data), datetime.time(17)
-                            )
-                        )
-                        finishes.append(
-                            datetime.datetime.combine(
-                                self.offset_date(start, -days, successor_data),
-                                datetime.time(17),
-                            )
-                        )
-                    else:
-                        finishes.append(start)
+                    if lag_time:
+                        days += lag_time
+                    finishes.append(datetime.datetime.combine(self.offset_date(start, -days, node), datetime.time(17)))
+                    finishes.append(
+                        datetime.datetime.combine(self.offset_date(start, -days, successor), datetime.time(17))
+                    )
                     free_floats.append(
                         self.calculate_free_float(
-                            data["early_finish"].date() + datetime.timedelta(days=1),
-                            successor_data["early_start"].date(),
-                            edge["lag_time"],
-                            data,
-                            successor_data,
+                            self.early_finishes[node].date() + datetime.timedelta(days=1),
+                            self.early_starts[successor].date(),
+                            lag_time,
+                            node,
+                            successor,
                         )
                     )
-                elif edge["type"] == "SS":
-                    start = successor_data.get("late_start")
-                    if start is None:
-                        return
-                    if edge["lag_time"]:
-                        starts.append(self.offset_date(start, -edge["lag_time"], data))
-                        starts.append(
-                            self.offset_date(start, -edge["lag_time"], successor_data)
-                        )
+                elif sequence_type == "SS":
+                    start = self.late_starts[successor]
+                    if lag_time:
+                        starts.append(self.offset_date(start, -lag_time, node))
+                        starts.append(self.offset_date(start, -lag_time, successor))
                     else:
                         starts.append(start)
                     free_floats.append(
                         self.calculate_free_float(
-                            data["early_start"],
-                            successor_data["early_start"],
-                            edge["lag_time"],
-                            data,
-                            successor_data,
+                            self.early_starts[node], self.early_starts[successor], lag_time, node, successor
                         )
                     )
-                elif edge["type"] == "FF":
-                    finish = successor_data.get("late_finish")
-                    if finish is None:
-                        return
-                    if edge["lag_time"]:
-                        finishes.append(
-                            self.offset_date(finish, -edge["lag_time"], data)
-                        )
-                        finishes.append(
-                            self.offset_date(finish, -edge["lag_time"], successor_data)
-                        )
+                elif sequence_type == "FF":
+                    finish = self.late_finishes[successor]
+                    if lag_time:
+                        finishes.append(self.offset_date(finish, -lag_time, node))
+                        finishes.append(self.offset_date(finish, -lag_time, successor))
                     else:
                         finishes.append(finish)
                     free_floats.append(
                         self.calculate_free_float(
-                            data["early_finish"],
-                            successor_data["early_finish"],
-                            edge["lag_time"],
-                            data,
-                            successor_data,
+                            self.early_finishes[node], self.early_finishes[successor], lag_time, node, successor
                         )
                     )
-                elif edge["type"] == "SF":
-                    finish = successor_data.get("late_finish")
-                    if finish is None:
-                        return
-                    days = 0 if successor_data["duration"] == 0 else -1
-                    if edge["lag_time"]:
-                        days += edge["lag_time"]
+                elif sequence_type == "SF":
+                    finish = self.late_finishes[successor]
+                    days = 0 if self.durations[successor] == 0 else -1
+                    if lag_time:
+                        days += lag_time
                     if days:
                         starts.append(
-                            datetime.datetime.combine(
-                                self.offset_date(finish, -days, data), datetime.time(9)
-                            )
+                            datetime.datetime.combine(self.offset_date(finish, -days, node), datetime.time(9))
                         )
                         starts.append(
-                            datetime.datetime.combine(
-                                self.offset_date(finish, -days, successor_data),
-                                datetime.time(9),
-                            )
+                            datetime.datetime.combine(self.offset_date(finish, -days, successor), datetime.time(9))
                         )
                     else:
                         starts.append(finish)
                     free_floats.append(
                         self.calculate_free_float(
-                            data["early_start"],
-                            successor_data["early_finish"],
-                            edge["lag_time"],
-                            data,
-                            successor_data,
+                            self.early_starts[node], self.early_finishes[successor], lag_time, node, successor
                         )
                     )
             if starts and finishes:
-                data["late_start"] = min(starts)
-                data["late_finish"] = min(finishes)
-                if (
-                    self.offset_date(data["late_start"], data["duration"], data)
-                    < data["late_finish"]
-                ):
-                    data[
-                        "late_finish"
-                    ] = ifcopenshell.util.sequence.get_start_or_finish_date(
-                        data["late_start"],
-                        datetime.timedelta(days=data["duration"]),
-                        data["duration_type"],
-                        data["calendar"],
-                        date_type="FINISH",
-                    )
+                self.late_starts[node] = min(starts)
+                self.late_finishes[node] = min(finishes)
+                if self.offset_date(self.late_starts[node], self.durations[node], node) < self.late_finishes[node]:
+                    self.late_finishes[node] = self.get_start_or_finish_date(self.late_starts[node], node, "FINISH")
                 else:
-                    data[
-                        "late_start"
-                    ] = ifcopenshell.util.sequence.get_start_or_finish_date(
-                        data["late_finish"],
-                        datetime.timedelta(days=data["duration"]),
-                        data["duration_type"],
-                        data["calendar"],
-                        date_type="START",
-                    )
+                    self.late_starts[node] = self.get_start_or_finish_date(self.late_finishes[node], node, "START")
             elif finishes:
-                data["late_finish"] = min(finishes)
+                self.late_finishes[node] = min(finishes)
             elif starts:
-                data["late_start"] = min(starts)
-            else:
-                print("How did this happen?")
-
-        if data.get("late_finish") is None:
-            data["late_finish"] = ifcopenshell.util.sequence.get_start_or_finish_date(
-                data["late_start"],
-                datetime.timedelta(days=data["duration"]),
-                data["duration_type"],
-                data["calendar"],
-                date_type="FINISH",
-            )
-        elif data.get("late_start") is None:
-            data["late_start"] = ifcopenshell.util.sequence.get_start_or_finish_date(
-                data["late_finish"],
-                datetime.timedelta(days=data["duration"]),
-                data["duration_type"],
-                data["calendar"],
-                date_type="START",
-            )
+                self.late_starts[node] = min(starts)
 
-        if data["duration_type"] == "WORKTIME":
-            data["total_float"] = datetime.timedelta(
+        if self.late_finishes[node] is None:
+            self.late_finishes[node] = self.get_start_or_finish_date(self.late_starts[node], node, "FINISH")
+        elif self.late_starts[node] is None:
+            self.late_starts[node] = self.get_start_or_finish_date(self.late_finishes[node], node, "START")
+
+        if self.duration_types[node] == "WORKTIME":
+            self.total_floats[node] = datetime.timedelta(
                 days=ifcopenshell.util.sequence.count_working_days(
-                    data["early_finish"], data["late_finish"], data["calendar"]
+                    self.early_finishes[node], self.late_finishes[node], self.calendars[node]
                 )
             )
         else:
-            data["total_float"] = data["late_finish"] - data["early_finish"]
+            self.total_floats[node] = self.late_finishes[node] - self.early_finishes[node]
             # If the float is within the span of a single day, it may show as a 8 hours
-            if data["total_float"].seconds == 60 * 60 * 8:
-                data["total_float"] = datetime.timedelta(
-                    days=data["total_float"].days + 1
-                )
+            if self.total_floats[node].seconds == 60 * 60 * 8:
+                self.total_floats[node] = datetime.timedelta(days=self.total_floats[node].days + 1)
 
-        data["free_float"] = min(free_floats) if free_floats else None
+        free_float = min(free_floats) if free_floats else None
         # If the float is within the span of a single day, it may show as a 8 hours
-        if data["free_float"] and data["free_float"].seconds == 60 * 60 * 8:
-            data["free_float"] = datetime.timedelta(days=data["free_float"].days + 1)
-
-        return True
-
-    def calculate_free_float(
-        self,
-        predecessor_date,
-        successor_date,
-        lag_time,
-        predecessor_data,
-        successor_data,
-    ):
+        if free_float and free_float.seconds == 60 * 60 * 8:
+            free_float = datetime.timedelta(days=free_float.days + 1)
+        self.free_floats[node] = free_float
+
+    def calculate_free_float(self, predecessor_date, successor_date, lag_time, predecessor, successor):
         if not lag_time:
             min_successor_date = successor_date
         else:
             min_successor_date = min(
                 (
-                    self.offset_date(successor_date, -lag_time, predecessor_data),
-                    self.offset_date(successor_date, -lag_time, successor_data),
+                    self.offset_date(successor_date, -lag_time, predecessor),
+                    self.offset_date(successor_date, -lag_time, successor),
                 )
             )
-        if predecessor_data["duration_type"] == "WORKTIME":
+        if self.duration_types[predecessor] == "WORKTIME":
             return datetime.timedelta(
                 days=ifcopenshell.util.sequence.count_working_days(
-                    predecessor_date, min_successor_date, predecessor_data["calendar"]
+                    predecessor_date, min_successor_date, self.calendars[predecessor]
                 )
             )
         return min_successor_date - predecessor_date
@@ -16,6 +16,8 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
+import ifcopenshell.util.sequence
+
 
 class Usecase:
     def __init__(self, file, work_time=None):
@@ -45,3 +47,7 @@ class Usecase:
 
     def execute(self):
         self.file.remove(self.settings["work_time"])
+
+        ifcopenshell.util.sequence.is_working_day.cache_clear()
+        ifcopenshell.util.sequence.is_calendar_applicable.cache_clear()
+        ifcopenshell.util.sequence.get_calendar_days.cache_clear()
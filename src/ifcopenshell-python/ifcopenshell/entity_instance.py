@@ -98,6 +98,51 @@ for nm in ifcopenshell_wrapper.schema_names():
     register_schema_attributes(schema)
 
 
+INVALID, FORWARD, INVERSE, DERIVED = range(4)
+
+# Attribute accessors used by entity_instance.__getattr__, keyed by the fully
+# qualified class name and attribute name. For example, ("IFC4.IfcWall",
+# "Name") maps to (FORWARD, 2, None). Resolving how to get an attribute
+# involves several schema queries, and possibly finding a function to
+# calculate a derived attribute, so this is done once per class and attribute
+# name on first use rather than for every attribute access.
+_attribute_dict = {}
+
+
+def resolve_attribute(wrapped_data, name):
+    """Determines how to get an attribute by name for an instance's class
+
+    :return: A tuple of the attribute category and a value depending on the
+        category: the index of a forward attribute, whether an inverse
+        attribute has no aggregate specifier, or the function to calculate a
+        derived attribute (or None if it cannot be calculated).
+    :rtype: tuple
+    """
+    attr_cat = wrapped_data.get_attribute_category(name)
+    schema_name, class_name = wrapped_data.is_a(True).split(".")
+    if attr_cat == FORWARD:
+        idx = wrapped_data.get_argument_index(name)
+        if _method_dict[wrapped_data.is_a(True)][idx] != set_derived_attribute:
+            return (FORWARD, idx)
+    elif attr_cat == INVERSE:
+        ent = ifcopenshell_wrapper.schema_by_name(schema_name).declaration_by_name(class_name)
+        inv = [i for i in ent.all_inverse_attributes() if i.name() == name][0]
+        return (INVERSE, (inv.bound1(), inv.bound2()) == (-1, -1))
+
+    # derived attribute perhaps?
+    rules = importlib.import_module(f"ifcopenshell.express.rules.{schema_name}")
+    decl = ifcopenshell_wrapper.schema_by_name(schema_name).declaration_by_name(class_name)
+    while decl:
+        fn = getattr(rules, f"calc_{decl.name()}_{name}", None)
+        if fn:
+            return (DERIVED, fn)
+        decl = decl.supertype()
+
+    if attr_cat == FORWARD:
+        return (DERIVED, None)
+    return (INVALID, None)
+
+
 class entity_instance(object):
     """Base class for all IFC objects.
 
@@ -133,54 +178,24 @@ class entity_instance(object):
         self.wrapped_data.file = None
 
     def __getattr__(self, name):
-        INVALID, FORWARD, INVERSE = range(3)
-        attr_cat = self.wrapped_data.get_attribute_category(name)
+        key = (self.wrapped_data.is_a(True), name)
+        accessor = _attribute_dict.get(key)
+        if accessor is None:
+            accessor = _attribute_dict[key] = resolve_attribute(self.wrapped_data, name)
+        attr_cat, value = accessor
         if attr_cat == FORWARD:
-            idx = self.wrapped_data.get_argument_index(name)
-            if _method_dict[self.is_a(True)][idx] != set_derived_attribute:
-                # A bit ugly, but we fall through to derived attribute handling below
-                return entity_instance.wrap_value(
-                    self.wrapped_data.get_argument(idx), self.wrapped_data.file
-                )
+            return entity_instance.wrap_value(self.wrapped_data.get_argument(value), self.wrapped_data.file)
         elif attr_cat == INVERSE:
-            vs = entity_instance.wrap_value(
-                self.wrapped_data.get_inverse(name), self.wrapped_data.file
-            )
-            if settings.unpack_non_aggregate_inverses:
-                schema_name = self.wrapped_data.is_a(True).split(".")[0]
-                ent = ifcopenshell_wrapper.schema_by_name(schema_name).declaration_by_name(
-                    self.is_a()
-                )
-                inv = [i for i in ent.all_inverse_attributes() if i.name() == name][0]
-                if (inv.bound1(), inv.bound2()) == (-1, -1):
-                    if vs:
-                        vs = vs[0]
-                    else:
-                        vs = None
+            vs = entity_instance.wrap_value(self.wrapped_data.get_inverse(name), self.wrapped_data.file)
+            if value and settings.unpack_non_aggregate_inverses:
+                vs = vs[0] if vs else None
             return vs
-
-        # derived attribute perhaps?
-        schema_name = self.wrapped_data.is_a(True).split(".")[0]
-        rules = importlib.import_module(f"ifcopenshell.express.rules.{schema_name}")
-
-        def yield_supertypes():
-            decl = ifcopenshell_wrapper.schema_by_name(schema_name).declaration_by_name(
-                self.is_a()
-            )
-            while decl:
-                yield decl.name()
-                decl = decl.supertype()
-
-        for sty in yield_supertypes():
-            fn = getattr(rules, f"calc_{sty}_{name}", None)
-            if fn:
-                return fn(self)
-
-        if attr_cat != FORWARD:
-            raise AttributeError(
-                "entity instance of type '%s' has no attribute '%s'"
-                % (self.wrapped_data.is_a(True), name)
-            )
+        elif attr_cat == DERIVED:
+            return value(self) if value else None
+        raise AttributeError(
+            "entity instance of type '%s' has no attribute '%s'"
+            % (self.wrapped_data.is_a(True), name)
+        )
 
     @staticmethod
     def walk(f, g, value):
@@ -193,6 +208,12 @@ class entity_instance(object):
 
     @staticmethod
     def wrap_value(v, file):
+        # Fast paths for the most common values, which need no walking
+        if isinstance(v, ifcopenshell_wrapper.entity_instance):
+            return entity_instance(v, file)
+        elif not isinstance(v, (tuple, list)):
+            return v
+
         def wrap(e):
             return entity_instance(e, file)
 
@@ -1,7 +1,12 @@
 import os
 import re
+import sys
 import ast
+import marshal
+import hashlib
+import functools
 import collections
+import importlib.util
 import ifcopenshell
 from dataclasses import dataclass
 from codegen import indent
@@ -62,26 +67,103 @@ def fix_type(v):
     return v
 
 
-def run(f, logger):
-    from _pytest import assertion
+def get_cache_path(fn):
+    name = os.path.splitext(os.path.basename(fn))[0]
+    return os.path.join(os.path.dirname(fn), "__pycache__", f"{name}.rules.{sys.implementation.cache_tag}.dat")
 
-    if hasattr(logger, "set_instance"):
-        # when using the json logger, we notify it of the relevant instance
-        pre_annotate_instance = lambda instance: logger.set_state('instance', instance) if hasattr(logger, 'set_state') else None
-        post_annotate_instance = lambda instance: instance
-        pre_annotate_attribute = lambda attribute: logger.set_state('attribute', attribute) if hasattr(logger, 'set_state') else None
-        post_annotate_attribute = lambda attribute: None
+
+def get_cache_key(schema, source):
+    import _pytest
+
+    # The rewritten asserts depend on the pytest version and code objects on the Python version
+    return hashlib.sha256(
+        b"\0".join((schema.encode(), source.encode(), _pytest.__version__.encode(), importlib.util.MAGIC_NUMBER))
+    ).hexdigest()
+
+
+def read_cache(fn, key):
+    try:
+        with open(get_cache_path(fn), "rb") as f:
+            cached_key, code, dispatch = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if cached_key == key:
+        return code, dispatch
+
+
+def write_cache(fn, key, code, dispatch):
+    cache_path = get_cache_path(fn)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # Write to a temporary file first so that concurrent validations never read a partial cache
+        temp_path = f"{cache_path}.{os.getpid()}"
+        with open(temp_path, "wb") as f:
+            marshal.dump((key, code, dispatch), f)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        pass
+
+
+def get_dispatch(schema, rules):
+    S = ifcopenshell.ifcopenshell_wrapper.schema_by_name(schema)
+    subtypes = collections.defaultdict(list)
+    for d in S.declarations():
+        if isinstance(d, ifcopenshell.ifcopenshell_wrapper.type_declaration):
+            if isinstance(
+                d.declared_type(), ifcopenshell.ifcopenshell_wrapper.named_type
+            ):
+                subtypes[d.declared_type().declared_type().name()].append(d.name())
+
+    dispatch = collections.defaultdict(list)
+    for r in rules:
+        if r.SCOPE == "type":
+
+            def visit(nm):
+                dispatch[nm].append(r.__name__)
+                for nm2 in subtypes[nm]:
+                    visit(nm2)
+
+            visit(r.TYPE_NAME)
+    return dict(dispatch)
+
+
+@functools.lru_cache(maxsize=None)
+def load_rules(schema, fn, source):
+    """Compiles the rules of a schema, and the lookup table of type rules
+
+    Compiling the rules involves parsing, rewriting the asserts of and
+    compiling a very large module, so the result is cached in memory and on
+    disk in a ``__pycache__`` folder next to the rules.
+
+    :return: A tuple of the list of rule classes and a dictionary of type
+        names to the type rule classes that apply to them.
+    """
+    key = get_cache_key(schema, source)
+    cached = read_cache(fn, key)
+    if cached:
+        code, dispatch = cached
     else:
-        # when using the normal text logger the instance is appended to the method
-        pre_annotate_instance = lambda instance: None
-        post_annotate_instance = lambda instance: instance
-        pre_annotate_attribute = lambda attribute: None
-        post_annotate_attribute = lambda attribute: attribute
+        from _pytest import assertion
 
-    orig = ifcopenshell.settings.unpack_non_aggregate_inverses
-    ifcopenshell.settings.unpack_non_aggregate_inverses = True
+        a = ast.parse(source)
+        assertion.rewrite.rewrite_asserts(mod=a, source=source)
+        code = compile(a, f"{schema}.py", "exec")
+        dispatch = None
+
+    scope = {}
+    exec(code, scope)
+    rules = list(filter(lambda x: hasattr(x, "SCOPE"), scope.values()))
+
+    if dispatch is None:
+        dispatch = get_dispatch(schema, rules)
+        write_cache(fn, key, code, dispatch)
 
-    fn = os.path.join(os.path.dirname(__file__), "rules", f"{f.schema}.py")
+    D = collections.defaultdict(list, {k: [scope[name] for name in v] for k, v in dispatch.items()})
+    return rules, D
+
+
+def get_source(schema):
+    fn = os.path.join(os.path.dirname(__file__), "rules", f"{schema}.py")
     try:
         source = open(fn, "r").read()
     except FileNotFoundError as e:
@@ -90,27 +172,50 @@ def run(f, logger):
         import subprocess
 
         current_dir_files = {fn.lower(): fn for fn in os.listdir('.')}
-        schema_name = str(f.schema).split(' ')[-1].lower()
+        schema_name = str(schema).split(' ')[-1].lower()
         schema_path = current_dir_files.get(schema_name + '.exp')
         fn = schema_name + '.py'
         if not os.path.exists(fn):
             subprocess.run([sys.executable, "-m", "ifcopenshell.express.rule_compiler", schema_path, fn], check=True)
             time.sleep(1.)
         source = open(fn, "r").read()
+    return fn, source
 
-    a = ast.parse(source)
-    assertion.rewrite.rewrite_asserts(mod=a, source=source)
-    cd = compile(a, f"{f.schema}.py", "exec")
-    scope = {}
-    exec(cd, scope)
-    S = ifcopenshell.ifcopenshell_wrapper.schema_by_name(f.schema)
 
-    rules = list(filter(lambda x: hasattr(x, "SCOPE"), scope.values()))
+def run(f, logger, scopes=("file", "type", "entity"), instance_ids=None, entity_rules=None):
+    """Checks the global, type and entity rules of the schema of a file
+
+    :param scopes: Which kinds of rules to check
+    :param instance_ids: If set, type rules are only checked for the
+        attribute values of the instances with these ids.
+    :param entity_rules: If set, only entity rules with these class names are
+        checked.
+    """
+    if hasattr(logger, "set_instance"):
+        # when using the json logger, we notify it of the relevant instance
+        pre_annotate_instance = lambda instance: logger.set_state('instance', instance) if hasattr(logger, 'set_state') else None
+        post_annotate_instance = lambda instance: instance
+        pre_annotate_attribute = lambda attribute: logger.set_state('attribute', attribute) if hasattr(logger, 'set_state') else None
+        post_annotate_attribute = lambda attribute: None
+    else:
+        # when using the normal text logger the instance is appended to the method
+        pre_annotate_instance = lambda instance: None
+        post_annotate_instance = lambda instance: instance
+        pre_annotate_attribute = lambda attribute: None
+        post_annotate_attribute = lambda attribute: attribute
+
+    orig = ifcopenshell.settings.unpack_non_aggregate_inverses
+    ifcopenshell.settings.unpack_non_aggregate_inverses = True
+
+    fn, source = get_source(f.schema)
+    rules, D = load_rules(f.schema, fn, source)
+    source_lines = source.split("\n")
+    S = ifcopenshell.ifcopenshell_wrapper.schema_by_name(f.schema)
 
     if hasattr(logger, 'set_state'):
         logger.set_state('type', 'global_rule')
 
-    for R in [r for r in rules if r.SCOPE == "file"]:
+    for R in [r for r in rules if r.SCOPE == "file" and "file" in scopes]:
         try:
             R()(f)
         except Exception as e:
@@ -120,7 +225,7 @@ def run(f, logger):
                 str(
                     error(
                         post_annotate_attribute(R.__name__),
-                        reverse_compile(source.split("\n")[ln - 1]),
+                        reverse_compile(source_lines[ln - 1]),
                         reverse_compile(e.args[0]),
                     )
                 )
@@ -129,27 +234,6 @@ def run(f, logger):
     if hasattr(logger, 'set_state'):
         logger.set_state('type', 'simpletype_rule')
 
-    types = {}
-    subtypes = collections.defaultdict(list)
-    for d in S.declarations():
-        if isinstance(d, ifcopenshell.ifcopenshell_wrapper.type_declaration):
-            types[d.name()] = d
-            if isinstance(
-                d.declared_type(), ifcopenshell.ifcopenshell_wrapper.named_type
-            ):
-                subtypes[d.declared_type().declared_type().name()].append(d.name())
-
-    D = collections.defaultdict(list)
-    for r in rules:
-        if r.SCOPE == "type":
-
-            def visit(nm):
-                D[nm].append(r)
-                for nm2 in subtypes[nm]:
-                    visit(nm2)
-
-            visit(r.TYPE_NAME)
-
     def type_name(ty):
         if isinstance(ty, ifcopenshell.ifcopenshell_wrapper.named_type):
             return type_name(ty.declared_type())
@@ -177,7 +261,7 @@ def run(f, logger):
                         str(
                             error(
                                 post_annotate_attribute(f"{R.TYPE_NAME}.{R.RULE_NAME}"),
-                                reverse_compile(source.split("\n")[ln - 1]),
+                                reverse_compile(source_lines[ln - 1]),
                                 reverse_compile(e.args[0]),
                                 post_annotate_instance(instance),
                             )
@@ -212,7 +296,14 @@ def run(f, logger):
                 # unpack the type instance
                 check(value[0], S.declaration_by_name(value.is_a()), instance=inst)
 
-    for inst in f:
+    if "type" not in scopes:
+        instances = []
+    elif instance_ids is None:
+        instances = f
+    else:
+        instances = (f.by_id(i) for i in instance_ids)
+
+    for inst in instances:
         values = list(inst)
         entity = S.declaration_by_name(inst.is_a())
         attrs = entity.all_attributes()
@@ -228,7 +319,9 @@ def run(f, logger):
     if hasattr(logger, 'set_state'):
         logger.set_state('type', 'entity_rule')
 
-    for R in [r for r in rules if r.SCOPE == "entity"]:
+    for R in [r for r in rules if r.SCOPE == "entity" and "entity" in scopes]:
+        if entity_rules is not None and R.__name__ not in entity_rules:
+            continue
         for inst in f.by_type(R.TYPE_NAME):
             try:
                 R()(inst)
@@ -240,7 +333,7 @@ def run(f, logger):
                     str(
                         error(
                             post_annotate_attribute(f"{R.TYPE_NAME}.{R.RULE_NAME}"),
-                            reverse_compile(source.split("\n")[ln - 1]),
+                            reverse_compile(source_lines[ln - 1]),
                             reverse_compile(e.args[0]),
                             post_annotate_instance(inst),
                         )
@@ -22,16 +22,24 @@ from __future__ import division
 from __future__ import print_function
 
 import os
+import sys
 from pathlib import Path
+import array
 import numbers
 import functools
 import zipfile
+from collections import namedtuple
 
 import ifcopenshell.util.element
 import ifcopenshell.util.file
 from . import ifcopenshell_wrapper
 from .entity_instance import entity_instance
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # No zstd support
+
 try:
     # Python 2
     basestring
@@ -40,34 +48,91 @@ except NameError:
     basestring = (str, bytes)
 
 
+reference = namedtuple("reference", ("id",))
+typed_value = namedtuple("typed_value", ("type", "value"))
+
+
+def get_value_size(value):
+    size = sys.getsizeof(value)
+    if isinstance(value, (tuple, list)):
+        size += sum(map(get_value_size, value))
+    return size
+
+
 class Transaction:
+    """A journal of the changes made to a file, which can be rolled back and committed again
+
+    Operations are stored as compact tuples of one of these forms:
+
+    - ``("create", id)``
+    - ``("edit", id, attribute_index, old_value, new_value)``
+    - ``("delete", id, ifc_class, values, inverses)``
+    - ``("batch_delete", inverses)``
+
+    Inverses are tuples of ``(inverse_id, attribute_index, old_value)``.
+    Values are the raw attribute values, except that entity instances are
+    stored as a ``reference`` to their id, or as a ``typed_value`` if they are
+    not rooted. Created instances are only serialised lazily, when they are
+    rolled back, as that is the only time their values are needed.
+    """
+
     def __init__(self, ifc_file):
         self.file = ifc_file
         self.operations = []
+        self.created = {}
+        self.size = None
         self.is_batched = False
         self.batch_delete_index = 0
         self.batch_delete_ids = set()
         self.batch_inverses = []
 
     def serialise_entity_instance(self, element):
-        info = element.get_info()
-        for key, value in info.items():
-            info[key] = self.serialise_value(element, value)
-        return info
-
-    def serialise_value(self, element, value):
-        return element.walk(
-            lambda v: isinstance(v, entity_instance),
-            lambda v: {"id": v.id()} if v.id() else {"type": v.is_a(), "value": v.wrappedValue},
-            value,
-        )
+        wrapped_data = element.wrapped_data
+        return element.is_a(), tuple(self.serialise_value(wrapped_data.get_argument(i)) for i in range(len(element)))
+
+    def serialise_value(self, value):
+        if isinstance(value, entity_instance):
+            value = value.wrapped_data
+        if isinstance(value, ifcopenshell_wrapper.entity_instance):
+            if value.id():
+                return reference(value.id())
+            return typed_value(value.is_a(), self.serialise_value(value.get_argument(0)))
+        elif isinstance(value, (tuple, list)):
+            # Aggregates are homogeneous, so only aggregates of instances or of aggregates need to be walked
+            if value and isinstance(value[0], (tuple, list, entity_instance, ifcopenshell_wrapper.entity_instance)):
+                return tuple(map(self.serialise_value, value))
+            return tuple(value)
+        return value
+
+    def unserialise_value(self, value):
+        if isinstance(value, reference):
+            return self.file.by_id(value.id)
+        elif isinstance(value, typed_value):
+            return self.file.create_entity(value.type, self.unserialise_value(value.value))
+        elif isinstance(value, tuple):
+            if value and isinstance(value[0], tuple):
+                return tuple(map(self.unserialise_value, value))
+        return value
+
+    def create_entity(self, id, ifc_class, values):
+        e = self.file.create_entity(ifc_class, id=id)
+        for i, value in enumerate(values):
+            if value is None:
+                continue
+            try:
+                e[i] = self.unserialise_value(value)
+            except:
+                # Catch discrepancy where IfcOpenShell creates but doesn't allow editing of invalid values
+                pass
+        return e
 
-    def unserialise_value(self, element, value):
-        return element.walk(
-            lambda v: isinstance(v, dict),
-            lambda v: self.file.by_id(v["id"]) if v.get("id") else self.file.create_entity(v["type"], v["value"]),
-            value,
-        )
+    def restore_inverses(self, inverses):
+        for inverse_id, index, value in inverses:
+            self.file.by_id(inverse_id)[index] = self.unserialise_value(value)
+
+    def get_size(self):
+        """Estimates the memory used by the transaction in bytes"""
+        return get_value_size(self.operations) + get_value_size(list(self.created.values()))
 
     def batch(self):
         self.is_batched = True
@@ -78,7 +143,7 @@ class Transaction:
     def unbatch(self):
         for inverses in self.batch_inverses:
             if inverses:
-                self.operations.insert(self.batch_delete_index, {"action": "batch_delete", "inverses": inverses})
+                self.operations.insert(self.batch_delete_index, ("batch_delete", inverses))
         self.is_batched = False
         self.batch_delete_index = 0
         self.batch_delete_ids = set()
@@ -86,93 +151,67 @@ class Transaction:
 
     def store_create(self, element):
         if element.id():
-            self.operations.append({"action": "create", "value": self.serialise_entity_instance(element)})
+            self.operations.append(("create", element.id()))
 
     def store_edit(self, element, index, value):
         if element.id():
-            self.operations.append(
-                {
-                    "action": "edit",
-                    "id": element.id(),
-                    "index": index,
-                    "old": self.serialise_value(element, element[index]),
-                    "new": self.serialise_value(element, value),
-                }
-            )
+            old = self.serialise_value(element.wrapped_data.get_argument(index))
+            self.operations.append(("edit", element.id(), index, old, self.serialise_value(value)))
 
     def store_delete(self, element):
-        inverses = {}
+        inverses = ()
         if self.is_batched:
             if element.id() not in self.batch_delete_ids:
                 self.batch_inverses.append(self.get_element_inverses(element))
             self.batch_delete_ids.add(element.id())
         else:
             inverses = self.get_element_inverses(element)
-        self.operations.append(
-            {"action": "delete", "inverses": inverses, "value": self.serialise_entity_instance(element)}
-        )
+        self.operations.append(("delete", element.id(), *self.serialise_entity_instance(element), inverses))
 
     def get_element_inverses(self, element):
-        inverses = {}
-        for inverse in self.file.get_inverse(element):
-            inverse_references = []
-            for i, attribute in enumerate(inverse):
-                if ifcopenshell.util.element.has_element_reference(attribute, element):
-                    inverse_references.append((i, self.serialise_value(inverse, attribute)))
-            inverses[inverse.id()] = inverse_references
-        return inverses
+        wrapped_data = self.file.wrapped_data
+        inverses = wrapped_data.get_inverse(element.wrapped_data)
+        indices = wrapped_data.get_inverse_indices(element.wrapped_data)
+        results = {}
+        for inverse, index in zip(inverses, indices):
+            key = (inverse.id(), index)
+            if key not in results:
+                results[key] = (*key, self.serialise_value(inverse.get_argument(index)))
+        return tuple(results.values())
 
     def rollback(self):
-        for operation in self.operations[::-1]:
-            if operation["action"] == "create":
-                element = self.file.by_id(operation["value"]["id"])
+        for operation in reversed(self.operations):
+            action = operation[0]
+            if action == "create":
+                element = self.file.by_id(operation[1])
+                self.created[operation[1]] = self.serialise_entity_instance(element)
                 if hasattr(element, "GlobalId") and element.GlobalId is None:
                     # hack, otherwise ifcopenshell gets upset
                     element.GlobalId = "x"
                 self.file.remove(element)
-            elif operation["action"] == "edit":
-                element = self.file.by_id(operation["id"])
+            elif action == "edit":
+                element = self.file.by_id(operation[1])
                 try:
-                    element[operation["index"]] = self.unserialise_value(element, operation["old"])
+                    element[operation[2]] = self.unserialise_value(operation[3])
                 except:
                     # Catch discrepancy where IfcOpenShell creates but doesn't allow editing of invalid values
                     pass
-            elif operation["action"] == "delete":
-                e = self.file.create_entity(operation["value"]["type"], id=operation["value"]["id"])
-                for k, v in operation["value"].items():
-                    try:
-                        setattr(e, k, self.unserialise_value(e, v))
-                    except:
-                        # Catch discrepancy where IfcOpenShell creates but doesn't allow editing of invalid values
-                        pass
-                for inverse_id, data in operation["inverses"].items():
-                    inverse = self.file.by_id(inverse_id)
-                    for index, value in data:
-                        inverse[index] = self.unserialise_value(inverse, value)
-            elif operation["action"] == "batch_delete":
-                for inverse_id, data in operation["inverses"].items():
-                    inverse = self.file.by_id(inverse_id)
-                    for index, value in data:
-                        inverse[index] = self.unserialise_value(inverse, value)
+            elif action == "delete":
+                self.create_entity(*operation[1:4])
+                self.restore_inverses(operation[4])
+            elif action == "batch_delete":
+                self.restore_inverses(operation[1])
 
     def commit(self):
         for operation in self.operations:
-            if operation["action"] == "create":
-                e = self.file.create_entity(operation["value"]["type"], id=operation["value"]["id"])
-                for k, v in operation["value"].items():
-                    try:
-                        setattr(e, k, self.unserialise_value(e, v))
-                    except:
-                        # Catch discrepancy where IfcOpenShell creates but doesn't allow editing of invalid values
-                        pass
-            elif operation["action"] == "edit":
-                element = self.file.by_id(operation["id"])
-                element[operation["index"]] = self.unserialise_value(element, operation["new"])
-            elif operation["action"] == "delete":
-                element = self.file.by_id(operation["value"]["id"])
-                self.file.remove(element)
-            elif operation["action"] == "batch_delete":
-                pass
+            action = operation[0]
+            if action == "create":
+                self.create_entity(operation[1], *self.created[operation[1]])
+            elif action == "edit":
+                element = self.file.by_id(operation[1])
+                element[operation[2]] = self.unserialise_value(operation[4])
+            elif action == "delete":
+                self.file.remove(self.file.by_id(operation[1]))
 
 
 class file(object):
@@ -200,14 +239,38 @@ class file(object):
             args = map(ifcopenshell_wrapper.schema_by_name, args)
             self.wrapped_data = ifcopenshell_wrapper.file(*args)
         self.history_size = 64
+        self.history_memory_budget = None
         self.history = []
         self.future = []
         self.transaction = None
+        self.transaction_listeners = {}
 
     def set_history_size(self, size):
         self.history_size = size
+        self.trim_history()
+
+    def set_history_memory_budget(self, budget):
+        """Limit the undo history by the memory it uses, rather than by the number of transactions
+
+        The oldest transactions are forgotten when the estimated memory used
+        by the history exceeds the budget. The history size still applies.
+
+        :param budget: The budget in bytes, or None for no budget
+        :type budget: int,None
+        """
+        self.history_memory_budget = budget
+        self.trim_history()
+
+    def trim_history(self):
         while len(self.history) > self.history_size:
             self.history.pop(0)
+        if self.history_memory_budget is not None:
+            for transaction in self.history:
+                if transaction.size is None:
+                    transaction.size = transaction.get_size()
+            total_size = sum(t.size for t in self.history)
+            while self.history and total_size > self.history_memory_budget:
+                total_size -= self.history.pop(0).size
 
     def begin_transaction(self):
         if self.history_size:
@@ -216,15 +279,15 @@ class file(object):
     def end_transaction(self):
         if self.transaction:
             self.history.append(self.transaction)
-            if len(self.history) > self.history_size:
-                self.history.pop(0)
+            self.trim_history()
             self.future = []
             self.transaction = None
 
     def discard_transaction(self):
-        if self.transaction:
-            self.transaction.rollback()
-        self.transaction = None
+        transaction, self.transaction = self.transaction, None
+        if transaction:
+            transaction.rollback()
+            self.run_transaction_listeners("discard")
 
     def undo(self):
         if not self.history:
@@ -232,6 +295,7 @@ class file(object):
         transaction = self.history.pop()
         transaction.rollback()
         self.future.append(transaction)
+        self.run_transaction_listeners("undo")
 
     def redo(self):
         if not self.future:
@@ -239,6 +303,30 @@ class file(object):
         transaction = self.future.pop()
         transaction.commit()
         self.history.append(transaction)
+        self.run_transaction_listeners("redo")
+
+    def add_transaction_listener(self, name, callback):
+        """Add a callback which is run after a transaction is undone, redone, or discarded
+
+        :param name: A unique name of the listener
+        :type name: str
+        :param callback: A function which receives the file and the action,
+            which is either "undo", "redo", or "discard".
+        :type callback: callable
+        """
+        self.transaction_listeners[name] = callback
+
+    def remove_transaction_listener(self, name):
+        """Remove a transaction listener
+
+        :param name: The name of the listener
+        :type name: str
+        """
+        self.transaction_listeners.pop(name, None)
+
+    def run_transaction_listeners(self, action):
+        for listener in list(self.transaction_listeners.values()):
+            listener(self, action)
 
     def create_entity(self, type, *args, **kwargs):
         """Create a new IFC entity in the file.
@@ -364,6 +452,67 @@ class file(object):
             return [entity_instance(e, self) for e in self.wrapped_data.by_type(type)]
         return [entity_instance(e, self) for e in self.wrapped_data.by_type_excl_subtypes(type)]
 
+    def iter_type(self, type, include_subtypes=True, batch_size=1000):
+        """Lazily iterate over IFC objects filtered by IFC Type
+
+        Unlike :meth:`by_type`, this doesn't build a list of every wrapped
+        entity instance upfront. Only the ids of matching instances are
+        fetched, and instances are wrapped on demand as you iterate. This is
+        useful for streaming through very large models.
+
+        :param type: The case insensitive type of IFC class to return.
+        :type type: string
+        :param include_subtypes: Whether or not to return subtypes of the IFC class
+        :type include_subtypes: bool
+        :param batch_size: How many instances to wrap at a time
+        :type batch_size: int
+        :returns: A generator of ifcopenshell.entity_instance.entity_instance objects
+        :rtype: generator
+
+        Example:
+
+        .. code:: python
+
+            for wall in f.iter_type("IfcWall"):
+                print(wall.Name)
+        """
+        return self.iter_ids(self.get_type_ids(type, include_subtypes), batch_size)
+
+    def iter_all(self, batch_size=1000):
+        """Lazily iterate over all IFC objects in the file
+
+        :param batch_size: How many instances to wrap at a time
+        :type batch_size: int
+        :returns: A generator of ifcopenshell.entity_instance.entity_instance objects
+        :rtype: generator
+        """
+        return self.iter_ids(array.array("I", self.wrapped_data.entity_names()), batch_size)
+
+    def count_type(self, type, include_subtypes=True):
+        """Count the IFC objects of an IFC Type without wrapping any of them
+
+        :param type: The case insensitive type of IFC class to count.
+        :type type: string
+        :param include_subtypes: Whether or not to count subtypes of the IFC class
+        :type include_subtypes: bool
+        :returns: The number of instances
+        :rtype: int
+        """
+        return len(self.get_type_ids(type, include_subtypes))
+
+    def get_type_ids(self, type, include_subtypes=True):
+        if hasattr(self.wrapped_data, "by_type_ids"):
+            return array.array("I", self.wrapped_data.by_type_ids(type, include_subtypes))
+        # Older builds of the wrapper can only return instances
+        if include_subtypes:
+            return array.array("I", [e.id() for e in self.wrapped_data.by_type(type)])
+        return array.array("I", [e.id() for e in self.wrapped_data.by_type_excl_subtypes(type)])
+
+    def iter_ids(self, ids, batch_size):
+        by_id = self.wrapped_data.by_id
+        for i in range(0, len(ids), batch_size):
+            yield from [entity_instance(by_id(id), self) for id in ids[i : i + batch_size]]
+
     def traverse(self, inst, max_levels=None, breadth_first=False):
         """Get a list of all referenced instances for a particular instance including itself
 
@@ -449,20 +598,25 @@ class file(object):
         return self.wrapped_data.unbatch()
 
     def __iter__(self):
-        return iter(self[id] for id in self.wrapped_data.entity_names())
+        return self.iter_all()
 
     def write(self, path: "os.PathLike | str", format=None, zipped=False) -> None:
         """Write ifc model to file.
 
-        :param format: Force use of a specific format. Guessed from file name if None.
+        :param format: Force use of a specific format. Guessed from file name if None.
         Supported formats : .ifc, .ifcXML, .ifcZIP (equivalent to format=".ifc" with zipped=True)
+        and .ifcZST (a zstd compressed .ifc, which requires the zstandard package)
         For zipped .ifcXML use format=".ifcXML" with zipped=True
-        :param zipped: zip the file after it is written
+        :param zipped: zip the file as it is written
+
+        Zipped and zstd compressed .ifc files are compressed as they are
+        serialised, so no uncompressed copy of the model is written to disk.
 
         Examples:
         >>> model.write("path/to/model.ifc")
         >>> model.write("path/to/model.ifcXML")
         >>> model.write("path/to/model.ifcZIP")
+        >>> model.write("path/to/model.ifc.zst")
         >>> model.write("path/to/model.ifcZIP", format=".ifcXML", zipped=True)
         >>> model.write("path/to/model.anyextension", format=".ifcXML")
         """
@@ -474,6 +628,7 @@ class file(object):
             serializer = ifcopenshell_wrapper.XmlSerializer(self, str(path))
             serializer.finalize()
             if zipped:
+                # The XML serializer can only write to a path, so it is zipped afterwards
                 unzipped_path = path.with_suffix(format)
                 path.rename(unzipped_path)
                 with zipfile.ZipFile(path, "w") as zip_file:
@@ -482,14 +637,54 @@ class file(object):
             return
         if format == ".ifcZIP":
             return self.write(path, ".ifc", zipped=True)
-        self.wrapped_data.write(str(path))
+        if format == ".ifcZST":
+            # Check before opening, so that an existing file isn't truncated
+            if zstandard is None:
+                raise ImportError("Writing .ifcZST files requires the zstandard package")
+            with open(path, "wb") as f:
+                with zstandard.ZstdCompressor().stream_writer(f) as stream:
+                    self.write_spf(stream)
+            return
         if zipped:
-            unzipped_path = path.with_suffix(format)
-            path.rename(unzipped_path)
-            with zipfile.ZipFile(path, "w") as zip_file:
-                zip_file.write(unzipped_path, unzipped_path.name, compress_type=zipfile.ZIP_DEFLATED)
-                unzipped_path.unlink()
-        return
+            with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+                with zip_file.open(path.with_suffix(format).name, "w", force_zip64=True) as stream:
+                    self.write_spf(stream)
+            return
+        self.wrapped_data.write(str(path))
+
+    def write_spf(self, stream, batch_size=10000) -> None:
+        """Serialise the model as an IFC-SPF into a binary stream
+
+        Instances are serialised and written in batches, so the model is never
+        held in memory as a single string. This is useful for writing into
+        compressing streams, sockets, etc.
+
+        :param stream: A binary file-like object with a write() method
+        :param batch_size: How many instances to serialise at a time
+        :type batch_size: int
+
+        Example:
+
+        .. code:: python
+
+            with gzip.open("model.ifc.gz", "wb") as stream:
+                model.write_spf(stream)
+        """
+        header = self.wrapped_data.header
+        stream.write(
+            "ISO-10303-21;\nHEADER;\n{};\n{};\n{};\nENDSEC;\nDATA;\n".format(
+                header.file_description.toString(True),
+                header.file_name.toString(True),
+                header.file_schema.toString(True),
+            ).encode("utf-8")
+        )
+        by_id = self.wrapped_data.by_id
+        ids = sorted(self.wrapped_data.entity_names())
+        for i in range(0, len(ids), batch_size):
+            lines = [by_id(id).to_string(True) for id in ids[i : i + batch_size]]
+            lines.append("")
+            stream.write(";\n".join(lines).encode("utf-8"))
+        stream.write(b"ENDSEC;\nEND-ISO-10303-21;\n")
 
     @staticmethod
     def from_string(s):
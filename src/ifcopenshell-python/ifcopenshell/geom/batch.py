@@ -0,0 +1,275 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Batches of tessellated shapes packed into NumPy arrays
+
+Converting the vertex and face tuples of every shape yielded by a geometry
+iterator into lists or arrays one at a time is a significant part of the cost
+of processing a large model. A :class:`ShapeBatch` instead packs many shapes
+into a handful of contiguous arrays in a single copy, which can then be
+processed with vectorised NumPy operations, or handed to other processes
+through shared memory.
+
+Batches are usually created by :meth:`ifcopenshell.geom.iterator.iter_batches`
+or :func:`ifcopenshell.geom.iterate_arrays`.
+"""
+
+import itertools
+import numpy as np
+from multiprocessing import shared_memory
+
+IDENTITY = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0)
+ARRAYS = ("ids", "matrices", "vert_offsets", "face_offsets", "verts", "normals", "faces", "material_ids")
+
+
+class ShapeBatch:
+    """Tessellated shapes packed into contiguous NumPy arrays
+
+    For a batch of ``n`` shapes with ``v`` vertices and ``f`` triangles in
+    total, the arrays are:
+
+    - ``ids``: (n,) int64 Step ids of the elements
+    - ``matrices``: (n, 4, 4) float64 placement matrices of the elements
+    - ``vert_offsets``: (n + 1,) int64, where the vertices of shape ``i`` are
+      ``verts[vert_offsets[i]:vert_offsets[i + 1]]``
+    - ``face_offsets``: (n + 1,) int64, likewise for ``faces`` and
+      ``material_ids``
+    - ``verts``: (v, 3) float64 vertices in the local coordinates of each
+      element
+    - ``normals``: (v, 3) float64 vertex normals, which are NaN for shapes
+      without normals
+    - ``faces``: (f, 3) int64 triangles. Indices point into the concatenated
+      ``verts`` array, not the vertices of each shape.
+    - ``material_ids``: (f,) int64 indices into ``materials``, or -1 if the
+      triangle has no material
+
+    ``guids`` and ``materials`` are lists with one item per shape and one item
+    per material respectively.
+
+    Example:
+
+    .. code:: python
+
+        for batch in ifcopenshell.geom.iterate_arrays(settings, model, batch_size=1000):
+            vertices = batch.get_placed_vertices()
+            for i, step_id in enumerate(batch.ids):
+                print(step_id, vertices[batch.vert_offsets[i] : batch.vert_offsets[i + 1]].min(axis=0))
+    """
+
+    def __init__(self, arrays, guids=None, materials=None, shm=None):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.guids = guids or [None] * len(self.ids)
+        self.materials = materials or []
+        self.shm = shm
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get_vertices(self, i):
+        """Gets the vertices of a shape in local coordinates
+
+        :param i: The index of the shape in the batch
+        :type i: int
+        :return: A (v, 3) array
+        :rtype: np.ndarray
+        """
+        return self.verts[self.vert_offsets[i] : self.vert_offsets[i + 1]]
+
+    def get_faces(self, i):
+        """Gets the triangles of a shape, indexing into its own vertices
+
+        :param i: The index of the shape in the batch
+        :type i: int
+        :return: A (f, 3) array
+        :rtype: np.ndarray
+        """
+        return self.faces[self.face_offsets[i] : self.face_offsets[i + 1]] - self.vert_offsets[i]
+
+    def get_placed_vertices(self):
+        """Gets the vertices of all shapes, transformed by their matrices
+
+        :return: A (v, 3) array
+        :rtype: np.ndarray
+        """
+        shapes = np.repeat(np.arange(len(self.ids)), np.diff(self.vert_offsets))
+        matrices = self.matrices[shapes]
+        return np.einsum("nij,nj->ni", matrices[:, :3, :3], self.verts) + matrices[:, :3, 3]
+
+    def share(self):
+        """Gets a handle to a shared batch which can be sent to another process
+
+        The handle is small and picklable. Materials are not shared, as they
+        belong to the process which created them, so only their names are
+        included in the handle.
+
+        :return: A handle to pass to :meth:`from_shared`
+        :rtype: tuple
+        """
+        if self.shm is None:
+            raise ValueError("Only batches created with shared=True can be shared")
+        layout = {name: (getattr(self, name).shape, getattr(self, name).dtype.str) for name in ARRAYS}
+        return self.shm.name, layout, self.guids, [getattr(m, "name", None) for m in self.materials]
+
+    @classmethod
+    def from_shared(cls, handle):
+        """Attaches to a shared batch created in another process
+
+        Nothing is copied. Call :meth:`close` when the batch is no longer
+        needed.
+
+        :param handle: The handle returned by :meth:`share`
+        :type handle: tuple
+        :return: The attached batch
+        :rtype: ShapeBatch
+        """
+        name, layout, guids, materials = handle
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(get_shared_arrays(shm, layout), guids, materials, shm)
+
+    def close(self):
+        """Closes this process' access to the shared memory of the batch"""
+        if self.shm is not None:
+            for name in ARRAYS:
+                setattr(self, name, None)
+            self.shm.close()
+
+    def unlink(self):
+        """Closes and frees the shared memory of the batch
+
+        This must be called once by the process which created the batch, after
+        every other process has closed it.
+        """
+        if self.shm is not None:
+            shm = self.shm
+            self.close()
+            shm.unlink()
+            self.shm = None
+
+
+def pack_shapes(shapes, shared=False):
+    """Packs shapes into a batch of contiguous arrays
+
+    :param shapes: Shapes with a transformation, such as those yielded by a
+        geometry iterator, or plain geometries. Plain geometries have an id of
+        0 and an identity matrix.
+    :type shapes: list
+    :param shared: Whether to allocate the arrays in shared memory, so that
+        the batch can be passed to other processes using
+        :meth:`ShapeBatch.share`.
+    :type shared: bool
+    :return: The batch
+    :rtype: ShapeBatch
+    """
+    n = len(shapes)
+    ids = np.zeros(n, dtype=np.int64)
+    guids = [None] * n
+    matrices = []
+    geometries = []
+    materials = []
+    total_verts = np.zeros(n, dtype=np.int64)
+    total_faces = np.zeros(n, dtype=np.int64)
+    material_offsets = np.zeros(n, dtype=np.int64)
+    for i, shape in enumerate(shapes):
+        geometry = getattr(shape, "geometry", shape)
+        geometries.append(geometry)
+        total_verts[i] = len(geometry.verts) // 3
+        total_faces[i] = len(geometry.faces) // 3
+        material_offsets[i] = len(materials)
+        materials.extend(getattr(geometry, "materials", None) or ())
+        if hasattr(shape, "transformation"):
+            ids[i] = getattr(shape, "id", 0)
+            guids[i] = getattr(shape, "guid", None)
+            matrices.append(shape.transformation.matrix.data)
+        else:
+            matrices.append(IDENTITY)
+
+    vert_count = int(total_verts.sum())
+    face_count = int(total_faces.sum())
+    vert_offsets = np.concatenate(([0], np.cumsum(total_verts)))
+    face_offsets = np.concatenate(([0], np.cumsum(total_faces)))
+
+    # Copy every buffer in one go, rather than allocating arrays per shape
+    chain = itertools.chain.from_iterable
+    verts = np.fromiter(chain(g.verts for g in geometries), dtype=np.float64, count=3 * vert_count)
+    faces = np.fromiter(chain(g.faces for g in geometries), dtype=np.int64, count=3 * face_count)
+    normals = np.fromiter(
+        chain(get_normals(g, 3 * c) for g, c in zip(geometries, total_verts)), dtype=np.float64, count=3 * vert_count
+    )
+    material_ids = np.fromiter(
+        chain(get_material_ids(g, c) for g, c in zip(geometries, total_faces)), dtype=np.int64, count=face_count
+    )
+
+    # Offset indices into the concatenated arrays
+    face_shapes = np.repeat(np.arange(n), total_faces)
+    faces = faces.reshape(-1, 3) + vert_offsets[:-1][face_shapes][:, np.newaxis]
+    material_ids = np.where(material_ids >= 0, material_ids + material_offsets[face_shapes], -1)
+
+    # Transformation matrices are stored column major as 12 values, the last 3 being the translation
+    matrices = np.array(matrices, dtype=np.float64).reshape(n, 4, 3)
+    matrices = np.concatenate((matrices.transpose(0, 2, 1), np.tile([[[0.0, 0.0, 0.0, 1.0]]], (n, 1, 1))), axis=1)
+
+    arrays = {
+        "ids": ids,
+        "matrices": matrices,
+        "vert_offsets": vert_offsets,
+        "face_offsets": face_offsets,
+        "verts": verts.reshape(-1, 3),
+        "normals": normals.reshape(-1, 3),
+        "faces": faces,
+        "material_ids": material_ids,
+    }
+    shm = None
+    if shared:
+        arrays, shm = copy_to_shared_memory(arrays)
+    return ShapeBatch(arrays, guids, materials, shm)
+
+
+def get_normals(geometry, count):
+    normals = getattr(geometry, "normals", None)
+    if normals is not None and len(normals) == count:
+        return normals
+    return itertools.repeat(np.nan, count)
+
+
+def get_material_ids(geometry, count):
+    material_ids = getattr(geometry, "material_ids", None)
+    if material_ids is not None and len(material_ids) == count:
+        return material_ids
+    return itertools.repeat(-1, count)
+
+
+def copy_to_shared_memory(arrays):
+    layout = {name: (array.shape, array.dtype.str) for name, array in arrays.items()}
+    # SharedMemory can't be empty
+    shm = shared_memory.SharedMemory(create=True, size=max(1, sum(a.nbytes for a in arrays.values())))
+    shared_arrays = get_shared_arrays(shm, layout)
+    for name, array in arrays.items():
+        shared_arrays[name][...] = array
+    return shared_arrays, shm
+
+
+def get_shared_arrays(shm, layout):
+    arrays = {}
+    offset = 0
+    for name in ARRAYS:
+        shape, dtype = layout[name]
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        arrays[name] = array
+        offset += array.nbytes
+    return arrays
@@ -0,0 +1,393 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Content addressed cache of tessellated geometry
+
+Tessellations are cached by a digest of everything that determines them,
+rather than by file path and Step id: the representation subgraph of the
+element, the styles of its items, its materials, its openings and the geometry
+settings. The digests are computed by :mod:`ifcopenshell.util.fingerprint`, so
+they ignore Step ids. This means a cache can be shared by any number of models
+and tools, and an element whose geometry didn't change between two revisions of
+a model is never tessellated twice. Element instances which share a mapped
+representation also share a single cache entry.
+
+Entries are stored as one file each in a directory. Writes are atomic and
+readers tolerate entries disappearing, so several processes may safely use the
+same directory at once. When the directory grows beyond its size budget, the
+least recently used entries are evicted.
+
+Example:
+
+.. code:: python
+
+    cache = ifcopenshell.geom.cache.open("/path/to/cache/", max_size=2 * 1024**3)
+    for shape in cache.iterate(settings, model, num_threads=8):
+        print(shape.id, ifcopenshell.util.shape.get_volume(shape.geometry))
+"""
+
+import io
+import os
+import json
+import hashlib
+import zipfile
+import tempfile
+import numpy as np
+import ifcopenshell
+import ifcopenshell.util.element
+import ifcopenshell.util.fingerprint
+import ifcopenshell.util.placement
+import ifcopenshell.util.unit
+
+CACHE_VERSION = 1
+MAX_SIZE = 1024**3
+# Evict down to this fraction of the budget, so that eviction doesn't run on every write
+EVICTION_RATIO = 0.9
+MATERIAL_ATTRIBUTES = (
+    "name",
+    "original_name",
+    "has_diffuse",
+    "diffuse",
+    "has_specular",
+    "specular",
+    "has_transparency",
+    "transparency",
+    "has_specularity",
+    "specularity",
+)
+
+
+def open(directory, max_size=MAX_SIZE):
+    """Opens a geometry cache, creating it if it doesn't exist
+
+    :param directory: The directory of the cache
+    :type directory: str
+    :param max_size: The disk budget of the cache in bytes
+    :type max_size: int
+    :return: The cache
+    :rtype: GeometryCache
+    """
+    return GeometryCache(directory, max_size)
+
+
+class GeometryCache:
+    """A directory of tessellations, keyed by the digest of their source
+
+    Use :func:`open` to create a cache.
+
+    :param directory: The directory of the cache
+    :type directory: str
+    :param max_size: The disk budget of the cache in bytes
+    :type max_size: int
+    """
+
+    def __init__(self, directory, max_size=MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.size = None
+        os.makedirs(directory, exist_ok=True)
+
+    def iterate(self, settings, ifc_file, elements=None, num_threads=1):
+        """Iterates over the shapes of elements, only tessellating cache misses
+
+        Cached shapes are yielded first, followed by the shapes of the geometry
+        iterator, which are stored in the cache as they are yielded. Cached
+        shapes have the same ``id``, ``guid``, ``geometry`` and
+        ``transformation`` attributes as the shapes of a geometry iterator, so
+        they can be passed to :mod:`ifcopenshell.util.shape` and
+        :func:`ifcopenshell.geom.batch.pack_shapes`. Cached geometries store
+        their data as NumPy arrays rather than tuples.
+
+        :param settings: The geometry settings
+        :type settings: ifcopenshell.geom.settings
+        :param ifc_file: The IFC model
+        :type ifc_file: ifcopenshell.file.file
+        :param elements: The products to process. Defaults to all products
+            with a representation.
+        :type elements: list[ifcopenshell.entity_instance.entity_instance],None
+        :param num_threads: The number of threads used to tessellate misses
+        :type num_threads: int
+        :return: A generator of shapes
+        :rtype: generator
+        """
+        if elements is None:
+            elements = [e for e in ifc_file.by_type("IfcProduct") if e.Representation]
+        settings_values = get_settings_values(settings)
+        settings_digest = get_settings_digest(settings_values)
+        hasher = ifcopenshell.util.fingerprint.Hasher(ignored_classes=["IfcOwnerHistory"])
+        unit_scale = 1.0
+        if not settings_values.get("CONVERT_BACK_UNITS", settings_values.get("convert-back-units")):
+            unit_scale = ifcopenshell.util.unit.calculate_unit_scale(ifc_file)
+        use_world_coords = settings_values.get("USE_WORLD_COORDS", settings_values.get("use-world-coords"))
+
+        keys = {}
+        misses = []
+        for element in elements:
+            if not use_world_coords and not is_local_placement(element.ObjectPlacement):
+                # Grid and linear placements aren't resolved here, so these are never cached
+                misses.append(element)
+                continue
+            key = self.get_key(element, settings_digest, hasher, use_world_coords, unit_scale)
+            geometry = self.get(key)
+            if geometry is None:
+                keys[element.id()] = key
+                misses.append(element)
+                continue
+            if use_world_coords:
+                matrix = np.eye(4)
+            else:
+                matrix = ifcopenshell.util.placement.get_local_placement(element.ObjectPlacement)
+                matrix[:3, 3] *= unit_scale
+            yield CachedShape(element, geometry, matrix)
+
+        if not misses:
+            return
+        iterator = ifcopenshell.geom.iterator(settings, ifc_file, num_threads, include=misses)
+        for shape in iterator:
+            key = keys.get(shape.id)
+            if key:
+                self.put(key, shape.geometry)
+            yield shape
+
+    def get_key(self, element, settings_digest, hasher, use_world_coords=False, unit_scale=1.0):
+        """Gets the cache key of the geometry of an element
+
+        :param element: An IfcProduct
+        :type element: ifcopenshell.entity_instance.entity_instance
+        :param settings_digest: The digest of the geometry settings, as
+            returned by :func:`get_settings_digest`
+        :type settings_digest: str
+        :param hasher: A hasher to reuse between elements of the same model
+        :type hasher: ifcopenshell.util.fingerprint.Hasher
+        :param use_world_coords: Whether the geometry is in world
+            coordinates, in which case the placement is part of the key
+        :type use_world_coords: bool
+        :param unit_scale: The scale of the length unit of the model, if the
+            geometry is converted to SI units. Models in different units then
+            never share geometry.
+        :type unit_scale: float
+        :return: A hexadecimal key
+        :rtype: str
+        """
+        representation = element.Representation
+        digests = [settings_digest, str(CACHE_VERSION), repr(unit_scale), element.is_a()]
+        digests.append(hasher.get_digest(representation))
+        if representation:
+            for item in element.wrapped_data.file.traverse(representation):
+                for style in getattr(item, "StyledByItem", None) or []:
+                    digests.append(hasher.get_digest(style))
+        for material in ifcopenshell.util.element.get_materials(element):
+            digests.append(hasher.get_digest(material))
+            for material_representation in getattr(material, "HasRepresentation", None) or []:
+                digests.append(hasher.get_digest(material_representation))
+        for rel in getattr(element, "HasOpenings", None) or []:
+            opening = rel.RelatedOpeningElement
+            digests.append(hasher.get_digest(opening.ObjectPlacement))
+            digests.append(hasher.get_digest(opening.Representation))
+        if use_world_coords:
+            digests.append(hasher.get_digest(element.ObjectPlacement))
+        return hasher.combine(*digests)
+
+    def get(self, key):
+        """Gets a cached geometry
+
+        :param key: The cache key
+        :type key: str
+        :return: The geometry, or None if it isn't cached
+        :rtype: CachedGeometry,None
+        """
+        path = self.get_path(key)
+        try:
+            with np.load(path) as data:
+                arrays = {k: data[k] for k in data.files}
+            # Mark the entry as recently used
+            os.utime(path)
+        except (OSError, ValueError, zipfile.BadZipFile):
+            # The entry is missing, was evicted by another process while being read, or is corrupt
+            return None
+        return CachedGeometry(arrays)
+
+    def put(self, key, geometry):
+        """Stores a geometry in the cache
+
+        :param key: The cache key
+        :type key: str
+        :param geometry: A geometry yielded by a geometry iterator
+        """
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        materials = [{a: getattr(m, a, None) for a in MATERIAL_ATTRIBUTES} for m in geometry.materials]
+        data = io.BytesIO()
+        np.savez(
+            data,
+            verts=np.asarray(geometry.verts, dtype=np.float64),
+            faces=np.asarray(geometry.faces, dtype=np.int64),
+            edges=np.asarray(geometry.edges, dtype=np.int64),
+            normals=np.asarray(geometry.normals, dtype=np.float64),
+            material_ids=np.asarray(geometry.material_ids, dtype=np.int64),
+            materials=np.array(json.dumps(materials, default=list)),
+        )
+        # Write to a temporary file and rename, so other processes never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data.getbuffer())
+            os.replace(temp_path, path)
+        except:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        if self.size is None:
+            self.size = self.get_size()
+        else:
+            self.size += data.getbuffer().nbytes
+        if self.size > self.max_size:
+            self.evict()
+
+    def get_path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.npz")
+
+    def get_entries(self):
+        entries = []
+        for subdirectory in os.scandir(self.directory):
+            if not subdirectory.is_dir():
+                continue
+            for entry in os.scandir(subdirectory.path):
+                if entry.name.endswith(".npz"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def get_size(self):
+        """Gets the total size of the cache on disk
+
+        :return: The size in bytes
+        :rtype: int
+        """
+        return sum(size for _, size, _ in self.get_entries())
+
+    def evict(self):
+        """Evicts the least recently used entries until the cache fits its budget"""
+        entries = sorted(self.get_entries())
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.size <= self.max_size * EVICTION_RATIO:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Another process evicted it first
+            self.size -= size
+
+    def clear(self):
+        """Removes every entry from the cache"""
+        for _, _, path in self.get_entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.size = 0
+
+
+class CachedGeometry:
+    """A geometry loaded from a cache
+
+    It has the same attributes as the geometry of a shape yielded by a
+    geometry iterator, except that they are flat NumPy arrays.
+    """
+
+    def __init__(self, arrays):
+        self.verts = arrays["verts"]
+        self.faces = arrays["faces"]
+        self.edges = arrays["edges"]
+        self.normals = arrays["normals"]
+        self.material_ids = arrays["material_ids"]
+        self.materials = [CachedMaterial(m) for m in json.loads(str(arrays["materials"]))]
+
+
+class CachedMaterial:
+    def __init__(self, attributes):
+        for name, value in attributes.items():
+            setattr(self, name, tuple(value) if isinstance(value, list) else value)
+
+
+class CachedTransformation:
+    def __init__(self, matrix):
+        # Stored column major as 12 values, the last 3 being the translation, just like a geometry iterator
+        self.matrix = CachedMatrix(tuple(matrix[:3, :4].T.flatten().tolist()))
+
+
+class CachedMatrix:
+    def __init__(self, data):
+        self.data = data
+
+
+class CachedShape:
+    def __init__(self, element, geometry, matrix):
+        self.id = element.id()
+        self.guid = getattr(element, "GlobalId", None)
+        self.geometry = geometry
+        self.transformation = CachedTransformation(matrix)
+
+
+def is_local_placement(placement):
+    return placement is None or placement.is_a("IfcLocalPlacement")
+
+
+def get_settings_values(settings):
+    """Gets the values of all geometry settings
+
+    :param settings: The geometry settings
+    :type settings: ifcopenshell.geom.settings
+    :return: A dictionary of setting names to values
+    :rtype: dict
+    """
+    values = {}
+    if hasattr(settings, "setting_names"):
+        for name in settings.setting_names():
+            try:
+                values[name] = settings.get_(name)
+            except RuntimeError:
+                pass  # The setting has no default and isn't set
+        return values
+    for name in dir(settings):
+        if name.isupper() and isinstance(getattr(settings, name), int):
+            try:
+                values[name] = settings.get(getattr(settings, name))
+            except RuntimeError:
+                pass  # Not a boolean setting
+    for getter in ("get_deflection_tolerance", "get_angular_tolerance", "context_ids"):
+        if hasattr(settings, getter):
+            values[getter] = getattr(settings, getter)()
+    return values
+
+
+def get_settings_digest(values):
+    """Gets a digest of geometry settings, to be used as part of a cache key
+
+    :param values: The values of the settings, as returned by
+        :func:`get_settings_values`
+    :type values: dict
+    :return: A hexadecimal digest
+    :rtype: str
+    """
+    data = json.dumps(values, sort_keys=True, default=repr).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=ifcopenshell.util.fingerprint.DIGEST_SIZE).hexdigest()
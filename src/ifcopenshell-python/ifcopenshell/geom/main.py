@@ -122,6 +122,32 @@ class iterator(ifcopenshell_wrapper.Iterator):
                 if not self.next():
                     break
 
+    def iter_batches(self, batch_size=1024, shared=False):
+        """Iterates over shapes packed into batches of NumPy arrays
+
+        See :class:`ifcopenshell.geom.batch.ShapeBatch` for the layout of a
+        batch. Only one batch of shapes is held in memory at a time.
+
+        :param batch_size: The maximum number of shapes in a batch
+        :type batch_size: int
+        :param shared: Whether to allocate batches in shared memory, so they
+            can be passed to other processes. The caller must unlink each
+            batch when done with it.
+        :type shared: bool
+        :return: A generator of batches
+        :rtype: generator
+        """
+        from . import batch
+
+        shapes = []
+        for shape in self:
+            shapes.append(shape)
+            if len(shapes) == batch_size:
+                yield batch.pack_shapes(shapes, shared=shared)
+                shapes = []
+        if shapes:
+            yield batch.pack_shapes(shapes, shared=shared)
+
 
 class tree(ifcopenshell_wrapper.tree):
     def __init__(self, file=None, settings=None):
@@ -230,6 +256,42 @@ def iterate(settings, file_or_filename, num_threads=1, include=None, exclude=Non
     yield from consume_iterator(it, with_progress=with_progress)
 
 
+def iterate_arrays(
+    settings, file_or_filename, num_threads=1, include=None, exclude=None, batch_size=1024, shared=False, cache=None
+):
+    """Iterates over the shapes of a model packed into batches of NumPy arrays
+
+    This is the batched equivalent of :func:`iterate`. Rather than converting
+    the geometry of each shape one at a time, shapes are packed into
+    contiguous arrays which can be processed with vectorised operations.
+
+    :param settings: The geometry settings
+    :type settings: ifcopenshell.geom.settings
+    :param file_or_filename: The model to process
+    :type file_or_filename: ifcopenshell.file.file,str
+    :param batch_size: The maximum number of shapes in a batch
+    :type batch_size: int
+    :param shared: Whether to allocate batches in shared memory, so they can
+        be passed to other processes. The caller must unlink each batch when
+        done with it.
+    :type shared: bool
+    :return: A generator of :class:`ifcopenshell.geom.batch.ShapeBatch`
+    :rtype: generator
+
+    Example:
+
+    .. code:: python
+
+        for batch in ifcopenshell.geom.iterate_arrays(settings, model, num_threads=8):
+            print(batch.ids, batch.get_placed_vertices().min(axis=0))
+    """
+    it = iterator(settings, file_or_filename, num_threads, include, exclude)
+    if cache:
+        hdf5_cache = serializers.hdf5(cache, settings)
+        it.set_cache(hdf5_cache)
+    yield from it.iter_batches(batch_size, shared=shared)
+
+
 def make_shape_function(fn):
     def entity_instance_or_none(e):
         return None if e is None else entity_instance(e)
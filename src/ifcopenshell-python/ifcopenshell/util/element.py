@@ -16,9 +16,14 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
+import weakref
+import collections
 import ifcopenshell
 
 
+pset_caches = weakref.WeakKeyDictionary()
+
+
 def get_pset(element, name, prop=None, should_inherit=True):
     """Retrieve a single property set or single property
 
@@ -44,6 +49,9 @@ def get_pset(element, name, prop=None, should_inherit=True):
         element = ifcopenshell.by_type("IfcWall")[0]
         psets_and_qtos = ifcopenshell.util.element.get_pset(element, "Pset_WallCommon")
     """
+    cache = get_pset_cache(element)
+    if cache:
+        return cache.get_pset(element, name, prop=prop, should_inherit=should_inherit)
     pset = None
     if element.is_a("IfcTypeObject"):
         for definition in element.HasPropertySets or []:
@@ -112,6 +120,9 @@ def get_psets(element, psets_only=False, qtos_only=False, should_inherit=True):
         qsets = ifcopenshell.util.element.get_psets(element, qtos_only=True)
         psets_and_qtos = ifcopenshell.util.element.get_psets(element)
     """
+    cache = get_pset_cache(element)
+    if cache:
+        return cache.get_psets(element, psets_only=psets_only, qtos_only=qtos_only, should_inherit=should_inherit)
     psets = {}
     if element.is_a("IfcTypeObject"):
         for definition in element.HasPropertySets or []:
@@ -140,6 +151,137 @@ def get_psets(element, psets_only=False, qtos_only=False, should_inherit=True):
     return psets
 
 
+def get_pset_cache(element):
+    ifc_file = element.wrapped_data.file
+    if ifc_file is not None:
+        return pset_caches.get(ifc_file)
+
+
+def invalidate_pset_cache(usecase_path, ifc_file, settings):
+    if ifc_file is not None and ifc_file in pset_caches:
+        pset_caches[ifc_file].invalidate()
+
+
+class PsetCache:
+    """Caches property set lookups of a file
+
+    Resolving property sets walks inverse relationships and rebuilds property
+    dictionaries on every call. When a cache is created for a file, it is
+    used automatically by :func:`get_pset` and :func:`get_psets`. The cache
+    is built lazily in a single sweep over all property and type
+    relationships, and property dictionaries are only built once per
+    property set.
+
+    The cache is invalidated whenever :mod:`ifcopenshell.api` runs a use
+    case, or a transaction is undone or redone. If you edit property sets
+    directly, call :meth:`invalidate` yourself.
+
+    Example:
+
+    .. code:: python
+
+        cache = ifcopenshell.util.element.PsetCache(model)
+        for wall in model.by_type("IfcWall"):
+            ifcopenshell.util.element.get_psets(wall) # Served from the cache
+        cache.unregister()
+    """
+
+    def __init__(self, ifc_file):
+        import ifcopenshell.api
+
+        self.file = ifc_file
+        self.invalidate()
+        pset_caches[ifc_file] = self
+        # Any use case may create, copy or remove property sets, directly or indirectly
+        ifcopenshell.api.add_post_listener("*", "PsetCache", invalidate_pset_cache)
+        ifc_file.add_transaction_listener("PsetCache", lambda ifc_file, action: self.invalidate())
+
+    def unregister(self):
+        """Stops the cache from being used and releases its memory"""
+        if pset_caches.get(self.file) is self:
+            del pset_caches[self.file]
+        self.file.remove_transaction_listener("PsetCache")
+        self.invalidate()
+
+    def invalidate(self):
+        self.occurrence_definitions = None
+        self.types = None
+        self.properties = {}
+
+    def build(self):
+        self.occurrence_definitions = {}
+        self.types = {}
+        for rel in self.file.by_type("IfcRelDefinesByProperties"):
+            definition = rel.RelatingPropertyDefinition
+            if not isinstance(definition, ifcopenshell.entity_instance):
+                continue  # IFC4 property set definition sets are not supported
+            for related_object in rel.RelatedObjects:
+                self.occurrence_definitions.setdefault(related_object.id(), []).append(definition)
+        for rel in self.file.by_type("IfcRelDefinesByType"):
+            for related_object in rel.RelatedObjects:
+                self.types.setdefault(related_object.id(), rel.RelatingType)
+
+    def get_definitions(self, element):
+        if element.is_a("IfcTypeObject"):
+            return element.HasPropertySets or []
+        elif element.is_a("IfcMaterialDefinition") or element.is_a("IfcProfileDef"):
+            return element.HasProperties or []
+        if self.occurrence_definitions is None:
+            self.build()
+        return self.occurrence_definitions.get(element.id(), [])
+
+    def get_type(self, element):
+        if element.is_a("IfcTypeObject"):
+            return
+        if self.types is None:
+            self.build()
+        return self.types.get(element.id())
+
+    def get_property_definition(self, definition):
+        props = self.properties.get(definition.id())
+        if props is None:
+            props = self.properties[definition.id()] = get_property_definition(definition)
+        # Callers are free to modify results, so they always receive a copy
+        return {k: v.copy() if isinstance(v, (list, dict)) else v for k, v in props.items()}
+
+    def get_pset(self, element, name, prop=None, should_inherit=True):
+        """Cached equivalent of :func:`ifcopenshell.util.element.get_pset`"""
+        if should_inherit:
+            element_type = self.get_type(element)
+            if element_type:
+                result = self.get_pset(element_type, name, prop, should_inherit=False)
+                if result:
+                    return result
+        for definition in self.get_definitions(element):
+            if definition.Name == name:
+                props = self.get_property_definition(definition)
+                return props.get(prop) if prop else props
+
+    def get_psets(self, element, psets_only=False, qtos_only=False, should_inherit=True):
+        """Cached equivalent of :func:`ifcopenshell.util.element.get_psets`"""
+        psets = {}
+        is_occurrence = not element.is_a("IfcTypeObject")
+        if element.is_a("IfcMaterialDefinition") or element.is_a("IfcProfileDef"):
+            if qtos_only:
+                return psets
+            psets_only = False
+            is_occurrence = False
+        elif is_occurrence and should_inherit:
+            element_type = self.get_type(element)
+            if element_type:
+                psets = self.get_psets(element_type, psets_only=psets_only, qtos_only=qtos_only, should_inherit=False)
+        for definition in self.get_definitions(element):
+            if psets_only and not definition.is_a("IfcPropertySet"):
+                continue
+            if qtos_only and not definition.is_a("IfcElementQuantity"):
+                continue
+            if is_occurrence:
+                psets.setdefault(definition.Name, {}).update(self.get_property_definition(definition))
+            else:
+                psets[definition.Name] = self.get_property_definition(definition)
+        return psets
+
+
 def get_property_definition(definition):
     if definition is not None:
         props = {}
@@ -767,35 +909,66 @@ def remove_deep2(ifc_file, element, also_consider=[], do_not_delete=[]):
     :type element: ifcopenshell.entity_instance.entity_instance
     """
     ifc_file.batch()
-    to_delete = set()
     subgraph = list(ifc_file.traverse(element, breadth_first=True))
     subgraph.extend(also_consider)
-    subgraph_set = set(subgraph)
-    subelement_queue = ifc_file.traverse(element, max_levels=1)
-    while subelement_queue:
-        subelement = subelement_queue.pop(0)
+    subgraph_ids = {e.id() for e in subgraph}
+    do_not_delete_ids = {e.id() for e in do_not_delete}
+
+    # Count how many distinct instances in the subgraph reference each instance
+    references = {}
+    internal_inverses = collections.Counter()
+    for subelement in subgraph:
+        if subelement.id() in references or not subelement.id():
+            continue
+        references[subelement.id()] = refs = [
+            r for r in ifc_file.wrapped_data.traverse(subelement.wrapped_data, 1)[1:] if r.id()
+        ]
+        internal_inverses.update(r.id() for r in refs)
+
+    def has_external_inverses(subelement):
+        # Fast path: the total includes duplicate references, so if it matches
+        # the internal count, every inverse must be within the subgraph.
+        total = ifc_file.wrapped_data.get_total_inverses(subelement)
+        if total == internal_inverses[subelement.id()]:
+            return False
+        return any(i.id() not in subgraph_ids for i in ifc_file.wrapped_data.get_inverse(subelement))
+
+    to_delete = set()
+    queue = collections.deque(e.wrapped_data for e in ifc_file.traverse(element, max_levels=1))
+    while queue:
+        subelement = queue.popleft()
         if (
-            subelement.id()
-            and subelement not in do_not_delete
-            and len(set(ifc_file.get_inverse(subelement)) - subgraph_set) == 0
+            not subelement.id()
+            or subelement.id() in to_delete
+            or subelement.id() in do_not_delete_ids
+            or has_external_inverses(subelement)
         ):
-            to_delete.add(subelement)
-            subelement_queue.extend(ifc_file.traverse(subelement, max_levels=1)[1:])
-            # See #3052. IfcOpenShell is extremely slow in removing elements if
-            # the element has an inverse, and that inverse references that
-            # element in a big list. The most common example is an
-            # IfcPolygonalFaceSet with a Faces attribute of tens of thousands
-            # of IfcIndexedPolygonalFace. In this situation, removing a
-            # IfcIndexedPolygonalFace will take very, very long. If we are
-            # going to delete an element (i.e. added to the to_delete set), we
-            # clear any large lists (10 is an arbitrary threshold) to prevent
-            # this issue.
-            for i, attribute in enumerate(subelement):
-                if isinstance(attribute, tuple) and len(attribute) > 10:
-                    subelement[i] = []
+            continue
+        to_delete.add(subelement.id())
+        queue.extend(references.get(subelement.id(), ()))
+        # See #3052. IfcOpenShell is extremely slow in removing elements if
+        # the element has an inverse, and that inverse references that
+        # element in a big list. The most common example is an
+        # IfcPolygonalFaceSet with a Faces attribute of tens of thousands
+        # of IfcIndexedPolygonalFace. In this situation, removing a
+        # IfcIndexedPolygonalFace will take very, very long. If we are
+        # going to delete an element (i.e. added to the to_delete set), we
+        # clear any large lists (10 is an arbitrary threshold) to prevent
+        # this issue. The internal inverse counts are then updated to match.
+        is_cleared = False
+        for i in range(len(subelement)):
+            attribute = subelement.get_argument(i)
+            if isinstance(attribute, tuple) and len(attribute) > 10:
+                ifc_file.by_id(subelement.id())[i] = []
+                is_cleared = True
+        if is_cleared:
+            internal_inverses.subtract(r.id() for r in references[subelement.id()])
+            internal_inverses.update(r.id() for r in ifc_file.wrapped_data.traverse(subelement, 1)[1:] if r.id())
     # We delete elements from subgraph in reverse order to allow batching to work
-    for subelement in filter(lambda e: e in to_delete, subgraph[::-1]):
-        ifc_file.remove(subelement)
+    for subelement in subgraph[::-1]:
+        if subelement.id() in to_delete:
+            to_delete.remove(subelement.id())
+            ifc_file.remove(subelement)
     ifc_file.unbatch()
 
 
@@ -853,36 +1026,54 @@ def copy_deep(ifc_file, element, exclude=None, exclude_callback=None, copied_ent
         copied_entity = copied_entities.get(element.id(), None)
         if copied_entity:
             return copied_entity
-    new = ifc_file.create_entity(element.is_a())
-    if element.id():
-        copied_entities[element.id()] = new
-    for i, attribute in enumerate(element):
-        if attribute is None:
+
+    def is_excluded(entity):
+        if exclude and any([entity.is_a(e) for e in exclude]):
+            return True
+        return bool(exclude_callback and exclude_callback(entity))
+
+    # Copies are created depth first in the order their originals are first
+    # referenced. Every reference to be copied is given a slot which is filled
+    # once its copy exists, then attributes are assigned in a second pass.
+    slots = [None]
+    copies = []
+    stack = [(element, 0)]
+    while stack:
+        original, slot = stack.pop()
+        if original.id() and original.id() in copied_entities:
+            slots[slot] = copied_entities[original.id()]
             continue
-        if isinstance(attribute, ifcopenshell.entity_instance):
-            if exclude and any([attribute.is_a(e) for e in exclude]):
-                pass
-            elif exclude_callback and exclude_callback(attribute):
-                pass
-            else:
-                attribute = copy_deep(ifc_file, attribute, exclude=exclude, copied_entities=copied_entities)
-        elif isinstance(attribute, tuple) and attribute and isinstance(attribute[0], ifcopenshell.entity_instance):
-            if exclude and any([attribute[0].is_a(e) for e in exclude]):
-                pass
-            elif exclude_callback and exclude_callback(attribute[0]):
-                pass
+        new = slots[slot] = ifc_file.create_entity(original.is_a())
+        if original.id():
+            copied_entities[original.id()] = new
+        attributes = []
+        children = []
+        for i, attribute in enumerate(original):
+            if attribute is None:
+                continue
+            if isinstance(attribute, ifcopenshell.entity_instance):
+                if not is_excluded(attribute):
+                    children.append((attribute, len(slots)))
+                    attributes.append((i, len(slots), True))
+                    slots.append(None)
+                    continue
+            elif isinstance(attribute, tuple) and attribute and isinstance(attribute[0], ifcopenshell.entity_instance):
+                if not is_excluded(attribute[0]):
+                    item_slots = list(range(len(slots), len(slots) + len(attribute)))
+                    children.extend(zip(attribute, item_slots))
+                    attributes.append((i, item_slots, True))
+                    slots.extend([None] * len(attribute))
+                    continue
+            attributes.append((i, attribute, False))
+        copies.append((new, attributes))
+        stack.extend(reversed(children))
+
+    for new, attributes in copies:
+        for i, attribute, is_copied in attributes:
+            if new.attribute_name(i) == "GlobalId":
+                new[i] = ifcopenshell.guid.new()
+            elif is_copied:
+                new[i] = [slots[s] for s in attribute] if isinstance(attribute, list) else slots[attribute]
             else:
-                attribute = list(attribute)
-                for j, item in enumerate(attribute):
-                    attribute[j] = copy_deep(
-                        ifc_file,
-                        item,
-                        exclude=exclude,
-                        exclude_callback=exclude_callback,
-                        copied_entities=copied_entities,
-                    )
-        if new.attribute_name(i) == "GlobalId":
-            new[i] = ifcopenshell.guid.new()
-        else:
-            new[i] = attribute
-    return new
+                new[i] = attribute
+    return slots[0]
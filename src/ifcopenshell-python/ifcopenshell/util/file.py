@@ -25,3 +25,5 @@ def guess_format(path: Path) -> "str | None":
         return ".ifcZIP"
     if path.suffix.lower() in (".ifcxml", ".xml"):
         return ".ifcXML"
+    if path.suffix.lower() == ".ifczst" or path.name.lower().endswith(".ifc.zst"):
+        return ".ifcZST"
@@ -0,0 +1,146 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Stable content digests of instance graphs
+
+A digest summarises an instance and everything it references through its
+forward attributes. Step ids are normalised away, so the same geometry,
+placement or property set has the same digest in two revisions of a model even
+if the authoring tool renumbered every instance, and two identical but separate
+subgraphs in one model share a digest.
+
+Digests are computed Merkle-style: the digest of an instance is derived from
+its class, its attribute values and the digests of the instances it references.
+Every instance is therefore only hashed once, no matter how many instances
+share it.
+"""
+
+import hashlib
+import ifcopenshell
+import ifcopenshell.ifcopenshell_wrapper as ifcopenshell_wrapper
+
+DIGEST_SIZE = 16
+
+
+class Hasher:
+    """Computes and memoises digests of instances in a single file
+
+    Digests are memoised by Step id, so a hasher should be discarded if the
+    file is modified.
+
+    :param ignored_classes: Classes of instances which are hashed as if they
+        were null wherever they are referenced. This is useful for volatile
+        instances such as IfcOwnerHistory which change on every save.
+    :type ignored_classes: list[str]
+
+    Example:
+
+    .. code:: python
+
+        hasher = ifcopenshell.util.fingerprint.Hasher()
+        wall = model.by_type("IfcWall")[0]
+        hasher.get_digest(wall.Representation)
+        >>> "9f0a3c..."
+        hasher.combine(hasher.get_digest(wall.ObjectPlacement), hasher.get_digest(wall.Representation))
+        >>> "41c2d7..."
+    """
+
+    def __init__(self, ignored_classes=None):
+        self.digests = {}
+        self.ignored_classes = set(ignored_classes or ())
+
+    def get_digest(self, instance):
+        """Gets the digest of an instance and its forward subgraph
+
+        :param instance: Any entity instance. None is also accepted.
+        :type instance: ifcopenshell.entity_instance.entity_instance,None
+        :return: A hexadecimal digest
+        :rtype: str
+        """
+        if instance is None:
+            return self.combine()
+        wrapped_data = instance.wrapped_data
+        if not wrapped_data.id():
+            return self.hash_instance(wrapped_data).hex()
+        digest = self.digests.get(wrapped_data.id())
+        if digest is None:
+            self.hash_subgraph(wrapped_data)
+            digest = self.digests[wrapped_data.id()]
+        return digest.hex()
+
+    def combine(self, *digests):
+        """Combines several digests, in order, into a single digest
+
+        :param digests: Hexadecimal digests
+        :type digests: str
+        :return: A hexadecimal digest
+        :rtype: str
+        """
+        h = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        for digest in digests:
+            h.update(b"(" + digest.encode("ascii") + b")")
+        return h.hexdigest()
+
+    def hash_subgraph(self, wrapped_data):
+        # Iterative post-order traversal, so deep graphs don't hit the recursion limit
+        stack = [(wrapped_data, False)]
+        while stack:
+            instance, is_expanded = stack.pop()
+            if is_expanded:
+                self.digests[instance.id()] = self.hash_instance(instance)
+            elif instance.id() not in self.digests:
+                stack.append((instance, True))
+                for reference in self.get_references(instance):
+                    if reference.id() not in self.digests:
+                        stack.append((reference, False))
+
+    def get_references(self, instance):
+        values = [instance.get_argument(i) for i in range(len(instance))]
+        while values:
+            value = values.pop()
+            if isinstance(value, ifcopenshell_wrapper.entity_instance):
+                if self.ignored_classes and value.is_a() in self.ignored_classes:
+                    continue
+                elif value.id():
+                    yield value
+                else:
+                    values.extend(value.get_argument(i) for i in range(len(value)))
+            elif isinstance(value, tuple):
+                values.extend(value)
+
+    def hash_instance(self, instance):
+        h = hashlib.blake2b(instance.is_a().encode("utf-8"), digest_size=DIGEST_SIZE)
+        for i in range(len(instance)):
+            self.hash_value(h, instance.get_argument(i))
+        return h.digest()
+
+    def hash_value(self, h, value):
+        if isinstance(value, ifcopenshell_wrapper.entity_instance):
+            if self.ignored_classes and value.is_a() in self.ignored_classes:
+                h.update(repr(None).encode("utf-8") + b",")
+            elif value.id():
+                h.update(b"#" + self.digests[value.id()])
+            else:
+                h.update(b"(" + self.hash_instance(value) + b")")
+        elif isinstance(value, tuple):
+            h.update(b"[")
+            for item in value:
+                self.hash_value(h, item)
+            h.update(b"]")
+        else:
+            h.update(repr(value).encode("utf-8") + b",")
@@ -0,0 +1,448 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Columnar indices of attributes and properties for bulk filtering
+
+Filtering thousands of elements by an attribute or property one element at a
+time is slow, as every value has to be fetched through the entity instance.
+A :class:`ColumnIndex` instead extracts the values of chosen attributes and
+properties for all instances of some classes in a single pass, and stores them
+as NumPy arrays that can be filtered in bulk.
+
+Indices are opt-in. Once an index is created for a file, tools such as
+:mod:`ifcopenshell.util.selector` and IfcTester will automatically use it
+whenever it can answer a query. A registered index is rebuilt the next time
+it is used after :mod:`ifcopenshell.api` runs a use case, or a transaction is
+undone or redone. If you edit the file directly, call
+:meth:`ColumnIndex.invalidate` yourself.
+"""
+
+import re
+import weakref
+import numpy as np
+import ifcopenshell
+import ifcopenshell.util.element
+
+
+indices = weakref.WeakKeyDictionary()
+
+
+def get_index(ifc_file, key):
+    """Gets the most recent index of a file which has extracted a key
+
+    :param ifc_file: The IFC file
+    :type ifc_file: ifcopenshell.file.file
+    :param key: An attribute name, or a property set and property name pair
+        such as ``"Pset_WallCommon.FireRating"``.
+    :type key: str,tuple[str]
+    :return: The index, or None if no index for the key exists
+    :rtype: ColumnIndex,None
+    """
+    key = parse_key(key)
+    for index in reversed(indices.get(ifc_file, [])):
+        if key in index.columns:
+            index.refresh()
+            return index
+
+
+def invalidate_indices(usecase_path, ifc_file, settings):
+    for index in indices.get(ifc_file, []) if ifc_file is not None else []:
+        index.invalidate()
+
+
+def parse_key(key):
+    if isinstance(key, str):
+        key = key.split(".", 1)
+    return tuple(k.strip() for k in key)
+
+
+class Column:
+    """The values of a single attribute or property for all rows of an index
+
+    :ivar values: Values as typed as possible. Numeric columns are stored as
+        float64 with NaN for missing values. Everything else is an object array.
+    :ivar objects: The original Python values as an object array.
+    :ivar present: Whether or not each row has a non-null value.
+    :ivar covered: Whether or not each row can be answered by the index at all,
+        such as when an element's class does not have the attribute.
+    """
+
+    def __init__(self, values, covered):
+        self.objects = np.empty(len(values), dtype=object)
+        for i, value in enumerate(values):
+            # Assigned one by one so that aggregates are not broadcast
+            self.objects[i] = value
+        self.present = np.fromiter((v is not None for v in values), dtype=bool, count=len(values))
+        self.covered = covered
+        present_values = [v for v in values if v is not None]
+        if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present_values):
+            self.kind = "number"
+            self.values = np.full(len(values), np.nan)
+            self.values[self.present] = present_values
+        elif all(isinstance(v, str) for v in present_values):
+            self.kind = "string"
+            self.values = self.objects
+        else:
+            self.kind = "object"
+            self.values = self.objects
+        self._strings = None
+
+    def strings(self):
+        if self._strings is None:
+            self._strings = np.array([str(v) for v in self.objects], dtype=str)
+        return self._strings
+
+    def is_empty(self):
+        """Returns whether each row is null, an empty string, or an empty aggregate"""
+        if self.kind == "number":
+            return ~self.present
+        return np.frompyfunc(lambda v: v is None or v == "" or v == () or v == [], 1, 1)(self.objects).astype(bool)
+
+    def filter(self, comparison=None, value=None):
+        """Filters rows using the same comparisons as the selector syntax
+
+        :param comparison: One of ``equal``, ``contains``, ``morethan``,
+            ``lessthan``, ``morethanequalto``, ``lessthanequalto``, ``oneof``,
+            or ``regex``, optionally prefixed with ``not``. If None, rows with
+            truthy values are matched.
+        :type comparison: str,None
+        :param value: The value to compare against
+        :return: A boolean mask of matching rows
+        :rtype: numpy.ndarray
+        """
+        if comparison is None:
+            if self.kind == "number":
+                return self.present & (self.values != 0)
+            return self.objects.astype(bool)
+        if comparison.startswith("not"):
+            return ~self.compare(comparison[3:], value)
+        result = self.compare(comparison, value)
+        if value is not None:
+            result &= self.present
+        return result
+
+    def compare(self, comparison, value):
+        is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if comparison == "equal" and value is None:
+            return ~self.present
+        elif self.kind == "number" and is_number:
+            with np.errstate(invalid="ignore"):
+                if comparison == "equal":
+                    return self.values == value
+                elif comparison == "morethan":
+                    return self.values > value
+                elif comparison == "lessthan":
+                    return self.values < value
+                elif comparison == "morethanequalto":
+                    return self.values >= value
+                elif comparison == "lessthanequalto":
+                    return self.values <= value
+        elif self.kind == "string" and isinstance(value, str):
+            if comparison == "equal":
+                return (self.values == value).astype(bool)
+            elif comparison == "contains":
+                return np.char.find(self.strings(), value) >= 0
+            elif comparison == "oneof":
+                return np.isin(self.strings(), value.split(",")) & self.present
+            elif comparison == "regex":
+                pattern = re.compile(value)
+                search = np.frompyfunc(lambda v: v is not None and bool(pattern.search(v)), 1, 1)
+                return search(self.values).astype(bool)
+        return np.frompyfunc(lambda v: compare(v, comparison, value), 1, 1)(self.objects).astype(bool)
+
+
+def compare(element_value, comparison, value):
+    if comparison == "equal" and isinstance(element_value, list):
+        return value in element_value
+    elif comparison == "equal":
+        return element_value == value
+    elif comparison == "contains" and isinstance(element_value, list):
+        return bool([ev for ev in element_value if value in str(ev)])
+    elif comparison == "contains":
+        return value in str(element_value)
+    elif comparison == "oneof":
+        return element_value in value.split(",")
+    elif comparison == "regex":
+        return element_value is not None and bool(re.search(value, str(element_value)))
+    try:
+        if comparison == "morethan":
+            return element_value > value
+        elif comparison == "lessthan":
+            return element_value < value
+        elif comparison == "morethanequalto":
+            return element_value >= value
+        elif comparison == "lessthanequalto":
+            return element_value <= value
+    except TypeError:
+        pass
+    return False
+
+
+class ColumnIndex:
+    """Extracts attributes and properties of many elements into columns
+
+    Keys are either attribute names (e.g. ``Name``) or property set and
+    property names separated by a dot (e.g. ``Pset_WallCommon.FireRating``).
+    Quantities are indexed the same way as properties.
+
+    Properties are inherited from the element's type. Two views are stored: one
+    where occurrence properties override type properties, as per
+    :func:`ifcopenshell.util.element.get_psets`, and one where a type property
+    set takes precedence, as per :func:`ifcopenshell.util.element.get_pset`.
+
+    Example:
+
+    .. code:: python
+
+        index = ifcopenshell.util.index.ColumnIndex(
+            model, ["IfcWall", "IfcSlab"], ["Name", "Pset_WallCommon.FireRating"]
+        )
+        ids = index.ids[index.filter("Pset_WallCommon.FireRating", "equal", "2HR")]
+        # The selector will now also use the index
+        ifcopenshell.util.selector.Selector.parse(model, '.IfcWall[Name*="Partition"]')
+    """
+
+    def __init__(self, ifc_file, classes, keys, register=True):
+        """Builds the index
+
+        :param ifc_file: The IFC file
+        :type ifc_file: ifcopenshell.file.file
+        :param classes: IFC classes (including subtypes) whose instances form
+            the rows of the index
+        :type classes: list[str]
+        :param keys: The attributes and properties to extract
+        :type keys: list[str]
+        :param register: Whether or not to make the index available to
+            :func:`get_index` so that other tools use it automatically.
+        :type register: bool
+        """
+        self.file = ifc_file
+        self.classes = list(classes)
+        self.keys = [parse_key(k) for k in keys]
+        self.build()
+
+        if register:
+            import ifcopenshell.api
+
+            indices.setdefault(ifc_file, []).append(self)
+            ifcopenshell.api.add_post_listener("*", "ColumnIndex", invalidate_indices)
+            ifc_file.add_transaction_listener(
+                "ColumnIndex", lambda ifc_file, action: invalidate_indices(None, ifc_file, None)
+            )
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def ids(self):
+        """The step IDs of the elements in each row, in ascending order"""
+        self.refresh()
+        return self._ids
+
+    @property
+    def elements(self):
+        """The elements in each row"""
+        self.refresh()
+        return self._elements
+
+    def unregister(self):
+        """Stops tools from automatically using this index"""
+        registered = indices.get(self.file, [])
+        if self in registered:
+            registered.remove(self)
+        if not registered:
+            self.file.remove_transaction_listener("ColumnIndex")
+
+    def invalidate(self):
+        """Marks the index as out of date, so it is rebuilt the next time it is used"""
+        self.is_stale = True
+
+    def refresh(self):
+        if self.is_stale:
+            self.build()
+
+    def build(self):
+        self.is_stale = False
+        self.columns = {}
+        self.type_first_columns = {}
+
+        ifc_file = self.file
+        elements = {}
+        for ifc_class in self.classes:
+            for element in ifc_file.by_type(ifc_class):
+                elements[element.id()] = element
+        self._ids = np.array(sorted(elements.keys()), dtype=np.int64)
+        self._elements = [elements[i] for i in self._ids.tolist()]
+
+        attribute_keys = [k for k in self.keys if len(k) == 1]
+        pset_keys = [k for k in self.keys if len(k) == 2]
+        for key in attribute_keys:
+            self.columns[key] = self.extract_attribute(key[0])
+        if pset_keys:
+            self.extract_properties(pset_keys)
+
+    def extract_attribute(self, name):
+        values = []
+        covered = np.zeros(len(self.elements), dtype=bool)
+        indices_by_class = {}
+        for i, element in enumerate(self.elements):
+            ifc_class = element.is_a()
+            attribute_index = indices_by_class.get(ifc_class, -1)
+            if attribute_index == -1:
+                attribute_index = None
+                if element.wrapped_data.get_attribute_category(name) == 1:  # Forward attributes only
+                    attribute_index = element.wrapped_data.get_argument_index(name)
+                indices_by_class[ifc_class] = attribute_index
+            if attribute_index is None:
+                values.append(None)
+                continue
+            values.append(element[attribute_index])
+            covered[i] = True
+        return Column(values, covered)
+
+    def extract_properties(self, keys):
+        names = {k[0] for k in keys}
+        rows = {element_id: i for i, element_id in enumerate(self.ids.tolist())}
+        occurrence_psets = [None] * len(self.elements)
+        type_psets = [None] * len(self.elements)
+        covered = np.zeros(len(self.elements), dtype=bool)
+
+        def get_definitions(definitions):
+            results = {}
+            for definition in definitions or []:
+                if definition.Name in names:
+                    results[definition.Name] = ifcopenshell.util.element.get_property_definition(definition)
+            return results
+
+        for i, element in enumerate(self.elements):
+            if element.is_a("IfcTypeObject"):
+                occurrence_psets[i] = get_definitions(element.HasPropertySets)
+            elif element.is_a("IfcMaterialDefinition") or element.is_a("IfcProfileDef"):
+                occurrence_psets[i] = get_definitions(element.HasProperties)
+            elif hasattr(element, "IsDefinedBy"):
+                occurrence_psets[i] = {}
+            else:
+                continue
+            covered[i] = True
+
+        for rel in self.file.by_type("IfcRelDefinesByProperties"):
+            definition = rel.RelatingPropertyDefinition
+            if not isinstance(definition, ifcopenshell.entity_instance) or definition.Name not in names:
+                continue
+            props = None
+            for related_object in rel.RelatedObjects:
+                i = rows.get(related_object.id())
+                if i is None or related_object.is_a("IfcTypeObject"):
+                    continue
+                if props is None:
+                    props = ifcopenshell.util.element.get_property_definition(definition)
+                occurrence_psets[i].setdefault(definition.Name, {}).update(props)
+
+        type_definitions = {}
+        for rel in self.file.by_type("IfcRelDefinesByType"):
+            relating_type = rel.RelatingType
+            for related_object in rel.RelatedObjects:
+                i = rows.get(related_object.id())
+                if i is None or type_psets[i] is not None or related_object.is_a("IfcTypeObject"):
+                    continue
+                if relating_type.id() not in type_definitions:
+                    type_definitions[relating_type.id()] = get_definitions(relating_type.HasPropertySets)
+                type_psets[i] = type_definitions[relating_type.id()]
+
+        for pset_name, prop_name in keys:
+            # An attribute of the same name would shadow the property set
+            is_shadowed = self.extract_attribute(pset_name).covered
+            values = []
+            type_first_values = []
+            for occurrence_pset, type_pset in zip(occurrence_psets, type_psets):
+                occurrence_pset = (occurrence_pset or {}).get(pset_name)
+                type_pset = (type_pset or {}).get(pset_name)
+                if occurrence_pset is not None and prop_name in occurrence_pset:
+                    value = occurrence_pset[prop_name]
+                else:
+                    value = (type_pset or {}).get(prop_name)
+                values.append(value)
+                if type_pset is not None:
+                    type_first_values.append(type_pset.get(prop_name))
+                else:
+                    type_first_values.append(value)
+            column = Column(values, covered & ~is_shadowed)
+            self.columns[(pset_name, prop_name)] = column
+            if type_first_values == values:
+                self.type_first_columns[(pset_name, prop_name)] = column
+            else:
+                self.type_first_columns[(pset_name, prop_name)] = Column(type_first_values, column.covered)
+
+    def get_column(self, key, should_prefer_type=False):
+        """Gets the column of a key
+
+        :param key: The attribute or property key
+        :type key: str,tuple[str]
+        :param should_prefer_type: If true, a property set defined on the type
+            takes precedence over the occurrence's, like
+            :func:`ifcopenshell.util.element.get_pset`.
+        :type should_prefer_type: bool
+        :rtype: Column
+        """
+        self.refresh()
+        key = parse_key(key)
+        if should_prefer_type and key in self.type_first_columns:
+            return self.type_first_columns[key]
+        return self.columns[key]
+
+    def filter(self, key, comparison=None, value=None, should_prefer_type=False):
+        """Filters all rows of the index
+
+        See :meth:`Column.filter` for the supported comparisons.
+
+        :return: A boolean mask aligned with :attr:`ids`
+        :rtype: numpy.ndarray
+        """
+        column = self.get_column(key, should_prefer_type=should_prefer_type)
+        return column.filter(comparison, value) & column.covered
+
+    def get_rows(self, elements):
+        """Finds the row of each element in the index
+
+        :param elements: A list of elements
+        :type elements: list[ifcopenshell.entity_instance.entity_instance]
+        :return: A tuple of an array of row numbers, and a boolean mask of
+            whether or not each element is in the index at all.
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+        """
+        ids = np.fromiter((e.id() for e in elements), dtype=np.int64, count=len(elements))
+        if not len(self.ids):
+            return np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), dtype=bool)
+        rows = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        return rows, self.ids[rows] == ids
+
+    def evaluate(self, elements, key, comparison=None, value=None, should_prefer_type=False):
+        """Filters a list of elements
+
+        :param elements: A list of elements
+        :type elements: list[ifcopenshell.entity_instance.entity_instance]
+        :return: A tuple of two boolean masks aligned with the elements. The
+            first is whether the element matches, and the second is whether
+            the index was able to answer for that element at all. Elements
+            that are not covered must be checked some other way.
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+        """
+        column = self.get_column(key, should_prefer_type=should_prefer_type)
+        rows, is_in_index = self.get_rows(elements)
+        is_covered = is_in_index & column.covered[rows]
+        return column.filter(comparison, value)[rows] & is_covered, is_covered
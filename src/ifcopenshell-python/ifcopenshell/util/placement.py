@@ -46,14 +46,71 @@ def get_axis2placement(plc):
     return a2p(o, z, x)
 
 
-def get_local_placement(plc):
+def get_local_placement(plc, cache=None):
+    """Gets the absolute matrix of an object placement
+
+    :param plc: The IfcObjectPlacement, or None for an identity matrix.
+    :type plc: ifcopenshell.entity_instance.entity_instance,None
+    :param cache: An optional dictionary of matrices keyed by placement id.
+        Matrices of the placement and of all its parents are looked up in and
+        stored into this cache. The same cache may be shared across many calls
+        but must be discarded if any placements are edited.
+    :type cache: dict,optional
+    :return: A 4x4 matrix
+    :rtype: np.ndarray
+    """
     if plc is None:
         return np.eye(4)
-    if plc.PlacementRelTo is None:
-        parent = np.eye(4)
-    else:
-        parent = get_local_placement(plc.PlacementRelTo)
-    return np.dot(parent, get_axis2placement(plc.RelativePlacement))
+    if cache is None:
+        cache = {}
+    chain = []
+    while plc is not None and plc.id() not in cache:
+        chain.append(plc)
+        plc = plc.PlacementRelTo
+    matrix = np.eye(4) if plc is None else cache[plc.id()]
+    for plc in reversed(chain):
+        matrix = matrix @ get_axis2placement(plc.RelativePlacement)
+        cache[plc.id()] = matrix
+    return matrix.copy()
+
+
+def get_local_placements(elements, cache=None):
+    """Gets the absolute placement matrices of many elements at once
+
+    Parent placements, such as those of storeys and buildings, are only
+    resolved once no matter how many elements are placed relative to them.
+
+    :param elements: Products with an ObjectPlacement. Elements without a
+        placement get an identity matrix.
+    :type elements: list[ifcopenshell.entity_instance.entity_instance]
+    :param cache: An optional dictionary of matrices keyed by placement id, see
+        get_local_placement(). Pass the same dictionary to share resolved
+        placements between calls.
+    :type cache: dict,optional
+    :return: An array of shape (n, 4, 4)
+    :rtype: np.ndarray
+
+    Example:
+
+    .. code:: python
+
+        cache = {}
+        walls = model.by_type("IfcWall")
+        matrices = ifcopenshell.util.placement.get_local_placements(walls, cache=cache)
+        locations = matrices[:, :3, 3]
+    """
+    if cache is None:
+        cache = {}
+    matrices = np.empty((len(elements), 4, 4))
+    for i, element in enumerate(elements):
+        plc = element.ObjectPlacement
+        if plc is None:
+            matrices[i] = np.eye(4)
+        elif plc.id() in cache:
+            matrices[i] = cache[plc.id()]
+        else:
+            matrices[i] = get_local_placement(plc, cache=cache)
+    return matrices
 
 
 def get_cartesiantransformationoperator3d(inst):
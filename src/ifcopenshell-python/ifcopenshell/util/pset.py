@@ -17,6 +17,8 @@
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
 import re
+import json
+import hashlib
 import pathlib
 import ifcopenshell
 import ifcopenshell.util.schema
@@ -27,6 +29,9 @@ from typing import List, Generator, Optional
 
 templates = {}
 
+# Bump this whenever the applicability rules change, to invalidate persisted indexes
+INDEX_VERSION = 1
+
 
 def get_template(schema):
     global templates
@@ -43,39 +48,205 @@ class PsetQto:
     }
 
     def __init__(self, schema: str, templates=None) -> None:
+        """Queries property and quantity set templates applicable to classes
+
+        Which templates apply to which classes is answered from an
+        applicability index, compiled once per template file. The index of the
+        default buildingSMART templates is shipped next to the template file,
+        so the template file itself is only loaded when a template is actually
+        needed, such as by get_applicable() or get_by_name().
+
+        :param schema: The schema identifier, such as IFC4.
+        :type schema: str
+        :param templates: Template files to use instead of the default
+            buildingSMART templates.
+        :type templates: list[ifcopenshell.file.file],optional
+        """
+        self.schema_name = schema
         self.schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(schema)
-        if not templates:
-            folder_path = pathlib.Path(__file__).parent.absolute()
-            path = str(folder_path.joinpath("schema", self.templates_path[schema]))
-            templates = [ifcopenshell.open(path)]
-        self.templates = templates
+        self.indexes = {}
+        self.descendants = None
+        if templates:
+            self._templates = list(templates)
+        else:
+            # None is a placeholder for the default templates, until they are loaded
+            self._templates = [None]
+
+    @property
+    def templates(self):
+        if None in self._templates:
+            template = ifcopenshell.open(str(self.get_default_path()))
+            self.indexes[id(template)] = (template, self.get_index(None))
+            self._templates = [template if t is None else t for t in self._templates]
+        return self._templates
+
+    @templates.setter
+    def templates(self, value):
+        self._templates = list(value)
+        self.clear_caches()
+
+    def reset_templates(self) -> None:
+        """Resets to only the default templates, without loading them"""
+        self._templates = [None]
+        self.clear_caches()
+
+    def add_template(self, template: ifcopenshell.file) -> None:
+        """Adds a template file after the existing templates
+
+        Unlike appending to templates, this doesn't load the default templates.
+
+        :param template: A file containing IfcPropertySetTemplates
+        :type template: ifcopenshell.file.file
+        """
+        self._templates.append(template)
+        self.clear_caches()
+
+    def clear_caches(self) -> None:
+        self.get_applicable.cache_clear()
+        self.get_applicable_names.cache_clear()
+        self.get_by_name.cache_clear()
 
     @lru_cache()
     def get_applicable(
         self, ifc_class="", predefined_type="", pset_only=False, qto_only=False
     ) -> List[entity_instance]:
-        any_class = not ifc_class
-        if not any_class:
-            entity = self.schema.declaration_by_name(ifc_class)
         result = []
         for template in self.templates:
-            for prop_set in template.by_type("IfcPropertySetTemplate"):
-                if pset_only:
-                    if prop_set.Name.startswith("Qto_"):
-                        continue
-                if qto_only:
-                    if not prop_set.Name.startswith("Qto_"):
-                        continue
-                if any_class or self.is_applicable(
-                    entity, prop_set.ApplicableEntity or "IfcRoot", predefined_type, prop_set.TemplateType
-                ):
-                    result.append(prop_set)
+            prop_sets = template.by_type("IfcPropertySetTemplate")
+            index = self.get_index(template)
+            indices = self.get_applicable_indices(index, ifc_class, predefined_type, pset_only, qto_only)
+            result.extend(prop_sets[i] for i in indices)
         return result
 
     @lru_cache()
     def get_applicable_names(self, ifc_class: str, predefined_type="", pset_only=False, qto_only=False) -> List[str]:
         """Return names instead of objects for other use eg. enum"""
-        return [prop_set.Name for prop_set in self.get_applicable(ifc_class, predefined_type, pset_only, qto_only)]
+        result = []
+        for template in self._templates:
+            index = self.get_index(template)
+            indices = self.get_applicable_indices(index, ifc_class, predefined_type, pset_only, qto_only)
+            result.extend(index["names"][i] for i in indices)
+        return result
+
+    def get_applicable_indices(self, index, ifc_class="", predefined_type="", pset_only=False, qto_only=False):
+        if ifc_class:
+            # Raises an exception for invalid classes, and normalises the case of the class name
+            ifc_class = self.schema.declaration_by_name(ifc_class).name()
+            applicable = index["classes"].get(ifc_class, {})
+            indices = set(applicable.get("", ()))
+            if predefined_type:
+                indices.update(applicable.get(predefined_type, ()))
+            indices = sorted(indices)
+        else:
+            indices = range(len(index["names"]))
+        names = index["names"]
+        if pset_only:
+            return [i for i in indices if not names[i].startswith("Qto_")]
+        elif qto_only:
+            return [i for i in indices if names[i].startswith("Qto_")]
+        return indices
+
+    def get_index(self, template: Optional[ifcopenshell.file]) -> dict:
+        """Gets the applicability index of a template file
+
+        The index maps each class to predefined types to the indices of the
+        applicable IfcPropertySetTemplates, in the order they are in the file.
+        Templates applicable regardless of the predefined type are stored
+        against an empty predefined type.
+
+        :param template: A template file, or None for the default templates.
+        :type template: ifcopenshell.file.file,None
+        :return: A dictionary with the template "names" and the "classes" index
+        :rtype: dict
+        """
+        key = None if template is None else id(template)
+        if key not in self.indexes:
+            if template is None:
+                index = self.load_default_index()
+            else:
+                index = self.build_index(template)
+            # The template is kept alongside its index so that its id is not reused
+            self.indexes[key] = (template, index)
+        return self.indexes[key][1]
+
+    def get_default_path(self) -> pathlib.Path:
+        return pathlib.Path(__file__).parent.absolute().joinpath("schema", self.templates_path[self.schema_name])
+
+    def get_default_index_path(self) -> pathlib.Path:
+        path = self.get_default_path()
+        return path.with_name(f"{path.stem}_index.json")
+
+    def load_default_index(self) -> dict:
+        """Loads the index of the default templates shipped with IfcOpenShell
+
+        The index is built when the templates are updated, using
+        write_default_index(). If it is missing or out of date, it is rebuilt
+        in memory instead.
+        """
+        path = self.get_default_path()
+        digest = hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+        try:
+            with open(self.get_default_index_path(), "r") as f:
+                index = json.load(f)
+            if index.get("version") == INDEX_VERSION and index.get("digest") == digest:
+                return index
+        except (OSError, ValueError):
+            pass
+        index = self.build_index(ifcopenshell.open(str(path)))
+        index["version"] = INDEX_VERSION
+        index["digest"] = digest
+        return index
+
+    def write_default_index(self) -> None:
+        """Rebuilds and saves the index of the default templates
+
+        This is run when the default templates are updated, so that the index
+        is shipped with the templates.
+        """
+        path = self.get_default_path()
+        index = self.build_index(ifcopenshell.open(str(path)))
+        index["version"] = INDEX_VERSION
+        index["digest"] = hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+        with open(self.get_default_index_path(), "w") as f:
+            json.dump(index, f, separators=(",", ":"), sort_keys=True)
+
+    def build_index(self, template: ifcopenshell.file) -> dict:
+        names = []
+        classes = {}
+        for i, prop_set in enumerate(template.by_type("IfcPropertySetTemplate")):
+            names.append(prop_set.Name)
+            for applicable in (prop_set.ApplicableEntity or "IfcRoot").split(","):
+                match = re.match(r"(\w+)(\[\w+\])*/*(\w+)*(\[\w+\])*", applicable)
+                if not match:
+                    continue
+                predefined_type = match.group(3) or ""
+                for ifc_class in self.get_applicable_classes(match.group(1), prop_set.TemplateType):
+                    classes.setdefault(ifc_class, {}).setdefault(predefined_type, set()).add(i)
+        classes = {
+            ifc_class: {predefined_type: sorted(indices) for predefined_type, indices in applicable.items()}
+            for ifc_class, applicable in classes.items()
+        }
+        return {"names": names, "classes": classes}
+
+    def get_applicable_classes(self, applicable_class: str, template_type: Optional[str]) -> set:
+        """Gets all classes an applicable entity of a template applies to
+
+        See is_applicable() for the rules.
+        """
+        if self.descendants is None:
+            # Maps each upper case class name to the names of itself and all its subtypes
+            self.descendants = {}
+            for entity in self.schema.entities():
+                declaration = entity
+                while declaration:
+                    self.descendants.setdefault(declaration.name_uc(), set()).add(entity.name())
+                    declaration = declaration.supertype()
+        results = set(self.descendants.get(applicable_class.upper(), ()))
+        if "TYPE" in (template_type or ""):
+            type_objects = self.descendants.get("IFCTYPEOBJECT", set())
+            for ifc_type in ifcopenshell.util.type.get_applicable_types(applicable_class, "IFC4"):
+                results.update(self.descendants.get(ifc_type.upper(), set()) & type_objects)
+        return results
 
     def is_applicable(
         self, entity: entity_instance, applicables: str, predefined_type="", template_type="NOTDEFINED"
@@ -116,10 +287,10 @@ class PsetQto:
     @lru_cache()
     def get_by_name(self, name: str) -> Optional[entity_instance]:
         for template in self.templates:
-            for prop_set in template.by_type("IfcPropertySetTemplate"):
-                if prop_set.Name == name:
-                    return prop_set
+            names = self.get_index(template)["names"]
+            if name in names:
+                return template.by_type("IfcPropertySetTemplate")[names.index(name)]
         return None
 
     def is_templated(self, name: str) -> bool:
-        return bool(self.get_by_name(name))
+        return any(name in self.get_index(template)["names"] for template in self._templates)
@@ -18,122 +18,162 @@
 
 import re
 import lark
+import functools
 import ifcopenshell.util
 import ifcopenshell.util.fm
+import ifcopenshell.util.index
 import ifcopenshell.util.element
 
 
+filter_key_grammar = """
+    keys_regex: _REGEX_PREFIX ESCAPED_STRING ("." ESCAPED_STRING)*
+    keys_quoted: ESCAPED_STRING ("." ESCAPED_STRING)*
+    keys_simple: /[^\\W][^.=<>!%*\\]]*/ ("." /[^\\W][^.=<>!%*\\]]*/)*
+
+    // The "r" of a regex key only counts as a prefix when a quote follows, so
+    // that it is not mistaken for the start of a simple key by the LALR lexer.
+    _REGEX_PREFIX.2: /r(?=")/
+"""
+
+common_grammar = """
+    // Embed common.lark for packaging
+    DIGIT: "0".."9"
+    HEXDIGIT: "a".."f"|"A".."F"|DIGIT
+    INT: DIGIT+
+    SIGNED_INT: ["+"|"-"] INT
+    DECIMAL: INT "." INT? | "." INT
+    _EXP: ("e"|"E") SIGNED_INT
+    FLOAT: INT _EXP | DECIMAL _EXP?
+    SIGNED_FLOAT: ["+"|"-"] FLOAT
+    NUMBER: FLOAT | INT
+    SIGNED_NUMBER: ["+"|"-"] NUMBER
+    _STRING_INNER: /.*?/
+    _STRING_ESC_INNER: _STRING_INNER /(?<!\\\\)(\\\\\\\\)*?/
+    ESCAPED_STRING : "\\"" _STRING_ESC_INNER "\\""
+    LCASE_LETTER: "a".."z"
+    UCASE_LETTER: "A".."Z"
+    LETTER: UCASE_LETTER | LCASE_LETTER
+    WORD: LETTER+
+    WS: /[ \\t\\f\\r\\n]/+
+
+    %ignore WS // Disregard spaces in text
+"""
+
+element_value_parser = lark.Lark(
+    """start: keys_regex | keys_quoted | keys_simple"""
+    + filter_key_grammar
+    + common_grammar,
+    parser="lalr",
+)
+
+selector_parser = lark.Lark(
+    """start: query (lfunction query)*
+    query: selector | group
+    group: "(" query (lfunction query)* ")"
+    selector: (inverse_relationship)? guid_selector | (inverse_relationship)? class_selector
+    guid_selector: "#" /[0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_$]{22}/
+    class_selector: "." WORD filter ?
+    filter: "[" filter_key (comparison filter_value)? "]"
+    filter_key: keys_regex | keys_quoted | keys_simple
+    filter_value: ESCAPED_STRING | SIGNED_FLOAT | SIGNED_INT | BOOLEAN | NULL
+    lfunction: and | or
+    inverse_relationship: types | decomposed_by | bounded_by | grouped_by
+    types: "*"
+    decomposed_by: "@"
+    bounded_by: "@@"
+    grouped_by: "@@@"
+    and: "&"
+    or: "|"
+    not: "!"
+    comparison: (not)* (oneof | contains | morethanequalto | lessthanequalto | equal | morethan | lessthan)
+    oneof: "%="
+    contains: "*="
+    morethanequalto: ">="
+    lessthanequalto: "<="
+    equal: "="
+    morethan: ">"
+    lessthan: "<"
+    BOOLEAN: "TRUE" | "FALSE" | "true" | "false"| "True" | "False"
+    NULL: "NULL"
+    """
+    + filter_key_grammar
+    + common_grammar,
+    parser="lalr",
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_element_value_query(query):
+    return Selector.parse_filter_query(element_value_parser.parse(query).children[0])
+
+
 def get_element_value(element, query):
-    l = lark.Lark(
-        """start: WORD | ESCAPED_STRING | keys_regex | keys_quoted | keys_simple
-                keys_regex: "r" ESCAPED_STRING ("." ESCAPED_STRING)*
-                keys_quoted: ESCAPED_STRING ("." ESCAPED_STRING)*
-                keys_simple: /[^\\W][^.=<>!%*\\]]*/ ("." /[^\\W][^.=<>!%*\\]]*/)*
-
-                // Embed common.lark for packaging
-                _STRING_INNER: /.*?/
-                _STRING_ESC_INNER: _STRING_INNER /(?<!\\\\)(\\\\\\\\)*?/
-                ESCAPED_STRING : "\\"" _STRING_ESC_INNER "\\""
-                LCASE_LETTER: "a".."z"
-                UCASE_LETTER: "A".."Z"
-                LETTER: UCASE_LETTER | LCASE_LETTER
-                WORD: LETTER+
-                WS: /[ \\t\\f\\r\\n]/+
-
-                %ignore WS // Disregard spaces in text
-             """
-    )
-    start = l.parse(query)
-    filter_query = Selector.parse_filter_query(start.children[0])
+    filter_query = parse_element_value_query(query)
     return Selector.get_element_value(element, filter_query["keys"], filter_query["is_regex"])
 
 
+@functools.lru_cache(maxsize=1024)
+def compile_query(query):
+    """Parses a selector query into a reusable query plan
+
+    Parsing is the expensive part of running a query, so compiled queries are
+    cached by their query string. The same plan may then be executed against
+    any number of IFC files.
+
+    :param query: The selector query, such as ``.IfcWall[Name="Foo"]``
+    :type query: str
+    :return: The compiled query
+    :rtype: Query
+
+    Example:
+
+    .. code:: python
+
+        plan = ifcopenshell.util.selector.compile_query(".IfcWall | .IfcSlab")
+        walls_and_slabs = plan.execute(ifc_file)
+    """
+    return Query(query, selector_parser.parse(query))
+
+
+class Query:
+    def __init__(self, query, tree):
+        self.query = query
+        self.tree = tree
+
+    def __repr__(self):
+        return f"<Query {self.query}>"
+
+    def execute(self, ifc_file, elements=None):
+        return Selector.execute(ifc_file, self.tree, elements=elements)
+
+
 class Selector:
     @classmethod
     def parse(cls, ifc_file, query, elements=None):
+        return compile_query(query).execute(ifc_file, elements=elements)
+
+    @classmethod
+    def execute(cls, ifc_file, tree, elements=None):
         cls.file = ifc_file
         cls.elements = elements
-        l = lark.Lark(
-            """start: query (lfunction query)*
-                    query: selector | group
-                    group: "(" query (lfunction query)* ")"
-                    selector: (inverse_relationship)? guid_selector | (inverse_relationship)? class_selector
-                    guid_selector: "#" /[0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_$]{22}/
-                    class_selector: "." WORD filter ?
-                    filter: "[" filter_key (comparison filter_value)? "]"
-                    filter_key: WORD | ESCAPED_STRING | keys_regex | keys_quoted | keys_simple
-                    filter_value: ESCAPED_STRING | SIGNED_FLOAT | SIGNED_INT | BOOLEAN | NULL
-                    keys_regex: "r" ESCAPED_STRING ("." ESCAPED_STRING)*
-                    keys_quoted: ESCAPED_STRING ("." ESCAPED_STRING)*
-                    keys_simple: /[^\\W][^.=<>!%*\\]]*/ ("." /[^\\W][^.=<>!%*\\]]*/)*
-                    lfunction: and | or
-                    inverse_relationship: types | decomposed_by | bounded_by | grouped_by
-                    types: "*"
-                    decomposed_by: "@"
-                    bounded_by: "@@"
-                    grouped_by: "@@@"
-                    and: "&"
-                    or: "|"
-                    not: "!"
-                    comparison: (not)* (oneof | contains | morethanequalto | lessthanequalto | equal | morethan | lessthan)
-                    oneof: "%="
-                    contains: "*="
-                    morethanequalto: ">="
-                    lessthanequalto: "<="
-                    equal: "="
-                    morethan: ">"
-                    lessthan: "<"
-                    BOOLEAN: "TRUE" | "FALSE" | "true" | "false"| "True" | "False"
-                    NULL: "NULL"
-
-                    // Embed common.lark for packaging
-                    DIGIT: "0".."9"
-                    HEXDIGIT: "a".."f"|"A".."F"|DIGIT
-                    INT: DIGIT+
-                    SIGNED_INT: ["+"|"-"] INT
-                    DECIMAL: INT "." INT? | "." INT
-                    _EXP: ("e"|"E") SIGNED_INT
-                    FLOAT: INT _EXP | DECIMAL _EXP?
-                    SIGNED_FLOAT: ["+"|"-"] FLOAT
-                    NUMBER: FLOAT | INT
-                    SIGNED_NUMBER: ["+"|"-"] NUMBER
-                    _STRING_INNER: /.*?/
-                    _STRING_ESC_INNER: _STRING_INNER /(?<!\\\\)(\\\\\\\\)*?/
-                    ESCAPED_STRING : "\\"" _STRING_ESC_INNER "\\""
-                    LCASE_LETTER: "a".."z"
-                    UCASE_LETTER: "A".."Z"
-                    LETTER: UCASE_LETTER | LCASE_LETTER
-                    WORD: LETTER+
-                    CNAME: ("_"|LETTER) ("_"|LETTER|DIGIT)*
-                    WS_INLINE: (" "|/\\t/)+
-                    WS: /[ \\t\\f\\r\\n]/+
-                    CR : /\\r/
-                    LF : /\\n/
-                    NEWLINE: (CR? LF)+
-
-                    %ignore WS // Disregard spaces in text
-                 """
-        )
-
-        start = l.parse(query)
-        return cls.get_group(start)
+        return cls.get_group(tree)
 
     @classmethod
     def get_group(cls, group):
         lfunction = None
+        results = set()
         for child in group.children:
             if child.data == "query":
                 new_results = cls.get_query(child)
                 if not lfunction:
-                    results = new_results
+                    results = set(new_results)
                 elif lfunction == "or":
-                    results.extend(new_results)
+                    results.update(new_results)
                 elif lfunction == "and":
-                    results = list(set(results).intersection(new_results))
-                results = list(set(results))
+                    results.intersection_update(new_results)
             elif child.data == "lfunction":
                 lfunction = child.children[0].data
-        return results
+        return list(results)
 
     @classmethod
     def get_query(cls, query):
@@ -216,7 +256,15 @@ class Selector:
                 value = filter_rule.children[2].children[0].lower() == "true"
             elif token_type == "NULL":
                 value = None
-        for element in elements:
+        index = cls.get_index(filter_query)
+        if index:
+            keys = [k.strip() for k in filter_query["keys"]]
+            is_match, is_covered = index.evaluate(elements, keys, comparison, value, should_prefer_type=True)
+        for i, element in enumerate(elements):
+            if index and is_covered[i]:
+                if is_match[i]:
+                    results.append(element)
+                continue
             element_value = cls.get_element_value(element, filter_query["keys"], is_regex=filter_query["is_regex"])
             if element_value is None and value is not None and "not" not in comparison:
                 continue
@@ -226,6 +274,15 @@ class Selector:
                 results.append(element)
         return results
 
+    @classmethod
+    def get_index(cls, filter_query):
+        if filter_query["is_regex"] or len(filter_query["keys"]) > 2:
+            return
+        keys = [k.strip() for k in filter_query["keys"]]
+        if keys[0] in ("type", "material", "mat", "item", "i", "container", "class"):
+            return
+        return ifcopenshell.util.index.get_index(cls.file, keys)
+
     @classmethod
     def parse_filter_query(cls, filter_query):
         keys = filter_query
@@ -16,7 +16,9 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
+import math
 import datetime
+import numpy as np
 import ifcopenshell.util.date
 from functools import lru_cache
 
@@ -61,20 +63,13 @@ def derive_calendar(task):
 
 
 def count_working_days(start, finish, calendar):
-    result = 0
-    current_date = datetime.date(start.year, start.month, start.day)
-    finish_date = datetime.date(finish.year, finish.month, finish.day)
-    while current_date <= finish_date:
-        if (
-            calendar
-            and calendar.WorkingTimes
-            and is_working_day(current_date, calendar)
-        ):
-            result += 1
-        elif not calendar or not is_calendar_applicable(current_date, calendar):
-            result += 1
-        current_date += datetime.timedelta(days=1)
-    return result
+    start = datetime.date(start.year, start.month, start.day)
+    finish = datetime.date(finish.year, finish.month, finish.day)
+    if finish < start:
+        return 0
+    if not calendar:
+        return (finish - start).days + 1
+    return get_calendar_days(calendar).count(start, finish)
 
 
 def get_start_or_finish_date(
@@ -98,45 +93,143 @@ def get_start_or_finish_date(
 
 
 def offset_date(start, duration, duration_type, calendar):
-    current_date = start
     months = getattr(duration, "months", 0)
     years = getattr(duration, "years", 0)
 
     abs_duration = abs((duration.days + months * 30 + years * 12 * 30))
-    date_offset = datetime.timedelta(days=1 if duration.days > 0 else -1)
-    while abs_duration > 0:
-        if duration_type == "ELAPSEDTIME" or not is_calendar_applicable(
-            current_date, calendar
-        ):
-            abs_duration -= 1
-        elif is_working_day(current_date, calendar):
-            abs_duration -= 1
-        current_date += date_offset
-    if duration.days > 0:
-        current_date = get_soonest_working_day(current_date, duration_type, calendar)
-    else:
-        current_date = get_recent_working_day(current_date, duration_type, calendar)
-    return current_date
+    direction = 1 if duration.days > 0 else -1
+    if duration_type == "ELAPSEDTIME" or not calendar:
+        return start + datetime.timedelta(days=abs_duration * direction)
+    calendar_days = get_calendar_days(calendar)
+    current_date = start + datetime.timedelta(days=calendar_days.get_offset(start, abs_duration, direction))
+    if direction > 0:
+        return get_soonest_working_day(current_date, duration_type, calendar)
+    return get_recent_working_day(current_date, duration_type, calendar)
 
 
 def get_soonest_working_day(start, duration_type, calendar):
-    if duration_type == "ELAPSEDTIME" or not is_calendar_applicable(start, calendar):
+    if duration_type == "ELAPSEDTIME" or not calendar:
         return start
-    while not is_working_day(start, calendar):
-        if not is_calendar_applicable(start, calendar):
-            break
-        start += datetime.timedelta(days=1)
-    return start
+    return start + datetime.timedelta(days=get_calendar_days(calendar).get_soonest_offset(start))
 
 
 def get_recent_working_day(start, duration_type, calendar):
-    if duration_type == "ELAPSEDTIME" or not is_calendar_applicable(start, calendar):
+    if duration_type == "ELAPSEDTIME" or not calendar:
         return start
-    while not is_working_day(start, calendar):
-        if not is_calendar_applicable(start, calendar):
-            break
-        start -= datetime.timedelta(days=1)
-    return start
+    return start + datetime.timedelta(days=get_calendar_days(calendar).get_recent_offset(start))
+
+
+@lru_cache(maxsize=None)
+def get_calendar_days(calendar):
+    """Gets the working days of a calendar compiled for fast day arithmetic
+
+    The result is cached per calendar. If you change the calendar, its work
+    times or their recurrence patterns, you must call
+    ``get_calendar_days.cache_clear()``. The sequence API does this for you.
+
+    :param calendar: The IfcWorkCalendar
+    :type calendar: ifcopenshell.entity_instance.entity_instance
+    :return: The compiled calendar
+    :rtype: CalendarDays
+    """
+    return CalendarDays(calendar)
+
+
+class CalendarDays:
+    """The days which count towards durations in a work calendar
+
+    A day counts towards a duration if it is a working day, or if no working
+    time of the calendar applies to it. Days are compiled into a bitmap with
+    prefix sums, so counting and offsetting days are array lookups rather than
+    a walk through the calendar one day at a time. The compiled range grows as
+    needed.
+    """
+
+    def __init__(self, calendar):
+        self.calendar = calendar
+        self.origin = None
+        self.counted = np.zeros(0, dtype=bool)
+        # self.prefix[i] is the number of counted days before the day at index i
+        self.prefix = np.zeros(1, dtype=np.int64)
+
+    def count(self, start, finish):
+        """Counts the days in an inclusive date range which count towards durations"""
+        start, finish = self.compile(start, finish)
+        return int(self.prefix[finish + 1] - self.prefix[start])
+
+    def get_offset(self, start, total_days, direction):
+        """Gets how many days to step from start to pass a number of counted days
+
+        Stepping begins on the start day itself and moves in the direction of
+        1 or -1. The result is the offset of the day after the last counted day
+        passed, in the direction of stepping.
+        """
+        if not total_days:
+            return 0
+        while True:
+            i, _ = self.compile(start, start)
+            if direction > 0:
+                j = int(np.searchsorted(self.prefix, self.prefix[i] + total_days, side="left"))
+                if j < len(self.prefix):
+                    return j - i
+                self.extend(len(self.counted) * 2, 0)
+            else:
+                j = int(np.searchsorted(self.prefix, self.prefix[i + 1] - total_days, side="right")) - 1
+                if self.prefix[i + 1] - total_days >= 0 and j >= 0:
+                    return j - 1 - i
+                self.extend(0, len(self.counted) * 2)
+
+    def get_soonest_offset(self, day):
+        """Gets the offset to the first counted day on or after a day"""
+        while True:
+            i, _ = self.compile(day, day)
+            j = int(np.searchsorted(self.prefix, self.prefix[i] + 1, side="left")) - 1
+            if j < len(self.counted):
+                return j - i
+            self.extend(len(self.counted) * 2, 0)
+
+    def get_recent_offset(self, day):
+        """Gets the offset to the last counted day on or before a day"""
+        while True:
+            i, _ = self.compile(day, day)
+            j = int(np.searchsorted(self.prefix, self.prefix[i + 1], side="left")) - 1
+            if j >= 0:
+                return j - i
+            self.extend(0, len(self.counted) * 2)
+
+    def compile(self, start, finish):
+        """Ensures that a date range is compiled and returns its indices"""
+        start = datetime.date(start.year, start.month, start.day)
+        finish = datetime.date(finish.year, finish.month, finish.day)
+        if self.origin is None:
+            self.origin = start - datetime.timedelta(days=366)
+            self.extend(366 * 2 + 1 + (finish - start).days, 0)
+        i = (start - self.origin).days
+        if i < 0:
+            self.extend(0, max(-i, len(self.counted)))
+            i = (start - self.origin).days
+        j = (finish - self.origin).days
+        if j >= len(self.counted):
+            self.extend(max(j + 1 - len(self.counted), len(self.counted)), 0)
+        return i, j
+
+    def extend(self, after, before):
+        """Compiles more days after and before the currently compiled days"""
+        last = self.origin + datetime.timedelta(days=len(self.counted))
+        first = self.origin - datetime.timedelta(days=before)
+        after_days = [self.is_counted(last + datetime.timedelta(days=d)) for d in range(after)]
+        before_days = [self.is_counted(first + datetime.timedelta(days=d)) for d in range(before)]
+        self.counted = np.concatenate(
+            (np.array(before_days, dtype=bool), self.counted, np.array(after_days, dtype=bool))
+        )
+        self.prefix = np.concatenate(([0], np.cumsum(self.counted, dtype=np.int64)))
+        self.origin = first
+
+    def is_counted(self, day):
+        # The uncached functions are used to avoid filling their caches with every compiled day
+        if self.calendar.WorkingTimes and is_working_day.__wrapped__(day, self.calendar):
+            return True
+        return not is_calendar_applicable.__wrapped__(day, self.calendar)
 
 
 @lru_cache(maxsize=None)
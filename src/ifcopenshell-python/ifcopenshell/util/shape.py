@@ -32,51 +32,30 @@ def is_x(value, x, tolerance=None):
 
 def get_volume(geometry):
     # https://stackoverflow.com/questions/1406029/how-to-calculate-the-volume-of-a-3d-mesh-object-the-surface-of-which-is-made-up
-    def signed_triangle_volume(p1, p2, p3):
-        v321 = p3[0] * p2[1] * p1[2]
-        v231 = p2[0] * p3[1] * p1[2]
-        v312 = p3[0] * p1[1] * p2[2]
-        v132 = p1[0] * p3[1] * p2[2]
-        v213 = p2[0] * p1[1] * p3[2]
-        v123 = p1[0] * p2[1] * p3[2]
-        return (1.0 / 6.0) * (-v321 + v231 + v312 - v132 - v213 + v123)
-
-    verts = geometry.verts
-    faces = geometry.faces
-    grouped_verts = [[verts[i], verts[i + 1], verts[i + 2]] for i in range(0, len(verts), 3)]
-    volumes = [
-        signed_triangle_volume(grouped_verts[faces[i]], grouped_verts[faces[i + 1]], grouped_verts[faces[i + 2]])
-        for i in range(0, len(faces), 3)
-    ]
-    return abs(sum(volumes))
+    return abs(np.sum(get_signed_volumes(get_vertices(geometry), get_faces_array(geometry))))
+
+
+def get_signed_volumes(vertices, faces):
+    # The signed volume of the tetrahedron formed by each triangle and the origin
+    p1, p2, p3 = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    return np.einsum("ij,ij->i", p1, np.cross(p2, p3)) / 6.0
 
 
 def get_x(geometry):
-    x_values = [geometry.verts[i] for i in range(0, len(geometry.verts), 3)]
-    return max(x_values) - min(x_values)
+    return float(np.ptp(get_vertices(geometry)[:, 0]))
 
 
 def get_y(geometry):
-    y_values = [geometry.verts[i + 1] for i in range(0, len(geometry.verts), 3)]
-    return max(y_values) - min(y_values)
+    return float(np.ptp(get_vertices(geometry)[:, 1]))
 
 
 def get_z(geometry):
-    z_values = [geometry.verts[i + 2] for i in range(0, len(geometry.verts), 3)]
-    return max(z_values) - min(z_values)
+    return float(np.ptp(get_vertices(geometry)[:, 2]))
 
 
 def get_bbox_centroid(geometry):
-    x_values = [geometry.verts[i] for i in range(0, len(geometry.verts), 3)]
-    y_values = [geometry.verts[i + 1] for i in range(0, len(geometry.verts), 3)]
-    z_values = [geometry.verts[i + 2] for i in range(0, len(geometry.verts), 3)]
-    minx = min(x_values)
-    maxx = max(x_values)
-    miny = min(y_values)
-    maxy = max(y_values)
-    minz = min(z_values)
-    maxz = max(z_values)
-    return (minx + ((maxx - minx) / 2), miny + ((maxy - miny) / 2), minz + ((maxz - minz) / 2))
+    bbox = get_bbox(get_vertices(geometry))
+    return tuple(((bbox[0] + bbox[1]) / 2).tolist())
 
 
 def get_element_bbox_centroid(element, geometry):
@@ -89,76 +68,76 @@ def get_element_bbox_centroid(element, geometry):
 
 def get_shape_bbox_centroid(shape, geometry):
     centroid = get_bbox_centroid(geometry)
+    return (get_shape_matrix(shape) @ np.array([*centroid, 1.0]))[0:3]
+
+
+def get_shape_matrix(shape):
     m = shape.transformation.matrix.data
-    mat = np.array(([m[0], m[3], m[6], m[9]], [m[1], m[4], m[7], m[10]], [m[2], m[5], m[8], m[11]], [0, 0, 0, 1]))
-    return (mat @ np.array([*centroid, 1.0]))[0:3]
+    return np.array(([m[0], m[3], m[6], m[9]], [m[1], m[4], m[7], m[10]], [m[2], m[5], m[8], m[11]], [0, 0, 0, 1]))
 
 
 def get_vertices(geometry):
-    verts = geometry.verts
-    return np.array([np.array([verts[i], verts[i + 1], verts[i + 2]]) for i in range(0, len(verts), 3)])
+    return np.asarray(geometry.verts, dtype=np.float64).reshape(-1, 3)
 
 
 def get_edges(geometry):
-    edges = geometry.edges
-    return [[edges[i], edges[i + 1]] for i in range(0, len(edges), 2)]
+    return get_edges_array(geometry).tolist()
+
+
+def get_edges_array(geometry):
+    return np.asarray(geometry.edges, dtype=np.int64).reshape(-1, 2)
 
 
 def get_faces(geometry):
-    faces = geometry.faces
-    return [[faces[i], faces[i + 1], faces[i + 2]] for i in range(0, len(faces), 3)]
+    return get_faces_array(geometry).tolist()
+
+
+def get_faces_array(geometry):
+    return np.asarray(geometry.faces, dtype=np.int64).reshape(-1, 3)
+
+
+def transform_vertices(matrix, vertices):
+    return vertices @ matrix[:3, :3].T + matrix[:3, 3]
 
 
 def get_shape_vertices(shape, geometry):
-    m = shape.transformation.matrix.data
-    mat = np.array(([m[0], m[3], m[6], m[9]], [m[1], m[4], m[7], m[10]], [m[2], m[5], m[8], m[11]], [0, 0, 0, 1]))
-    return np.array([mat @ np.array([verts[i], verts[i + 1], verts[i + 2]]) for i in range(0, len(verts), 3)])
+    return transform_vertices(get_shape_matrix(shape), get_vertices(geometry))
 
 
 def get_element_vertices(element, geometry):
     if not element.ObjectPlacement or not element.ObjectPlacement.is_a("IfcLocalPlacement"):
-        return get_shape_vertices(geometry)
+        return get_vertices(geometry)
     mat = ifcopenshell.util.placement.get_local_placement(element.ObjectPlacement)
-    return np.array([mat @ np.array([verts[i], verts[i + 1], verts[i + 2]]) for i in range(0, len(verts), 3)])
+    return transform_vertices(mat, get_vertices(geometry))
 
 
 def get_bottom_elevation(geometry):
-    z_values = [geometry.verts[i + 2] for i in range(0, len(geometry.verts), 3)]
-    return min(z_values)
+    return float(get_vertices(geometry)[:, 2].min())
 
 
 def get_top_elevation(geometry):
-    z_values = [geometry.verts[i + 2] for i in range(0, len(geometry.verts), 3)]
-    return max(z_values)
+    return float(get_vertices(geometry)[:, 2].max())
 
 
 def get_shape_bottom_elevation(shape, geometry):
-    return min([v[2] for v in get_shape_vertices(shape, geometry)])
+    return float(get_shape_vertices(shape, geometry)[:, 2].min())
 
 
 def get_shape_top_elevation(shape, geometry):
-    return max([v[2] for v in get_shape_vertices(shape, geometry)])
+    return float(get_shape_vertices(shape, geometry)[:, 2].max())
 
 
 def get_element_bottom_elevation(element, geometry):
-    return min([v[2] for v in get_element_vertices(element, geometry)])
+    return float(get_element_vertices(element, geometry)[:, 2].min())
 
 
 def get_element_top_elevation(element, geometry):
-    return max([v[2] for v in get_element_vertices(element, geometry)])
+    return float(get_element_vertices(element, geometry)[:, 2].max())
 
 
 def get_bbox(vertices):
-    x_values = [v[0] for v in vertices]
-    y_values = [v[1] for v in vertices]
-    z_values = [v[2] for v in vertices]
-    minx = min(x_values)
-    maxx = max(x_values)
-    miny = min(y_values)
-    maxy = max(y_values)
-    minz = min(z_values)
-    maxz = max(z_values)
-    return (np.array([minx, miny, minz]), np.array([maxx, maxy, maxz]))
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    return (vertices.min(axis=0), vertices.max(axis=0))
 
 
 def get_area_vf(vertices, faces):
@@ -176,112 +155,137 @@ def get_area_vf(vertices, faces):
     return mesh_area
 
 
-def get_area(geometry):
-    verts = geometry.verts
-    faces = geometry.faces
-    vertices = np.array([[verts[i], verts[i + 1], verts[i + 2]] for i in range(0, len(verts), 3)])
-    faces = np.array([[faces[i], faces[i + 1], faces[i + 2]] for i in range(0, len(faces), 3)])
-    return get_area_vf(vertices, faces)
-
-
-def get_side_area(geometry, axis="Y"):
-    verts = geometry.verts
-    faces = geometry.faces
-    vertices = np.array([[verts[i], verts[i + 1], verts[i + 2]] for i in range(0, len(verts), 3)])
-    faces = np.array([[faces[i], faces[i + 1], faces[i + 2]] for i in range(0, len(faces), 3)])
-
+def get_face_normals(vertices, faces):
     # Calculate the triangle normal vectors
     v1 = vertices[faces[:, 1]] - vertices[faces[:, 0]]
     v2 = vertices[faces[:, 2]] - vertices[faces[:, 0]]
     triangle_normals = np.cross(v1, v2)
 
-    # Normalize the normal vectors
-    triangle_normals = triangle_normals / np.linalg.norm(triangle_normals, axis=1)[:, np.newaxis]
+    # Normalize the normal vectors. Degenerate triangles have no normal.
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return triangle_normals / np.linalg.norm(triangle_normals, axis=1)[:, np.newaxis]
+
+
+def get_area(geometry):
+    return get_area_vf(get_vertices(geometry), get_faces_array(geometry))
+
+
+def get_side_area(geometry, axis="Y"):
+    vertices = get_vertices(geometry)
+    faces = get_faces_array(geometry)
+    triangle_normals = get_face_normals(vertices, faces)
 
     # Find the faces with a normal vector pointing in the desired +Y normal direction
     axis = {"X": 0, "Y": 1, "Z": 2}[axis]
-    filtered_face_indices = np.where(triangle_normals[:, axis] > tol)[0]
-    filtered_faces = faces[filtered_face_indices]
+    filtered_faces = faces[triangle_normals[:, axis] > tol]
     return get_area_vf(vertices, filtered_faces)
 
 
 def get_footprint_area(geometry):
-    verts = geometry.verts
-    faces = geometry.faces
-    vertices = np.array([[verts[i], verts[i + 1], verts[i + 2]] for i in range(0, len(verts), 3)])
-    faces = np.array([[faces[i], faces[i + 1], faces[i + 2]] for i in range(0, len(faces), 3)])
-
-    # Calculate the triangle normal vectors
-    v1 = vertices[faces[:, 1]] - vertices[faces[:, 0]]
-    v2 = vertices[faces[:, 2]] - vertices[faces[:, 0]]
-    triangle_normals = np.cross(v1, v2)
-
-    # Normalize the normal vectors
-    triangle_normals = triangle_normals / np.linalg.norm(triangle_normals, axis=1)[:, np.newaxis]
+    vertices = get_vertices(geometry)
+    faces = get_faces_array(geometry)
+    triangle_normals = get_face_normals(vertices, faces)
 
     # Find the faces with a normal vector pointing in the desired +Z normal direction
-    filtered_face_indices = np.where(triangle_normals[:, 2] > tol)[0]
-    filtered_faces = faces[filtered_face_indices]
+    filtered_faces = faces[triangle_normals[:, 2] > tol]
     return get_area_vf(vertices, filtered_faces)
 
 
 def get_outer_surface_area(geometry):
-    verts = geometry.verts
-    faces = geometry.faces
-    vertices = np.array([[verts[i], verts[i + 1], verts[i + 2]] for i in range(0, len(verts), 3)])
-    faces = np.array([[faces[i], faces[i + 1], faces[i + 2]] for i in range(0, len(faces), 3)])
-
-    # Calculate the triangle normal vectors
-    v1 = vertices[faces[:, 1]] - vertices[faces[:, 0]]
-    v2 = vertices[faces[:, 2]] - vertices[faces[:, 0]]
-    triangle_normals = np.cross(v1, v2)
-
-    # Normalize the normal vectors
-    triangle_normals = triangle_normals / np.linalg.norm(triangle_normals, axis=1)[:, np.newaxis]
+    vertices = get_vertices(geometry)
+    faces = get_faces_array(geometry)
+    triangle_normals = get_face_normals(vertices, faces)
 
     # Find the faces with a normal vector that isn't +Z or -Z
-    filtered_face_indices = np.where(abs(triangle_normals[:, 2]) < tol)[0]
-    filtered_faces = faces[filtered_face_indices]
+    filtered_faces = faces[abs(triangle_normals[:, 2]) < tol]
     return get_area_vf(vertices, filtered_faces)
 
 
 def get_footprint_perimeter(geometry):
-    verts = geometry.verts
-    faces = geometry.faces
-    vertices = np.array([[verts[i], verts[i + 1], verts[i + 2]] for i in range(0, len(verts), 3)])
-    faces = np.array([[faces[i], faces[i + 1], faces[i + 2]] for i in range(0, len(faces), 3)])
+    vertices = get_vertices(geometry)
+    faces = get_faces_array(geometry)
+    triangle_normals = get_face_normals(vertices, faces)
 
-    # Calculate the triangle normal vectors
+    # Find the faces with a normal vector pointing in the negative Z direction
+    negative_z_faces = faces[triangle_normals[:, 2] < -tol]
+
+    # Perimeter edges are those which are not shared by any other face, in either direction
+    edges = np.concatenate([negative_z_faces[:, [0, 1]], negative_z_faces[:, [1, 2]], negative_z_faces[:, [2, 0]]])
+    edges, counts = np.unique(np.sort(edges, axis=1), axis=0, return_counts=True)
+    edges = edges[counts == 1]
+    return float(np.sum(np.linalg.norm(vertices[edges[:, 0]] - vertices[edges[:, 1]], axis=1)))
+
+
+def get_batch_metrics(shapes):
+    """Calculates metrics of many shapes at once
+
+    All vertices and faces are concatenated and measured in a handful of
+    vectorised operations, so this is far faster than calling get_volume(),
+    get_area(), etc on each shape when doing quantity take-off of a large
+    model.
+
+    Shapes may either be shapes with a transformation, such as those yielded by
+    a geometry iterator or returned by ifcopenshell.geom.create_shape(), or
+    plain geometries. Volumes and areas are always measured in local
+    coordinates. Bounding boxes and elevations of shapes are in global
+    coordinates, whereas those of plain geometries are in local coordinates.
+    Shapes without any vertices have NaN metrics.
+
+    :param shapes: A list of shapes or geometries, or a batch of shapes
+        already packed by ifcopenshell.geom.batch.pack_shapes()
+    :type shapes: list,ifcopenshell.geom.batch.ShapeBatch
+    :return: A dictionary of arrays, with one row per shape. Keys are "volume",
+        "area", "bbox_min" and "bbox_max" (of shape (n, 3)), and
+        "bottom_elevation" and "top_elevation".
+    :rtype: dict[str, np.ndarray]
+
+    Example:
+
+    .. code:: python
+
+        total_volume = 0.0
+        for batch in ifcopenshell.geom.iterate_arrays(settings, model):
+            metrics = ifcopenshell.util.shape.get_batch_metrics(batch)
+            total_volume += metrics["volume"].sum()
+    """
+    # Imported lazily, as ifcopenshell.geom is slow to import where pythonocc is installed
+    import ifcopenshell.geom.batch
+
+    batch = shapes
+    if not isinstance(batch, ifcopenshell.geom.batch.ShapeBatch):
+        batch = ifcopenshell.geom.batch.pack_shapes(shapes)
+    n = len(batch)
+    vertices = batch.verts
+    faces = batch.faces
+    total_verts = np.diff(batch.vert_offsets)
+    face_shapes = np.repeat(np.arange(n), np.diff(batch.face_offsets))
+
+    # Volumes and areas are measured in local coordinates, just like get_volume() and get_area()
+    has_verts = total_verts > 0
+    volume = np.abs(np.bincount(face_shapes, weights=get_signed_volumes(vertices, faces), minlength=n)).astype(float)
     v1 = vertices[faces[:, 1]] - vertices[faces[:, 0]]
     v2 = vertices[faces[:, 2]] - vertices[faces[:, 0]]
-    triangle_normals = np.cross(v1, v2)
-
-    # Normalize the normal vectors
-    triangle_normals = triangle_normals / np.linalg.norm(triangle_normals, axis=1)[:, np.newaxis]
-
-    # Find the faces with a normal vector pointing in the negative Z direction
-    negative_z_face_indices = np.where(triangle_normals[:, 2] < -tol)[0]
-    negative_z_faces = faces[negative_z_face_indices]
-
-    # Initialize the set of counted edges and the perimeter
-    all_edges = set()
-    shared_edges = set()
-    perimeter = 0
-
-    # Loop through each face
-    for face in negative_z_faces:
-        # Loop through each edge of the face
-        for i in range(3):
-            # Get the indices of the two vertices that define the edge
-            edge = (face[i], face[(i + 1) % 3])
-            # Keep track of shared edges. Perimeter edges are unshared.
-            if (edge[1], edge[0]) in all_edges or (edge[0], edge[1]) in all_edges:
-                shared_edges.add((edge[0], edge[1]))
-                shared_edges.add((edge[1], edge[0]))
-            else:
-                all_edges.add(edge)
-
-    return sum([np.linalg.norm(vertices[e[0]] - vertices[e[1]]) for e in (all_edges - shared_edges)])
+    triangle_areas = np.linalg.norm(np.cross(v1, v2), axis=1) / 2
+    area = np.bincount(face_shapes, weights=triangle_areas, minlength=n).astype(float)
+    volume[~has_verts] = np.nan
+    area[~has_verts] = np.nan
+
+    placed_vertices = batch.get_placed_vertices()
+    bbox_min = np.full((n, 3), np.nan)
+    bbox_max = np.full((n, 3), np.nan)
+    if has_verts.any():
+        starts = batch.vert_offsets[:-1][has_verts]
+        bbox_min[has_verts] = np.minimum.reduceat(placed_vertices, starts, axis=0)
+        bbox_max[has_verts] = np.maximum.reduceat(placed_vertices, starts, axis=0)
+
+    return {
+        "volume": volume,
+        "area": area,
+        "bbox_min": bbox_min,
+        "bbox_max": bbox_max,
+        "bottom_elevation": bbox_min[:, 2],
+        "top_elevation": bbox_max[:, 2],
+    }
 
 
 def get_profiles(element):
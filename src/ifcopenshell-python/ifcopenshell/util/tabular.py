@@ -0,0 +1,425 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Columnar export of IFC models to Apache Arrow and Parquet
+
+A model is exported as one table per entity class. Every table has an ``id``
+column holding the Step id, followed by one column per explicit attribute of
+the class, typed from the schema:
+
+- Entity references are stored as int64 Step ids.
+- Integers are int64, reals and numbers are float64, and booleans and logicals
+  are bools, where an UNKNOWN logical is null.
+- Strings, binaries and enumerations are strings.
+- Aggregates are list columns, nested as deep as the schema nests them.
+- Selects which only select entities are stored as int64 Step ids. Other
+  selects are stored as a struct of ``type``, ``id``, ``number`` and ``text``,
+  so an ``IfcLabel`` and an ``IfcPropertySet`` can share a column.
+
+Every forward entity reference is also written to an edge table of ``src``,
+``attribute`` and ``dst`` ids. Querying the edge table by ``dst`` gives the
+inverse relationships of an instance without re-parsing the model.
+
+Instances are read in batches, so only one batch per class is held in memory
+at a time. The Arrow and Parquet functions need ``pyarrow`` to be installed.
+:func:`get_column_types` and :func:`iter_columns` don't, and can be used to
+feed other columnar formats.
+
+Example:
+
+.. code:: python
+
+    ifcopenshell.util.tabular.write_parquet(model, "/path/to/model/", workers=4)
+
+    # Query the result with DuckDB
+    duckdb.sql("SELECT * FROM '/path/to/model/IfcWall.parquet'")
+    duckdb.sql("SELECT * FROM '/path/to/model/edges/*.parquet' WHERE dst = 42")
+"""
+
+import os
+import multiprocessing
+import concurrent.futures
+import ifcopenshell
+import ifcopenshell.ifcopenshell_wrapper as ifcopenshell_wrapper
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except:
+    pass  # No Arrow support
+
+BATCH_SIZE = 65536
+
+worker_file = None
+
+
+def get_column_types(schema, ifc_class):
+    """Gets the columns of the table of a class, and what they store
+
+    Each column is described by one of ``"entity"``, ``"integer"``,
+    ``"real"``, ``"string"``, ``"boolean"``, ``"logical"``, ``"enumeration"``
+    and ``"select"``, or a ``("list", column_type)`` tuple for aggregates.
+
+    :param schema: The name of the schema, such as "IFC4"
+    :type schema: str
+    :param ifc_class: The name of a non-abstract entity
+    :type ifc_class: str
+    :return: A dictionary of column names to column types, in table order
+    :rtype: dict
+
+    Example:
+
+    .. code:: python
+
+        ifcopenshell.util.tabular.get_column_types("IFC4", "IfcCartesianPoint")
+        >>> {"id": "entity", "Coordinates": ("list", "real")}
+    """
+    declaration = ifcopenshell_wrapper.schema_by_name(schema).declaration_by_name(ifc_class)
+    columns = {"id": "entity"}
+    for attribute, is_derived in zip(declaration.all_attributes(), declaration.derived()):
+        if not is_derived:
+            columns[attribute.name()] = get_column_type(attribute.type_of_attribute())
+    return columns
+
+
+def get_column_type(attribute_type):
+    while True:
+        if isinstance(attribute_type, ifcopenshell_wrapper.named_type):
+            attribute_type = attribute_type.declared_type()
+        elif isinstance(attribute_type, ifcopenshell_wrapper.type_declaration):
+            attribute_type = attribute_type.declared_type()
+        elif isinstance(attribute_type, ifcopenshell_wrapper.aggregation_type):
+            return ("list", get_column_type(attribute_type.type_of_element()))
+        elif isinstance(attribute_type, ifcopenshell_wrapper.simple_type):
+            simple_type = attribute_type.declared_type()
+            if simple_type in ("real", "number"):
+                return "real"
+            elif simple_type == "binary":
+                return "string"
+            return simple_type
+        elif isinstance(attribute_type, ifcopenshell_wrapper.entity):
+            return "entity"
+        elif isinstance(attribute_type, ifcopenshell_wrapper.enumeration_type):
+            return "enumeration"
+        elif isinstance(attribute_type, ifcopenshell_wrapper.select_type):
+            return "entity" if is_entity_select(attribute_type) else "select"
+
+
+def is_entity_select(select_type):
+    queue = list(select_type.select_list())
+    while queue:
+        declaration = queue.pop()
+        if isinstance(declaration, ifcopenshell_wrapper.select_type):
+            queue.extend(declaration.select_list())
+        elif not isinstance(declaration, ifcopenshell_wrapper.entity):
+            return False
+    return True
+
+
+def get_classes(ifc_file):
+    """Gets the classes which have a table, which are those with instances
+
+    :param ifc_file: The IFC model
+    :type ifc_file: ifcopenshell.file.file
+    :return: A dictionary of class names to the number of instances of exactly
+        that class, largest first
+    :rtype: dict
+    """
+    schema = ifcopenshell_wrapper.schema_by_name(ifc_file.schema)
+    counts = {}
+    for declaration in schema.entities():
+        if not declaration.is_abstract():
+            count = ifc_file.count_type(declaration.name(), include_subtypes=False)
+            if count:
+                counts[declaration.name()] = count
+    return dict(sorted(counts.items(), key=lambda x: -x[1]))
+
+
+def iter_columns(ifc_file, ifc_class, batch_size=BATCH_SIZE):
+    """Iterates over the instances of exactly a class as batches of columns
+
+    This is the format agnostic core of the exporter. Values are converted as
+    described in :mod:`ifcopenshell.util.tabular`, but kept as Python lists.
+
+    :param ifc_file: The IFC model
+    :type ifc_file: ifcopenshell.file.file
+    :param ifc_class: The name of a non-abstract entity. Subtypes are not
+        included.
+    :type ifc_class: str
+    :param batch_size: The maximum number of instances in a batch
+    :type batch_size: int
+    :return: A generator of ``(columns, edges)`` tuples. Columns is a
+        dictionary of column names to lists of values. Edges is a dictionary
+        of "src", "attribute" and "dst" to lists of values.
+    :rtype: generator
+    """
+    column_types = get_column_types(ifc_file.schema, ifc_class)
+    names = list(column_types.keys())[1:]
+    declaration = ifcopenshell_wrapper.schema_by_name(ifc_file.schema).declaration_by_name(ifc_class)
+    indices = [declaration.attribute_index(name) for name in names]
+    converters = [get_converter(column_types[name]) for name in names]
+    has_references = [has_entities(column_types[name]) for name in names]
+
+    by_id = ifc_file.wrapped_data.by_id
+    ids = ifc_file.get_type_ids(ifc_class, include_subtypes=False)
+    for start in range(0, len(ids), batch_size):
+        batch_ids = ids[start : start + batch_size]
+        columns = {name: [] for name in names}
+        edges = {"src": [], "attribute": [], "dst": []}
+        column_values = [columns[name] for name in names]
+        for step_id in batch_ids:
+            instance = by_id(step_id)
+            for name, i, convert, values, has_reference in zip(
+                names, indices, converters, column_values, has_references
+            ):
+                value = instance.get_argument(i)
+                values.append(convert(value))
+                if has_reference and value is not None:
+                    for dst in get_references(value):
+                        edges["src"].append(step_id)
+                        edges["attribute"].append(name)
+                        edges["dst"].append(dst)
+        columns = {"id": list(batch_ids), **columns}
+        yield columns, edges
+
+
+def get_converter(column_type):
+    if isinstance(column_type, tuple):
+        convert_item = get_converter(column_type[1])
+        return lambda v: None if v is None else [convert_item(x) for x in v]
+    elif column_type == "entity":
+        return lambda v: None if v is None else v.id()
+    elif column_type == "logical":
+        return lambda v: None if v == "UNKNOWN" else v
+    elif column_type == "select":
+        return convert_select
+    return lambda v: v
+
+
+def convert_select(value):
+    if value is None:
+        return None
+    elif value.id():
+        return {"type": value.is_a(), "id": value.id(), "number": None, "text": None}
+    value_type = value.is_a()
+    value = value.get_argument(0)
+    if isinstance(value, (bool, int, float)):
+        return {"type": value_type, "id": None, "number": float(value), "text": None}
+    return {"type": value_type, "id": None, "number": None, "text": str(value)}
+
+
+def has_entities(column_type):
+    if isinstance(column_type, tuple):
+        return has_entities(column_type[1])
+    return column_type in ("entity", "select")
+
+
+def get_references(value):
+    values = [value]
+    while values:
+        value = values.pop()
+        if isinstance(value, ifcopenshell_wrapper.entity_instance):
+            if value.id():
+                yield value.id()
+        elif isinstance(value, tuple):
+            values.extend(reversed(value))
+
+
+def get_arrow_schema(schema, ifc_class):
+    """Gets the Arrow schema of the table of a class
+
+    :param schema: The name of the schema, such as "IFC4"
+    :type schema: str
+    :param ifc_class: The name of a non-abstract entity
+    :type ifc_class: str
+    :return: The Arrow schema
+    :rtype: pyarrow.Schema
+    """
+    columns = get_column_types(schema, ifc_class)
+    return pa.schema([pa.field(k, get_arrow_type(v), nullable=(k != "id")) for k, v in columns.items()])
+
+
+def get_arrow_type(column_type):
+    if isinstance(column_type, tuple):
+        return pa.list_(get_arrow_type(column_type[1]))
+    elif column_type in ("entity", "integer"):
+        return pa.int64()
+    elif column_type == "real":
+        return pa.float64()
+    elif column_type in ("boolean", "logical"):
+        return pa.bool_()
+    elif column_type == "select":
+        return pa.struct(
+            [
+                pa.field("type", pa.string()),
+                pa.field("id", pa.int64()),
+                pa.field("number", pa.float64()),
+                pa.field("text", pa.string()),
+            ]
+        )
+    return pa.string()
+
+
+def get_edge_schema():
+    """Gets the Arrow schema of an edge table
+
+    :return: The Arrow schema
+    :rtype: pyarrow.Schema
+    """
+    return pa.schema(
+        [
+            pa.field("src", pa.int64(), nullable=False),
+            pa.field("attribute", pa.string(), nullable=False),
+            pa.field("dst", pa.int64(), nullable=False),
+        ]
+    )
+
+
+def iter_batches(ifc_file, ifc_class, batch_size=BATCH_SIZE):
+    """Iterates over the instances of exactly a class as Arrow record batches
+
+    :param ifc_file: The IFC model
+    :type ifc_file: ifcopenshell.file.file
+    :param ifc_class: The name of a non-abstract entity. Subtypes are not
+        included.
+    :type ifc_class: str
+    :param batch_size: The maximum number of instances in a batch
+    :type batch_size: int
+    :return: A generator of ``(batch, edge_batch)`` tuples of
+        pyarrow.RecordBatch
+    :rtype: generator
+    """
+    schema = get_arrow_schema(ifc_file.schema, ifc_class)
+    edge_schema = get_edge_schema()
+    for columns, edges in iter_columns(ifc_file, ifc_class, batch_size):
+        yield pa.RecordBatch.from_pydict(columns, schema=schema), pa.RecordBatch.from_pydict(edges, schema=edge_schema)
+
+
+def get_table(ifc_file, ifc_class):
+    """Gets the table of all instances of exactly a class
+
+    :param ifc_file: The IFC model
+    :type ifc_file: ifcopenshell.file.file
+    :param ifc_class: The name of a non-abstract entity. Subtypes are not
+        included.
+    :type ifc_class: str
+    :return: The table
+    :rtype: pyarrow.Table
+
+    Example:
+
+    .. code:: python
+
+        walls = ifcopenshell.util.tabular.get_table(model, "IfcWall").to_pandas()
+    """
+    batches = [batch for batch, _ in iter_batches(ifc_file, ifc_class)]
+    return pa.Table.from_batches(batches, schema=get_arrow_schema(ifc_file.schema, ifc_class))
+
+
+def get_edge_table(ifc_file, ifc_class=None):
+    """Gets the table of forward entity references
+
+    :param ifc_file: The IFC model
+    :type ifc_file: ifcopenshell.file.file
+    :param ifc_class: The class whose references are returned, not including
+        subtypes. If None, the references of all instances are returned.
+    :type ifc_class: str,None
+    :return: A table of ``src``, ``attribute`` and ``dst`` columns
+    :rtype: pyarrow.Table
+    """
+    ifc_classes = [ifc_class] if ifc_class else get_classes(ifc_file)
+    batches = [edges for c in ifc_classes for _, edges in iter_batches(ifc_file, c)]
+    return pa.Table.from_batches(batches, schema=get_edge_schema())
+
+
+def write_parquet(ifc_file, directory, batch_size=BATCH_SIZE, workers=None, compression="zstd"):
+    """Writes a model as a directory of Parquet files
+
+    Every class with instances is written to ``{directory}/{IfcClass}.parquet``
+    and its forward references to ``{directory}/edges/{IfcClass}.parquet``.
+    The edge files all have the same schema, so they can be queried as a
+    single dataset.
+
+    :param ifc_file: The IFC model
+    :type ifc_file: ifcopenshell.file.file
+    :param directory: The directory to write to. It is created if it doesn't
+        exist.
+    :type directory: str
+    :param batch_size: The maximum number of instances held in memory per
+        class, which is also the Parquet row group size
+    :type batch_size: int
+    :param workers: The number of processes used to write classes in
+        parallel. Processes are forked, so parallel writing is only available
+        on platforms which support forking. If None or less than 2, classes
+        are written one at a time.
+    :type workers: int,None
+    :param compression: The Parquet compression codec
+    :type compression: str
+    :return: A dictionary of class names to the number of rows written
+    :rtype: dict
+    """
+    global worker_file
+
+    os.makedirs(os.path.join(directory, "edges"), exist_ok=True)
+    ifc_classes = list(get_classes(ifc_file).keys())
+    args = (directory, batch_size, compression)
+    if not workers or workers < 2 or len(ifc_classes) < 2 or "fork" not in multiprocessing.get_all_start_methods():
+        return {c: write_class(ifc_file, c, *args) for c in ifc_classes}
+
+    # Workers inherit the parsed model when forked, so nothing is reparsed or pickled
+    worker_file = ifc_file
+    try:
+        context = multiprocessing.get_context("fork")
+        with concurrent.futures.ProcessPoolExecutor(workers, mp_context=context) as executor:
+            futures = {c: executor.submit(write_worker_class, c, *args) for c in ifc_classes}
+            return {c: future.result() for c, future in futures.items()}
+    finally:
+        worker_file = None
+
+
+def write_worker_class(ifc_class, directory, batch_size, compression):
+    return write_class(worker_file, ifc_class, directory, batch_size, compression)
+
+
+def write_class(ifc_file, ifc_class, directory, batch_size=BATCH_SIZE, compression="zstd"):
+    """Writes the table and edge table of exactly a class as Parquet files
+
+    :param ifc_file: The IFC model
+    :type ifc_file: ifcopenshell.file.file
+    :param ifc_class: The name of a non-abstract entity
+    :type ifc_class: str
+    :param directory: The directory to write to
+    :type directory: str
+    :param batch_size: The maximum number of instances held in memory
+    :type batch_size: int
+    :param compression: The Parquet compression codec
+    :type compression: str
+    :return: The number of rows written
+    :rtype: int
+    """
+    rows = 0
+    schema = get_arrow_schema(ifc_file.schema, ifc_class)
+    table_path = os.path.join(directory, f"{ifc_class}.parquet")
+    edge_path = os.path.join(directory, "edges", f"{ifc_class}.parquet")
+    with pq.ParquetWriter(table_path, schema, compression=compression) as writer:
+        with pq.ParquetWriter(edge_path, get_edge_schema(), compression=compression) as edge_writer:
+            for batch, edges in iter_batches(ifc_file, ifc_class, batch_size):
+                writer.write_batch(batch)
+                edge_writer.write_batch(edges)
+                rows += batch.num_rows
+    return rows
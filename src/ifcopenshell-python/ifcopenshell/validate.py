@@ -24,6 +24,7 @@ import os
 import sys
 import json
 import functools
+import concurrent.futures
 
 from collections import namedtuple
 
@@ -64,6 +65,92 @@ class json_logger:
         return functools.partial(self.log, level)
 
 
+instance_reference = namedtuple("instance_reference", ("id",))
+
+
+def serialise_log_argument(value):
+    if isinstance(value, ifcopenshell.entity_instance) and value.id():
+        return instance_reference(value.id())
+    elif value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    # Schema declarations and attributes can't be pickled, but are only ever formatted as strings
+    return str(value)
+
+
+class recording_logger:
+    """Records the calls to a logger in a worker process, to be replayed in order by the main process"""
+
+    def __init__(self):
+        self.records = []
+
+    def log(self, level, message, *args):
+        self.records.append((level, (message, *map(serialise_log_argument, args))))
+
+    def __getattr__(self, level):
+        if level in ("debug", "info", "warning", "error", "critical"):
+            return functools.partial(self.log, level)
+        raise AttributeError(level)
+
+
+class recording_json_logger(recording_logger):
+    def set_state(self, key, value):
+        self.records.append(("set_state", (key, serialise_log_argument(value))))
+
+    def __getattr__(self, level):
+        return functools.partial(self.log, level)
+
+
+def replay_log(f, logger, records):
+    for method, args in records:
+        getattr(logger, method)(*[f.by_id(a.id) if isinstance(a, instance_reference) else a for a in args])
+
+
+worker_file = None
+
+
+def load_worker_file(filepath=None, data=None):
+    global worker_file
+    ifcopenshell.ifcopenshell_wrapper.set_log_format_json()
+    if filepath:
+        worker_file = ifcopenshell.open(filepath)
+    else:
+        worker_file = ifcopenshell.file.from_string(data)
+    # Errors reported while parsing the file are already logged by the main process
+    ifcopenshell.get_log()
+
+
+def validate_shard(scope, ids, is_json):
+    logger = recording_json_logger() if is_json else recording_logger()
+    if scope == "schema":
+        attribute_value_derived_org = ifcopenshell.ifcopenshell_wrapper.get_feature("use_attribute_value_derived")
+        ifcopenshell.ifcopenshell_wrapper.set_feature("use_attribute_value_derived", True)
+        try:
+            schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(worker_file.schema)
+            validate_instances((worker_file.by_id(i) for i in ids), schema, logger)
+        finally:
+            ifcopenshell.ifcopenshell_wrapper.set_feature("use_attribute_value_derived", attribute_value_derived_org)
+    elif scope == "type":
+        ifcopenshell.express.rule_executor.run(worker_file, logger, scopes=("type",), instance_ids=ids)
+    elif scope == "entity":
+        ifcopenshell.express.rule_executor.run(worker_file, logger, scopes=("entity",), entity_rules=ids)
+    return logger.records, ifcopenshell.get_log()
+
+
+def submit_shards(executor, scope, ids, workers, is_json):
+    # Shards are contiguous so that replaying them in order gives the same output as a serial run
+    size = max(1, -(-len(ids) // (workers * 4)))
+    return [executor.submit(validate_shard, scope, ids[i : i + size], is_json) for i in range(0, len(ids), size)]
+
+
+def replay_shards(f, logger, futures):
+    logs = []
+    for future in futures:
+        records, log = future.result()
+        replay_log(f, logger, records)
+        logs.append(log)
+    return "\n".join(logs)
+
+
 simple_type_python_mapping = {
     # @todo should include unicode for Python2
     "string": str,
@@ -221,13 +308,14 @@ def assert_valid(attr_type, val, schema, no_throw=False, attr=None):
         return True
 
 
-def log_internal_cpp_errors(filename, logger):
+def log_internal_cpp_errors(filename, logger, log=None):
     import re
     import bisect
 
     chr_offset_re = re.compile(r"at offset (\d+)\s*")
 
-    log = ifcopenshell.get_log()
+    if log is None:
+        log = ifcopenshell.get_log()
     msgs = list(map(json.loads, filter(None, log.split("\n"))))
     chr_offsets = [chr_offset_re.findall(m["message"]) for m in msgs]
     if chr_offsets:
@@ -271,64 +359,8 @@ def get_entity_attributes(schema, entity):
     return entity_attrs
 
 
-def validate(f, logger, express_rules=False):
-    """
-    For an IFC population model `f` (or filepath to such a file) validate whether the entity attribute values are correctly supplied. As this
-    is a function that is applied after a file has been parsed, certain types of errors in syntax, duplicate
-    numeric identifiers or invalidate entity names are not caught by this function. Some of these might have been
-    logged and can be retrieved by calling `ifcopenshell.get_log()`. A verification of the type, entity and global
-    WHERE rules is also not implemented.
-
-    For every entity instance in the model, it is checked that the entity is not abstract that every attribute value
-    is of the correct type and that the inverse attributes are of the correct cardinality.
-
-    Express simple types are checked for their valuation type. For select types it is asserted that the value conforms
-    to one of the leaves. For enumerations it is checked that the value is indeed on of the items. For aggregations it
-    is checked that the elements and the cardinality conforms. Type declarations (IfcInteger which is an integer) are
-    unpacked until one of the above cases is reached.
-
-    It is recommended to supply the path to the file, so that internal C++ errors reported during the parse stage
-    are also captured.
-    """
-
-    # Originally there was no way in Python to distinguish on an entity instance attribute value whether the
-    # value supplied in the model was NIL ($) or 'missing because derived in subtype' (*). For validation this
-    # however this may be important, and hence a feature switch has been implemented to return *-values as
-    # instances of a dedicated type `ifcopenshell.ifcopenshell_wrapper.attribute_value_derived`.
-    attribute_value_derived_org = ifcopenshell.ifcopenshell_wrapper.get_feature("use_attribute_value_derived")
-    ifcopenshell.ifcopenshell_wrapper.set_feature("use_attribute_value_derived", True)
-
-    filename = None
-
-    if hasattr(logger, 'set_state'):
-        logger.set_state('type', 'schema')
-
-    if not isinstance(f, ifcopenshell.file):
-
-        # get_log() clears log existing output
-        ifcopenshell.get_log()
-        # @todo restore log format
-        ifcopenshell.ifcopenshell_wrapper.set_log_format_json()
-
-        filename = f
-        try:
-            f = ifcopenshell.open(f)
-        except ifcopenshell.SchemaError as e:
-            current_dir_files = {fn.lower(): fn for fn in os.listdir('.')}
-            schema_name = str(e).split(' ')[-1].lower()
-            exists = current_dir_files.get(schema_name + '.exp')
-            if exists:
-                schema = ifcopenshell.express.parse(exists)
-                ifcopenshell.register_schema(schema)
-
-                f = ifcopenshell.open(f)
-            else:
-                raise e
-
-        log_internal_cpp_errors(filename, logger)
-
-    schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(f.schema)
-    for inst in f:
+def validate_instances(instances, schema, logger):
+    for inst in instances:
         if hasattr(logger, "set_state"):
             logger.set_state('instance', inst)
 
@@ -416,22 +448,114 @@ def validate(f, logger, express_rules=False):
                 else:
                     logger.error("For instance:\n    %s\n%s", inst, e)
 
-    if filename:
-        # IfcOpenShell uses lazy-loading, so entity instance
-        # attributes aren't parsed yet, and counts aren't verified yet.
-        # Re capturing the log when validate() is finished
-        # iterating over every instance so that all attribute counts
-        # are verified.
-        log_internal_cpp_errors(filename, logger)
 
-    # Restore the original value for 'use_attribute_value_derived'
-    ifcopenshell.ifcopenshell_wrapper.set_feature("use_attribute_value_derived", attribute_value_derived_org)
+def validate(f, logger, express_rules=False, workers=None):
+    """
+    For an IFC population model `f` (or filepath to such a file) validate whether the entity attribute values are correctly supplied. As this
+    is a function that is applied after a file has been parsed, certain types of errors in syntax, duplicate
+    numeric identifiers or invalidate entity names are not caught by this function. Some of these might have been
+    logged and can be retrieved by calling `ifcopenshell.get_log()`. A verification of the type, entity and global
+    WHERE rules is also not implemented.
+
+    For every entity instance in the model, it is checked that the entity is not abstract that every attribute value
+    is of the correct type and that the inverse attributes are of the correct cardinality.
+
+    Express simple types are checked for their valuation type. For select types it is asserted that the value conforms
+    to one of the leaves. For enumerations it is checked that the value is indeed on of the items. For aggregations it
+    is checked that the elements and the cardinality conforms. Type declarations (IfcInteger which is an integer) are
+    unpacked until one of the above cases is reached.
+
+    It is recommended to supply the path to the file, so that internal C++ errors reported during the parse stage
+    are also captured.
+
+    If `workers` is more than 1, instances and rules are partitioned into shards which are validated by a pool of
+    worker processes. If a path is supplied, each worker re-opens the file from that path. The output of each shard
+    is replayed into the logger in order, so that it is identical to the output of a serial run.
+    """
+
+    # Originally there was no way in Python to distinguish on an entity instance attribute value whether the
+    # value supplied in the model was NIL ($) or 'missing because derived in subtype' (*). For validation this
+    # however this may be important, and hence a feature switch has been implemented to return *-values as
+    # instances of a dedicated type `ifcopenshell.ifcopenshell_wrapper.attribute_value_derived`.
+    attribute_value_derived_org = ifcopenshell.ifcopenshell_wrapper.get_feature("use_attribute_value_derived")
+    ifcopenshell.ifcopenshell_wrapper.set_feature("use_attribute_value_derived", True)
+
+    filename = None
 
-    if express_rules:
-        if hasattr(logger, 'set_state'):
-            logger.set_state('instance', None)
-            logger.set_state('attribute', None)
-        ifcopenshell.express.rule_executor.run(f, logger)
+    if hasattr(logger, 'set_state'):
+        logger.set_state('type', 'schema')
+
+    if not isinstance(f, ifcopenshell.file):
+
+        # get_log() clears log existing output
+        ifcopenshell.get_log()
+        # @todo restore log format
+        ifcopenshell.ifcopenshell_wrapper.set_log_format_json()
+
+        filename = f
+        try:
+            f = ifcopenshell.open(f)
+        except ifcopenshell.SchemaError as e:
+            current_dir_files = {fn.lower(): fn for fn in os.listdir('.')}
+            schema_name = str(e).split(' ')[-1].lower()
+            exists = current_dir_files.get(schema_name + '.exp')
+            if exists:
+                schema = ifcopenshell.express.parse(exists)
+                ifcopenshell.register_schema(schema)
+
+                f = ifcopenshell.open(f)
+            else:
+                raise e
+
+        log_internal_cpp_errors(filename, logger)
+
+    schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(f.schema)
+    is_json = hasattr(logger, "set_state")
+    executor = None
+    try:
+        if workers and workers > 1:
+            initargs = (filename, None) if filename else (None, f.to_string())
+            executor = concurrent.futures.ProcessPoolExecutor(workers, initializer=load_worker_file, initargs=initargs)
+            ids = list(f.wrapped_data.entity_names())
+            schema_futures = submit_shards(executor, "schema", ids, workers, is_json)
+            if express_rules:
+                # Queue the rules straight away, so workers aren't idle while the results are replayed
+                type_futures = submit_shards(executor, "type", ids, workers, is_json)
+                rules, _ = ifcopenshell.express.rule_executor.load_rules(
+                    f.schema, *ifcopenshell.express.rule_executor.get_source(f.schema)
+                )
+                entity_rules = [r.__name__ for r in rules if r.SCOPE == "entity"]
+                entity_futures = submit_shards(executor, "entity", entity_rules, workers, is_json)
+            worker_log = replay_shards(f, logger, schema_futures)
+        else:
+            validate_instances(f, schema, logger)
+
+        if filename:
+            # IfcOpenShell uses lazy-loading, so entity instance
+            # attributes aren't parsed yet, and counts aren't verified yet.
+            # Re capturing the log when validate() is finished
+            # iterating over every instance so that all attribute counts
+            # are verified.
+            log = "\n".join((ifcopenshell.get_log(), worker_log)) if executor else None
+            log_internal_cpp_errors(filename, logger, log)
+
+        # Restore the original value for 'use_attribute_value_derived'
+        ifcopenshell.ifcopenshell_wrapper.set_feature("use_attribute_value_derived", attribute_value_derived_org)
+
+        if express_rules:
+            if hasattr(logger, 'set_state'):
+                logger.set_state('instance', None)
+                logger.set_state('attribute', None)
+            if executor:
+                ifcopenshell.express.rule_executor.run(f, logger, scopes=("file",))
+                replay_shards(f, logger, type_futures)
+                replay_shards(f, logger, entity_futures)
+            else:
+                ifcopenshell.express.rule_executor.run(f, logger)
+    finally:
+        # Don't leak the worker processes when validation fails
+        if executor:
+            executor.shutdown(cancel_futures=True)
 
 
 if __name__ == "__main__":
@@ -440,6 +564,7 @@ if __name__ == "__main__":
 
     filenames = [x for x in sys.argv[1:] if not x.startswith("--")]
     flags = set(x for x in sys.argv[1:] if x.startswith("--"))
+    workers = next((int(x.split("=")[1]) for x in flags if x.startswith("--workers=")), None)
 
     for fn in filenames:
         if "--json" in flags:
@@ -449,7 +574,7 @@ if __name__ == "__main__":
             logger.setLevel(logging.DEBUG)
 
         print("Validating", fn, file=sys.stderr)
-        validate(fn, logger, "--rules" in flags)
+        validate(fn, logger, "--rules" in flags, workers=workers)
 
         if "--json" in flags:
             sys.stdout.reconfigure(encoding='utf-8')
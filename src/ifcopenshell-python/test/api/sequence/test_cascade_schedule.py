@@ -20,6 +20,7 @@ import pytest
 import datetime
 import test.bootstrap
 import ifcopenshell.api
+import ifcopenshell.guid
 
 
 class TestCascadeSchedule(test.bootstrap.IFC4):
@@ -62,6 +63,50 @@ class TestCascadeSchedule(test.bootstrap.IFC4):
             self._create_sequence(task2, task, "FINISH_START")
             ifcopenshell.api.run("sequence.cascade_schedule", self.file, task=task)
 
+    def test_ignoring_cycles_which_dates_do_not_cascade_into(self):
+        task = self._create_task("P1D")
+        task2 = self._create_task("P1D")
+        task3 = self._create_task("P1D")
+        task4 = self._create_task("P1D")
+        self._create_raw_sequence(task, task2, "START_START")
+        self._create_raw_sequence(task2, task3, "START_START")
+        self._create_raw_sequence(task3, task2, "START_START")
+        self._create_raw_sequence(task, task4, "FINISH_START")
+        self._create_raw_sequence(task3, task4, "FINISH_START")
+
+        ifcopenshell.api.run("sequence.cascade_schedule", self.file, task=task)
+        assert task2.TaskTime.ScheduleStart == "2000-01-01T09:00:00"
+        assert task3.TaskTime.ScheduleStart == "2000-01-01T09:00:00"
+        # Tasks waiting on the unchanged cycle are still cascaded
+        assert task4.TaskTime.ScheduleStart == "2000-01-02T09:00:00"
+        assert task4.TaskTime.ScheduleFinish == "2000-01-02T17:00:00"
+
+    def test_catching_cyclic_relationships_which_dates_cascade_into(self):
+        task = self._create_task("P1D")
+        task2 = self._create_task("P1D")
+        task3 = self._create_task("P1D")
+        self._create_raw_sequence(task, task2, "START_START")
+        self._create_raw_sequence(task2, task3, "FINISH_START")
+        self._create_raw_sequence(task3, task2, "FINISH_START")
+        with pytest.raises(RecursionError):
+            ifcopenshell.api.run("sequence.cascade_schedule", self.file, task=task)
+
+    def test_cascading_through_diamonds_from_the_latest_predecessor(self):
+        task = self._create_task("P1D")
+        task2 = self._create_task("P2D")
+        task3 = self._create_task("P1D")
+        task4 = self._create_task("P1D")
+        self._create_raw_sequence(task, task2, "FINISH_START")
+        self._create_raw_sequence(task, task3, "FINISH_START")
+        self._create_raw_sequence(task2, task4, "FINISH_START")
+        self._create_raw_sequence(task3, task4, "FINISH_START")
+
+        ifcopenshell.api.run("sequence.cascade_schedule", self.file, task=task)
+        assert task2.TaskTime.ScheduleFinish == "2000-01-03T17:00:00"
+        assert task3.TaskTime.ScheduleFinish == "2000-01-02T17:00:00"
+        assert task4.TaskTime.ScheduleStart == "2000-01-04T09:00:00"
+        assert task4.TaskTime.ScheduleFinish == "2000-01-04T17:00:00"
+
     def test_cascading_finish_to_start(self):
         task = self._create_task("P1D")
         task2 = self._create_task("P2D")
@@ -176,3 +221,9 @@ class TestCascadeSchedule(test.bootstrap.IFC4):
             ifcopenshell.api.run(
                 "sequence.assign_lag_time", self.file, rel_sequence=rel, lag_value=lag, duration_type="WORKTIME"
             )
+
+    def _create_raw_sequence(self, predecessor, successor, relationship):
+        # Unlike sequence.assign_sequence, this doesn't cascade dates
+        return self.file.createIfcRelSequence(
+            ifcopenshell.guid.new(), RelatingProcess=predecessor, RelatedProcess=successor, SequenceType=relationship
+        )
@@ -269,6 +269,51 @@ class TestRecalculateSchedule(test.bootstrap.IFC4):
         assert task2.TaskTime.FreeFloat == "P0D"
         assert task2.TaskTime.IsCritical is True
 
+    def test_recalculating_floats_of_parallel_paths(self):
+        self._add_work_schedule()
+        task = self._create_task("P1D")
+        task2 = self._create_task("P3D")
+        task3 = self._create_task("P1D")
+        task4 = self._create_task("P1D")
+        task5 = self._create_task("P1D")
+        self._create_sequence(task, task2, "FINISH_START")
+        self._create_sequence(task2, task4, "FINISH_START")
+        self._create_sequence(task, task3, "FINISH_START")
+        self._create_sequence(task3, task5, "FINISH_START")
+        self._create_sequence(task5, task4, "FINISH_START")
+        ifcopenshell.api.run("sequence.recalculate_schedule", self.file, work_schedule=self.work_schedule)
+        for critical_task in (task, task2, task4):
+            assert critical_task.TaskTime.TotalFloat == "P0D"
+            assert critical_task.TaskTime.IsCritical is True
+        assert task4.TaskTime.EarlyStart == "2000-01-05T09:00:00"
+        assert task4.TaskTime.LateStart == "2000-01-05T09:00:00"
+        assert task3.TaskTime.EarlyStart == "2000-01-02T09:00:00"
+        assert task3.TaskTime.EarlyFinish == "2000-01-02T17:00:00"
+        assert task3.TaskTime.LateStart == "2000-01-03T09:00:00"
+        assert task3.TaskTime.LateFinish == "2000-01-03T17:00:00"
+        assert task3.TaskTime.TotalFloat == "P1D"
+        # Any delay is immediately passed on to task5
+        assert task3.TaskTime.FreeFloat == "P0D"
+        assert task3.TaskTime.IsCritical is False
+        assert task5.TaskTime.EarlyStart == "2000-01-03T09:00:00"
+        assert task5.TaskTime.LateStart == "2000-01-04T09:00:00"
+        assert task5.TaskTime.TotalFloat == "P1D"
+        assert task5.TaskTime.FreeFloat == "P1D"
+        assert task5.TaskTime.IsCritical is False
+
+    def test_recalculating_a_task_with_many_predecessors_once_they_are_all_calculated(self):
+        self._add_work_schedule()
+        task = self._create_task("P1D")
+        successor = self._create_task("P1D")
+        predecessors = [self._create_task(f"P{i}D") for i in range(1, 5)]
+        for predecessor in predecessors:
+            self._create_sequence(task, predecessor, "FINISH_START")
+            self._create_sequence(predecessor, successor, "FINISH_START")
+        ifcopenshell.api.run("sequence.recalculate_schedule", self.file, work_schedule=self.work_schedule)
+        assert successor.TaskTime.EarlyStart == "2000-01-06T09:00:00"
+        assert [p.TaskTime.TotalFloat for p in predecessors] == ["P3D", "P2D", "P1D", "P0D"]
+        assert [p.TaskTime.IsCritical for p in predecessors] == [False, False, False, True]
+
     def _add_work_schedule(self):
         ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcProject")
         self.work_schedule = ifcopenshell.api.run("sequence.add_work_schedule", self.file)
@@ -0,0 +1,208 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+import sys
+import pickle
+import pytest
+import numpy as np
+import ifcopenshell.geom
+import ifcopenshell.geom.batch as subject
+
+
+class Geometry:
+    def __init__(self, verts, faces, normals=(), material_ids=(), materials=()):
+        self.verts = tuple(verts)
+        self.faces = tuple(faces)
+        self.normals = tuple(normals)
+        self.material_ids = tuple(material_ids)
+        self.materials = list(materials)
+
+
+class Matrix:
+    def __init__(self, data):
+        self.data = tuple(data)
+
+
+class Transformation:
+    def __init__(self, data):
+        self.matrix = Matrix(data)
+
+
+class Shape:
+    def __init__(self, id, geometry, translation=(0.0, 0.0, 0.0)):
+        self.id = id
+        self.guid = f"guid{id}"
+        self.geometry = geometry
+        self.transformation = Transformation((1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, *translation))
+
+
+class Material:
+    def __init__(self, name):
+        self.name = name
+
+
+def get_triangle(normals=(), material_ids=(), materials=()):
+    return Geometry((0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 0.0), (0, 1, 2), normals, material_ids, materials)
+
+
+def get_square(normals=(), material_ids=(), materials=()):
+    verts = (0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 1.0, 0.0)
+    return Geometry(verts, (0, 1, 2, 0, 2, 3), normals, material_ids, materials)
+
+
+class TestPackShapes:
+    def test_run(self):
+        batch = subject.pack_shapes([Shape(1, get_triangle()), Shape(2, get_square(), (10.0, 0.0, 0.0))])
+        assert len(batch) == 2
+        assert batch.ids.tolist() == [1, 2]
+        assert batch.guids == ["guid1", "guid2"]
+        assert batch.vert_offsets.tolist() == [0, 3, 7]
+        assert batch.face_offsets.tolist() == [0, 1, 3]
+        assert batch.verts.shape == (7, 3)
+        assert batch.faces.tolist() == [[0, 1, 2], [3, 4, 5], [3, 5, 6]]
+        assert batch.get_faces(1).tolist() == [[0, 1, 2], [0, 2, 3]]
+        assert batch.get_vertices(1).tolist() == [[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [1.0, 1.0, 0.0], [0.0, 1.0, 0.0]]
+
+    def test_converting_matrices(self):
+        batch = subject.pack_shapes([Shape(1, get_triangle(), (1.0, 2.0, 3.0))])
+        matrix = np.eye(4)
+        matrix[:3, 3] = (1.0, 2.0, 3.0)
+        assert batch.matrices.tolist() == [matrix.tolist()]
+
+    def test_placing_vertices(self):
+        batch = subject.pack_shapes([Shape(1, get_triangle()), Shape(2, get_triangle(), (10.0, 0.0, 0.0))])
+        assert batch.get_placed_vertices()[:, 0].tolist() == [0.0, 1.0, 0.0, 10.0, 11.0, 10.0]
+
+    def test_packing_plain_geometries(self):
+        batch = subject.pack_shapes([get_triangle()])
+        assert batch.ids.tolist() == [0]
+        assert batch.matrices.tolist() == [np.eye(4).tolist()]
+
+    def test_packing_normals(self):
+        normals = (0.0, 0.0, 1.0) * 3
+        batch = subject.pack_shapes([Shape(1, get_triangle(normals)), Shape(2, get_triangle())])
+        assert batch.normals[:3].tolist() == [[0.0, 0.0, 1.0]] * 3
+        assert np.isnan(batch.normals[3:]).all()
+
+    def test_offsetting_material_ids_into_the_batch_materials(self):
+        a, b, c = Material("A"), Material("B"), Material("C")
+        batch = subject.pack_shapes(
+            [
+                Shape(1, get_triangle(material_ids=(0,), materials=(a,))),
+                Shape(2, get_square(material_ids=(1, -1), materials=(b, c))),
+                Shape(3, get_triangle()),
+            ]
+        )
+        assert batch.materials == [a, b, c]
+        assert batch.material_ids.tolist() == [0, 2, -1, -1]
+
+    def test_packing_nothing(self):
+        batch = subject.pack_shapes([])
+        assert len(batch) == 0
+        assert batch.verts.shape == (0, 3)
+        assert batch.get_placed_vertices().shape == (0, 3)
+
+
+class TestSharedBatches:
+    def test_run(self):
+        batch = subject.pack_shapes([Shape(1, get_triangle(materials=(Material("A"),)))], shared=True)
+        try:
+            handle = pickle.loads(pickle.dumps(batch.share()))
+            attached = subject.ShapeBatch.from_shared(handle)
+            assert attached.ids.tolist() == [1]
+            assert attached.guids == ["guid1"]
+            assert attached.materials == ["A"]
+            assert attached.verts.tolist() == batch.verts.tolist()
+            assert attached.faces.tolist() == batch.faces.tolist()
+            attached.verts[0, 0] = 5.0
+            assert batch.verts[0, 0] == 5.0
+            attached.close()
+        finally:
+            batch.unlink()
+
+    def test_only_sharing_shared_batches(self):
+        with pytest.raises(ValueError):
+            subject.pack_shapes([Shape(1, get_triangle())]).share()
+
+
+class Iterator(ifcopenshell.geom.iterator):
+    """Has the interface of a geometry iterator, without tessellating anything"""
+
+    def __init__(self, settings=None, file_or_filename=None, num_threads=1, include=None, exclude=None):
+        self.shapes = [Shape(i, get_triangle()) for i in range(1, 6)]
+        self.index = 0
+        self.cache = None
+
+    def initialize(self):
+        return bool(self.shapes)
+
+    def get(self):
+        return self.shapes[self.index]
+
+    def next(self):
+        self.index += 1
+        return self.index < len(self.shapes)
+
+    def set_cache(self, cache):
+        self.cache = cache
+
+
+class Cache:
+    def __init__(self, path, settings):
+        self.path = path
+
+
+class TestIterBatches:
+    def test_run(self):
+        batches = list(Iterator().iter_batches(batch_size=2))
+        assert [b.ids.tolist() for b in batches] == [[1, 2], [3, 4], [5]]
+        assert batches[2].guids == ["guid5"]
+
+    def test_iterating_nothing(self):
+        iterator = Iterator()
+        iterator.shapes = []
+        assert list(iterator.iter_batches()) == []
+
+    def test_iterating_shared_batches(self):
+        batches = list(Iterator().iter_batches(batch_size=3, shared=True))
+        try:
+            assert [len(b) for b in batches] == [3, 2]
+            assert all(b.shm is not None for b in batches)
+        finally:
+            for batch in batches:
+                batch.unlink()
+
+
+class TestIterateArrays:
+    def test_run(self, monkeypatch):
+        monkeypatch.setattr(sys.modules["ifcopenshell.geom.main"], "iterator", Iterator)
+        batches = list(ifcopenshell.geom.iterate_arrays(None, ifcopenshell.file(), batch_size=4))
+        assert [b.ids.tolist() for b in batches] == [[1, 2, 3, 4], [5]]
+
+    def test_using_a_cache(self, monkeypatch):
+        iterators = []
+
+        def create_iterator(*args):
+            iterators.append(Iterator(*args))
+            return iterators[-1]
+
+        main = sys.modules["ifcopenshell.geom.main"]
+        monkeypatch.setattr(main, "iterator", create_iterator)
+        monkeypatch.setattr(main.serializers, "hdf5", Cache, raising=False)
+        batches = list(ifcopenshell.geom.iterate_arrays(None, ifcopenshell.file(), cache="cache.h5"))
+        assert [b.ids.tolist() for b in batches] == [[1, 2, 3, 4, 5]]
+        assert iterators[0].cache.path == "cache.h5"
@@ -0,0 +1,242 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import numpy as np
+import ifcopenshell
+import ifcopenshell.api
+import ifcopenshell.geom
+import ifcopenshell.util.fingerprint
+import ifcopenshell.util.unit
+import test.bootstrap
+import ifcopenshell.geom.batch
+import ifcopenshell.geom.cache as subject
+
+
+class Geometry:
+    def __init__(self, x=1.0):
+        self.verts = (0.0, 0.0, 0.0, x, 0.0, 0.0, 0.0, 1.0, 0.0)
+        self.faces = (0, 1, 2)
+        self.edges = ()
+        self.normals = (0.0, 0.0, 1.0) * 3
+        self.material_ids = (0,)
+        self.materials = [Material()]
+
+
+class Material:
+    name = "Concrete"
+    has_diffuse = True
+    diffuse = (0.5, 0.5, 0.5)
+    has_transparency = False
+    transparency = 0.0
+
+
+class Shape:
+    def __init__(self, element):
+        self.id = element.id()
+        self.guid = element.GlobalId
+        self.geometry = Geometry()
+
+
+class Settings:
+    USE_WORLD_COORDS = 0
+    WELD_VERTICES = 1
+
+    def __init__(self, values=None):
+        self.values = values or {}
+
+    def get(self, setting):
+        return self.values.get(setting, False)
+
+    def get_deflection_tolerance(self):
+        return 0.001
+
+
+class TestPutAndGet:
+    def test_run(self, tmp_path):
+        cache = subject.open(str(tmp_path))
+        assert cache.get("a" * 32) is None
+        cache.put("a" * 32, Geometry())
+        geometry = cache.get("a" * 32)
+        assert geometry.verts.tolist() == list(Geometry().verts)
+        assert geometry.faces.tolist() == [0, 1, 2]
+        assert geometry.normals.tolist() == list(Geometry().normals)
+        assert geometry.material_ids.tolist() == [0]
+        assert geometry.materials[0].name == "Concrete"
+        assert geometry.materials[0].diffuse == (0.5, 0.5, 0.5)
+        assert geometry.materials[0].has_transparency is False
+
+    def test_ignoring_corrupt_entries(self, tmp_path):
+        cache = subject.open(str(tmp_path))
+        path = cache.get_path("a" * 32)
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(b"PK\x03\x04garbage")
+        assert cache.get("a" * 32) is None
+
+    def test_not_leaving_temporary_files(self, tmp_path):
+        cache = subject.open(str(tmp_path))
+        cache.put("a" * 32, Geometry())
+        assert os.listdir(os.path.join(tmp_path, "aa")) == ["a" * 32 + ".npz"]
+
+
+class TestEvict:
+    def test_evicting_the_least_recently_used_entries(self, tmp_path):
+        cache = subject.open(str(tmp_path))
+        for i, key in enumerate(("a" * 32, "b" * 32, "c" * 32)):
+            cache.put(key, Geometry())
+            os.utime(cache.get_path(key), (1000 + i, 1000 + i))
+        entry_size = cache.get_size() // 3
+        assert cache.get("a" * 32) is not None  # Marks a as recently used
+        cache.max_size = entry_size * 3
+        cache.put("d" * 32, Geometry())
+        assert cache.get("b" * 32) is None
+        assert cache.get("a" * 32) is not None
+        assert cache.get("d" * 32) is not None
+        assert cache.get_size() <= cache.max_size
+
+    def test_clearing(self, tmp_path):
+        cache = subject.open(str(tmp_path))
+        cache.put("a" * 32, Geometry())
+        cache.clear()
+        assert cache.get_size() == 0
+        assert cache.get("a" * 32) is None
+
+
+class TestGetSettingsDigest:
+    def test_run(self):
+        digest = subject.get_settings_digest(subject.get_settings_values(Settings()))
+        assert digest == subject.get_settings_digest(subject.get_settings_values(Settings()))
+        assert digest != subject.get_settings_digest(subject.get_settings_values(Settings({1: True})))
+
+    def test_reading_values_of_settings(self):
+        values = subject.get_settings_values(Settings({1: True}))
+        assert values == {"USE_WORLD_COORDS": False, "WELD_VERTICES": True, "get_deflection_tolerance": 0.001}
+
+    def test_reading_values_of_wrapper_settings(self):
+        assert subject.get_settings_values(ifcopenshell.geom.settings())
+
+
+class TestGetKeyIFC4(test.bootstrap.IFC4):
+    def create_element(self, x=1.0):
+        element = self.file.createIfcWall(ifcopenshell.guid.new())
+        context = self.file.by_type("IfcGeometricRepresentationContext")
+        context = context[0] if context else self.file.createIfcGeometricRepresentationContext()
+        item = self.file.createIfcCartesianPoint((x, 0.0, 0.0))
+        representation = self.file.createIfcShapeRepresentation(context, "Body", "Point", [item])
+        element.Representation = self.file.createIfcProductDefinitionShape(Representations=[representation])
+        return element
+
+    def get_key(self, element, settings_digest="settings"):
+        hasher = ifcopenshell.util.fingerprint.Hasher(ignored_classes=["IfcOwnerHistory"])
+        unit_scale = ifcopenshell.util.unit.calculate_unit_scale(self.file)
+        return subject.open(self.cache_dir).get_key(element, settings_digest, hasher, unit_scale=unit_scale)
+
+    def test_sharing_keys_between_identical_geometry(self, tmp_path):
+        self.cache_dir = str(tmp_path)
+        assert self.get_key(self.create_element()) == self.get_key(self.create_element())
+
+    def test_changing_keys_with_geometry(self, tmp_path):
+        self.cache_dir = str(tmp_path)
+        assert self.get_key(self.create_element(1.0)) != self.get_key(self.create_element(2.0))
+
+    def test_changing_keys_with_length_units(self, tmp_path):
+        self.cache_dir = str(tmp_path)
+        keys = []
+        for prefix in ("MILLI", None):
+            self.file = ifcopenshell.file()
+            project = self.file.createIfcProject(ifcopenshell.guid.new())
+            unit = self.file.createIfcSIUnit(UnitType="LENGTHUNIT", Prefix=prefix, Name="METRE")
+            project.UnitsInContext = self.file.createIfcUnitAssignment([unit])
+            keys.append(self.get_key(self.create_element()))
+        assert keys[0] != keys[1]
+
+    def test_changing_keys_with_settings(self, tmp_path):
+        self.cache_dir = str(tmp_path)
+        element = self.create_element()
+        assert self.get_key(element, "a") != self.get_key(element, "b")
+
+    def test_changing_keys_with_styles(self, tmp_path):
+        self.cache_dir = str(tmp_path)
+        element = self.create_element()
+        key = self.get_key(element)
+        item = element.Representation.Representations[0].Items[0]
+        self.file.createIfcStyledItem(item, [self.file.createIfcSurfaceStyle("Red", "BOTH", [])])
+        assert self.get_key(element) != key
+
+    def test_changing_keys_with_openings(self, tmp_path):
+        self.cache_dir = str(tmp_path)
+        element = self.create_element()
+        key = self.get_key(element)
+        opening = self.file.createIfcOpeningElement(ifcopenshell.guid.new())
+        self.file.createIfcRelVoidsElement(ifcopenshell.guid.new(), None, None, None, element, opening)
+        assert self.get_key(element) != key
+
+    def test_changing_keys_with_materials(self, tmp_path):
+        self.cache_dir = str(tmp_path)
+        element = self.create_element()
+        key = self.get_key(element)
+        material = self.file.createIfcMaterial("Concrete")
+        self.file.createIfcRelAssociatesMaterial(
+            ifcopenshell.guid.new(), RelatedObjects=[element], RelatingMaterial=material
+        )
+        assert self.get_key(element) != key
+
+
+class TestIterateIFC4(test.bootstrap.IFC4):
+    def test_yielding_cached_shapes_without_tessellating(self, tmp_path):
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcProject")
+        ifcopenshell.api.run("unit.assign_unit", self.file)
+        element = self.file.createIfcWall(ifcopenshell.guid.new())
+        element.ObjectPlacement = self.file.createIfcLocalPlacement(
+            None, self.file.createIfcAxis2Placement3D(self.file.createIfcCartesianPoint((1000.0, 0.0, 0.0)))
+        )
+        settings = Settings()
+        cache = subject.open(str(tmp_path))
+        hasher = ifcopenshell.util.fingerprint.Hasher(ignored_classes=["IfcOwnerHistory"])
+        settings_digest = subject.get_settings_digest(subject.get_settings_values(settings))
+        unit_scale = ifcopenshell.util.unit.calculate_unit_scale(self.file)
+        cache.put(cache.get_key(element, settings_digest, hasher, unit_scale=unit_scale), Geometry())
+
+        shapes = list(cache.iterate(settings, self.file, [element]))
+        assert len(shapes) == 1
+        assert shapes[0].id == element.id()
+        assert shapes[0].guid == element.GlobalId
+        assert shapes[0].geometry.verts.tolist() == list(Geometry().verts)
+        # Translations are converted to SI units, just like a geometry iterator
+        assert shapes[0].transformation.matrix.data == (1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0)
+
+        batch = ifcopenshell.geom.batch.pack_shapes(shapes)
+        assert batch.get_placed_vertices()[:, 0].tolist() == [1.0, 2.0, 1.0]
+
+    def test_caching_tessellated_misses(self, tmp_path, monkeypatch):
+        element = self.file.createIfcWall(ifcopenshell.guid.new())
+        element.ObjectPlacement = self.file.createIfcLocalPlacement(
+            None, self.file.createIfcAxis2Placement3D(self.file.createIfcCartesianPoint((0.0, 0.0, 0.0)))
+        )
+        monkeypatch.setattr(ifcopenshell.geom, "iterator", lambda s, f, n, include: [Shape(e) for e in include])
+        cache = subject.open(str(tmp_path))
+        assert len(list(cache.iterate(Settings(), self.file, [element]))) == 1
+        assert len(cache.get_entries()) == 1
+
+    def test_not_caching_elements_with_non_local_placements(self, tmp_path, monkeypatch):
+        element = self.file.createIfcWall(ifcopenshell.guid.new())
+        element.ObjectPlacement = self.file.createIfcGridPlacement()
+        monkeypatch.setattr(ifcopenshell.geom, "iterator", lambda s, f, n, include: [Shape(e) for e in include])
+        cache = subject.open(str(tmp_path))
+        assert len(list(cache.iterate(Settings(), self.file, [element]))) == 1
+        assert cache.get_entries() == []
@@ -0,0 +1,56 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+import test.bootstrap
+import ifcopenshell
+import ifcopenshell.settings
+
+
+class TestGetAttributeIFC4(test.bootstrap.IFC4):
+    def test_getting_forward_attributes(self):
+        wall = self.file.createIfcWall(Name="Foo")
+        for i in range(2):
+            assert wall.Name == "Foo"
+            assert wall.Description is None
+
+    def test_getting_derived_attributes(self):
+        assert self.file.createIfcCartesianPoint((0.0, 0.0, 0.0)).Dim == 3
+        assert self.file.createIfcCartesianPoint((0.0, 0.0)).Dim == 2
+        assert self.file.createIfcSIUnit(None, "LENGTHUNIT", None, "METRE").Dimensions.LengthExponent == 1
+
+    def test_getting_invalid_attributes(self):
+        wall = self.file.createIfcWall()
+        for i in range(2):
+            with pytest.raises(AttributeError):
+                wall.Foo
+        assert getattr(wall, "Foo", None) is None
+
+
+class TestGetAttributeIFC2X3(test.bootstrap.IFC2X3):
+    def test_getting_inverse_attributes(self):
+        group = self.file.createIfcGroup()
+        rel = self.file.createIfcRelAssignsToGroup(RelatingGroup=group)
+        assert group.IsGroupedBy == (rel,)
+        ifcopenshell.settings.unpack_non_aggregate_inverses = True
+        try:
+            assert group.IsGroupedBy == rel
+            assert self.file.createIfcGroup().IsGroupedBy is None
+        finally:
+            ifcopenshell.settings.unpack_non_aggregate_inverses = False
+        assert group.IsGroupedBy == (rel,)
@@ -119,6 +119,49 @@ class TestTransaction(test.bootstrap.IFC4):
         self.file.set_history_size(1)
         assert len(self.file.history) == 1
 
+    def test_setting_the_history_memory_budget(self):
+        for i in range(3):
+            self.file.begin_transaction()
+            self.file.createIfcWall(Name="foo")
+            self.file.end_transaction()
+        assert len(self.file.history) == 3
+        self.file.set_history_memory_budget(self.file.history[-1].get_size() * 2)
+        assert len(self.file.history) == 2
+        self.file.set_history_memory_budget(0)
+        assert len(self.file.history) == 0
+
+    def test_that_you_can_undo_and_redo_creation_with_subsequent_edits(self):
+        self.file.begin_transaction()
+        element = self.file.createIfcWall(Name="foo")
+        element.Name = "bar"
+        self.file.end_transaction()
+        self.file.undo()
+        assert len(list(self.file)) == 0
+        self.file.redo()
+        assert self.file.by_id(1).Name == "bar"
+
+    def test_that_you_can_undo_and_redo_editing_typed_values(self):
+        element = self.file.createIfcPropertySingleValue(Name="foo", NominalValue=self.file.createIfcLabel("foo"))
+        self.file.begin_transaction()
+        element.NominalValue = self.file.createIfcReal(42.0)
+        self.file.end_transaction()
+        self.file.undo()
+        assert element.NominalValue.is_a("IfcLabel")
+        assert element.NominalValue.wrappedValue == "foo"
+        self.file.redo()
+        assert element.NominalValue.is_a("IfcReal")
+        assert element.NominalValue.wrappedValue == 42.0
+
+    def test_that_you_can_undo_and_redo_deletion_of_nested_aggregates(self):
+        element = self.file.createIfcCartesianPointList3D(((0.0, 0.0, 0.0), (1.0, 0.0, 0.0)))
+        self.file.begin_transaction()
+        self.file.remove(element)
+        self.file.end_transaction()
+        self.file.undo()
+        assert self.file.by_id(1).CoordList == ((0.0, 0.0, 0.0), (1.0, 0.0, 0.0))
+        self.file.redo()
+        assert len(list(self.file)) == 0
+
     def test_discarding_the_active_transaction(self):
         self.file.begin_transaction()
         self.file.discard_transaction()
@@ -195,6 +238,28 @@ class TestFile(test.bootstrap.IFC4):
         assert self.file.by_type("IfcElement") == [wall]
         assert len(self.file.by_type("IfcElement", include_subtypes=False)) == 0
 
+    def test_iterating_elements_by_type(self):
+        wall = self.file.createIfcWall()
+        slab = self.file.createIfcSlab()
+        wall2 = self.file.createIfcWall()
+        assert list(self.file.iter_type("IfcWall")) == [wall, wall2]
+        assert list(self.file.iter_type("IfcElement", batch_size=1)) == self.file.by_type("IfcElement")
+        assert list(self.file.iter_type("IfcElement", include_subtypes=False)) == []
+
+    def test_iterating_all_elements(self):
+        wall = self.file.createIfcWall()
+        slab = self.file.createIfcSlab()
+        assert list(self.file.iter_all(batch_size=1)) == [wall, slab]
+        assert list(self.file) == [wall, slab]
+
+    def test_counting_elements_by_type(self):
+        self.file.createIfcWall()
+        self.file.createIfcSlab()
+        assert self.file.count_type("IfcWall") == 1
+        assert self.file.count_type("IfcElement") == 2
+        assert self.file.count_type("IfcElement", include_subtypes=False) == 0
+        assert self.file.count_type("IfcRoof") == 0
+
     def test_traversing_direct_attributes_of_an_element(self):
         owner = self.file.createIfcOwnerHistory()
         element = self.file.createIfcWall(OwnerHistory=owner)
@@ -16,6 +16,9 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
+import io
+import os
+import zipfile
 from pathlib import Path
 import pytest
 import ifcopenshell
@@ -70,3 +73,53 @@ class TestOpen:
     def test_invalid_ifcxml(self):
         with pytest.raises(IOError):
             assert ifcopenshell.open(TEST_FILE_DIR / "invalid.ifcxml")
+
+
+class TestOpenStreaming:
+    def setup_method(self):
+        self.model = ifcopenshell.file(schema="IFC4")
+        self.model.createIfcWall(ifcopenshell.guid.new(), Name="Wall é")
+
+    def test_open_ifc_zip_ifcspf_format(self, tmp_path):
+        file_path = tmp_path / "model.ifcZIP"
+        with zipfile.ZipFile(file_path, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr("model.ifc", self.model.to_string())
+        model = ifcopenshell.open(file_path)
+        assert model.by_type("IfcWall")[0].Name == "Wall é"
+        assert os.listdir(tmp_path) == ["model.ifcZIP"]
+
+    def test_round_tripping_ifc_zip(self, tmp_path):
+        self.model.write(tmp_path / "model.ifcZIP")
+        assert ifcopenshell.open(tmp_path / "model.ifcZIP").to_string() == self.model.to_string()
+
+    def test_round_tripping_ifc_zst(self, tmp_path):
+        pytest.importorskip("zstandard")
+        self.model.write(tmp_path / "model.ifc.zst")
+        assert ifcopenshell.open(tmp_path / "model.ifc.zst").to_string() == self.model.to_string()
+
+    def test_open_ifc_zst_without_zstandard(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ifcopenshell, "zstandard", None)
+        with pytest.raises(ImportError):
+            ifcopenshell.open(tmp_path / "model.ifc.zst")
+
+    def test_guessing_zst_formats(self):
+        assert ifcopenshell.util.file.guess_format(Path("model.ifc.zst")) == ".ifcZST"
+        assert ifcopenshell.util.file.guess_format(Path("model.IFCZST")) == ".ifcZST"
+        assert ifcopenshell.util.file.guess_format(Path("model.ifcXML.zst")) is None
+
+    def test_open_stream(self):
+        model = ifcopenshell.open_stream(io.BytesIO(self.model.to_string().encode("utf-8")))
+        assert model.by_type("IfcWall")[0].Name == "Wall é"
+
+    @pytest.mark.parametrize("encoding", ["latin-1", "utf-8"])
+    def test_open_stream_with_8_bit_characters(self, tmp_path, encoding):
+        data = self.model.to_string().replace("\\X2\\00E9\\X0\\", "\xe9").encode(encoding)
+        (tmp_path / "model.ifc").write_bytes(data)
+        expected = ifcopenshell.open(tmp_path / "model.ifc")
+        model = ifcopenshell.open_stream(io.BytesIO(data))
+        assert str(model.by_type("IfcWall")[0]) == str(expected.by_type("IfcWall")[0])
+        assert model.to_string() == expected.to_string()
+
+    def test_invalid_stream(self):
+        with pytest.raises(ifcopenshell.Error):
+            ifcopenshell.open_stream(io.BytesIO(b"garbage"))
@@ -40,5 +40,30 @@ def test_file(filename):
         assert len(results) == 0
 
 
+def test_caching_compiled_rules(tmp_path):
+    source = "\n".join(
+        [
+            "class IfcLabel_Short:",
+            "    SCOPE = 'type'",
+            "    TYPE_NAME = 'IfcLabel'",
+            "    RULE_NAME = 'Short'",
+            "    def __call__(self, value):",
+            "        assert len(value) < 3",
+        ]
+    )
+    fn = str(tmp_path / "IFC4.py")
+    ifcopenshell.express.rule_executor.load_rules.cache_clear()
+    rules, dispatch = ifcopenshell.express.rule_executor.load_rules("IFC4", fn, source)
+    assert [r.__name__ for r in rules] == ["IfcLabel_Short"]
+    assert dispatch["IfcLabel"] == rules
+    assert dispatch["IfcBoxAlignment"] == rules
+    key = ifcopenshell.express.rule_executor.get_cache_key("IFC4", source)
+    assert ifcopenshell.express.rule_executor.read_cache(fn, key)[1]["IfcLabel"] == ["IfcLabel_Short"]
+    assert ifcopenshell.express.rule_executor.read_cache(fn, key + "0") is None
+    ifcopenshell.express.rule_executor.load_rules.cache_clear()
+    rules, dispatch = ifcopenshell.express.rule_executor.load_rules("IFC4", fn, source)
+    assert dispatch["IfcLabel"] == rules
+
+
 if __name__ == "__main__":
     pytest.main(["-sx", __file__])
@@ -18,6 +18,7 @@
 
 import os
 import glob
+import concurrent.futures
 
 import pytest
 
@@ -41,5 +42,38 @@ def test_file(file):
         assert len(logger.statements) == 0
 
 
+@pytest.mark.parametrize(
+    "file",
+    glob.glob(os.path.join(os.path.dirname(__file__), "fixtures/validate/fail-group-*.ifc")),
+)
+def test_file_using_multiple_processes(file):
+    logger = ifcopenshell.validate.json_logger()
+    ifcopenshell.validate.validate(file, logger, express_rules=True)
+    parallel_logger = ifcopenshell.validate.json_logger()
+    ifcopenshell.validate.validate(file, parallel_logger, express_rules=True, workers=2)
+    assert len(parallel_logger.statements) > 0
+    # Instances come from separately opened files, so compare their string representations
+    assert list(map(str, parallel_logger.statements)) == list(map(str, logger.statements))
+
+
+def test_shutting_down_processes_when_validation_fails(monkeypatch):
+    shutdowns = []
+
+    class ProcessPoolExecutor(concurrent.futures.ProcessPoolExecutor):
+        def shutdown(self, *args, **kwargs):
+            shutdowns.append(self)
+            super().shutdown(*args, **kwargs)
+
+    def replay_shards(*args):
+        raise RuntimeError("Replay failed")
+
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", ProcessPoolExecutor)
+    monkeypatch.setattr(ifcopenshell.validate, "replay_shards", replay_shards)
+    file = glob.glob(os.path.join(os.path.dirname(__file__), "fixtures/validate/fail-group-*.ifc"))[0]
+    with pytest.raises(RuntimeError):
+        ifcopenshell.validate.validate(file, ifcopenshell.validate.json_logger(), workers=2)
+    assert len(shutdowns) == 1
+
+
 if __name__ == "__main__":
     pytest.main(["-sx", __file__])
@@ -16,6 +16,10 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
+import io
+import os
+import sys
+import zipfile
 import tempfile
 from pathlib import Path
 import pytest
@@ -64,3 +68,43 @@ class TestWrite:
 
     def test_write_to_non_existing_dir(self):
         self.assert_model_is_written("tmp/model.ifczip")
+
+
+class TestWriteStreaming:
+    def setup_method(self):
+        self.model = ifcopenshell.file(schema="IFC4")
+        self.model.createIfcWall(ifcopenshell.guid.new(), Name="Wall é")
+        for i in range(25):
+            self.model.createIfcCartesianPoint((float(i), 0.0, 0.0))
+
+    def test_write_spf(self):
+        stream = io.BytesIO()
+        self.model.write_spf(stream, batch_size=10)
+        assert stream.getvalue().decode("utf-8") == self.model.to_string()
+
+    def test_write_ifc_zip_without_an_uncompressed_copy(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = Path(temp_dir) / "model.ifcZIP"
+            self.model.write(file_path)
+            assert os.listdir(temp_dir) == ["model.ifcZIP"]
+            with zipfile.ZipFile(file_path) as zip_file:
+                assert zip_file.namelist() == ["model.ifc"]
+                assert zip_file.getinfo("model.ifc").compress_type == zipfile.ZIP_DEFLATED
+                assert zip_file.read("model.ifc").decode("utf-8") == self.model.to_string()
+
+    def test_write_ifc_zst(self):
+        zstandard = pytest.importorskip("zstandard")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = Path(temp_dir) / "model.ifc.zst"
+            self.model.write(file_path)
+            with open(file_path, "rb") as f:
+                data = zstandard.ZstdDecompressor().stream_reader(f).read()
+            assert data.decode("utf-8") == self.model.to_string()
+
+    def test_write_ifc_zst_without_zstandard_does_not_truncate(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(sys.modules["ifcopenshell.file"], "zstandard", None)
+        file_path = tmp_path / "model.ifc.zst"
+        file_path.write_bytes(b"existing")
+        with pytest.raises(ImportError):
+            self.model.write(file_path)
+        assert file_path.read_bytes() == b"existing"
@@ -85,6 +85,82 @@ class TestGetPsetsIFC4(test.bootstrap.IFC4):
         assert subject.get_psets(element, qtos_only=True) == {"qto": {"x": 42, "id": qto.id()}}
 
 
+class TestGetPsetsWithACacheIFC4(TestGetPsetsIFC4):
+    @pytest.fixture(autouse=True)
+    def setup_cache(self, setup):
+        self.cache = subject.PsetCache(self.file)
+        yield
+        self.cache.unregister()
+
+
+class TestPsetCacheIFC4(test.bootstrap.IFC4):
+    def test_run(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="name")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"a": "b"})
+        cache = subject.PsetCache(self.file)
+        assert subject.get_pset(element, "name") == {"a": "b", "id": pset.id()}
+        assert subject.get_pset(element, "name", "a") == "b"
+        assert cache.occurrence_definitions == {element.id(): [pset]}
+        cache.unregister()
+
+    def test_getting_inherited_psets(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        type_element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType")
+        ifcopenshell.api.run("type.assign_type", self.file, related_object=element, relating_type=type_element)
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=type_element, name="name")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"a": 1})
+        cache = subject.PsetCache(self.file)
+        assert subject.get_pset(element, "name", "a") == 1
+        assert subject.get_pset(element, "name", "a", should_inherit=False) is None
+        cache.unregister()
+
+    def test_results_are_copies(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="name")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"a": "b"})
+        cache = subject.PsetCache(self.file)
+        subject.get_psets(element)["name"]["a"] = "c"
+        assert subject.get_pset(element, "name", "a") == "b"
+        cache.unregister()
+
+    def test_invalidating_when_psets_are_edited_using_the_api(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        cache = subject.PsetCache(self.file)
+        assert subject.get_psets(element) == {}
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="name")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"a": "b"})
+        assert subject.get_psets(element) == {"name": {"a": "b", "id": pset.id()}}
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"a": "c"})
+        assert subject.get_pset(element, "name", "a") == "c"
+        ifcopenshell.api.run("pset.remove_pset", self.file, product=element, pset=pset)
+        assert subject.get_psets(element) == {}
+        cache.unregister()
+
+    def test_invalidating_when_psets_are_copied_by_other_use_cases(self):
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcProject")
+        schedule = ifcopenshell.api.run("sequence.add_work_schedule", self.file)
+        task = ifcopenshell.api.run("sequence.add_task", self.file, work_schedule=schedule)
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=task, name="name")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"a": "b"})
+        cache = subject.PsetCache(self.file)
+        assert subject.get_pset(task, "name", "a") == "b"
+        new_task = ifcopenshell.api.run("sequence.duplicate_task", self.file, task=task)[1][0]
+        assert subject.get_pset(new_task, "name", "a") == "b"
+        cache.unregister()
+
+    def test_invalidating_when_a_transaction_is_undone(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        cache = subject.PsetCache(self.file)
+        self.file.begin_transaction()
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="name")
+        self.file.end_transaction()
+        assert subject.get_psets(element) == {"name": {"id": pset.id()}}
+        self.file.undo()
+        assert subject.get_psets(element) == {}
+        cache.unregister()
+
+
 class TestGetPropertyDefinitionIFC4(test.bootstrap.IFC4):
     def test_getting_the_properties_of_a_pset(self):
         element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
@@ -659,6 +735,46 @@ class TestRemoveDeep2IFC4(test.bootstrap.IFC4):
         assert self.file.by_id(1)
         assert self.file.by_guid("id1")
 
+    def test_removing_an_element_referenced_multiple_times_within_the_subgraph(self):
+        point = self.file.createIfcCartesianPoint((0.0, 0.0, 0.0))
+        point2 = self.file.createIfcCartesianPoint((1.0, 0.0, 0.0))
+        element = self.file.createIfcPolyline((point, point2, point))
+        subject.remove_deep2(self.file, element)
+        assert len(list(self.file)) == 0
+
+    def test_not_removing_an_element_referenced_multiple_times_and_elsewhere(self):
+        point = self.file.createIfcCartesianPoint((0.0, 0.0, 0.0))
+        point2 = self.file.createIfcCartesianPoint((1.0, 0.0, 0.0))
+        element = self.file.createIfcPolyline((point, point2, point))
+        self.file.createIfcAxis2Placement3D(point)
+        point_id, point2_id = point.id(), point2.id()
+        subject.remove_deep2(self.file, element)
+        assert self.file.by_id(point_id)
+        with pytest.raises(RuntimeError):
+            self.file.by_id(point2_id)
+
+    def test_removing_large_lists_of_subelements(self):
+        faces = [self.file.createIfcIndexedPolygonalFace((1, 2, 3)) for i in range(100)]
+        points = self.file.createIfcCartesianPointList3D(((0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (1.0, 1.0, 0.0)))
+        element = self.file.createIfcPolygonalFaceSet(points, None, faces)
+        subject.remove_deep2(self.file, element)
+        assert len(list(self.file)) == 0
+
+    def test_removing_with_also_consider_and_do_not_delete(self):
+        style = self.file.createIfcSurfaceStyle(Side="BOTH", Styles=[])
+        point = self.file.createIfcCartesianPoint((0.0, 0.0, 0.0))
+        point2 = self.file.createIfcCartesianPoint((1.0, 0.0, 0.0))
+        element = self.file.createIfcPolyline((point, point2))
+        styled_item = self.file.createIfcStyledItem(element, [style])
+        element_id, point_id, point2_id = element.id(), point.id(), point2.id()
+        subject.remove_deep2(self.file, element, also_consider=[styled_item], do_not_delete=[point2])
+        with pytest.raises(RuntimeError):
+            self.file.by_id(element_id)
+        with pytest.raises(RuntimeError):
+            self.file.by_id(point_id)
+        assert self.file.by_id(point2_id)
+        assert self.file.by_id(style.id())
+
 
 class TestCopyIFC4(test.bootstrap.IFC4):
     def test_copying_an_element(self):
@@ -723,3 +839,25 @@ class TestCopyDeepIFC4(test.bootstrap.IFC4):
         element2 = subject.copy_deep(self.file, element)
         assert element2.Segments[0][0] == (1, 2)
         assert element2.Segments[1][0] == (3, 4)
+
+    def test_copying_an_element_recursively_with_a_nested_exclude_callback(self):
+        context = self.file.createIfcGeometricRepresentationContext()
+        representation = self.file.createIfcShapeRepresentation(ContextOfItems=context)
+        element = self.file.createIfcProductDefinitionShape(Representations=[representation])
+        element2 = subject.copy_deep(
+            self.file, element, exclude_callback=lambda x: x.is_a("IfcGeometricRepresentationContext")
+        )
+        assert element2.Representations[0] != representation
+        assert element2.Representations[0].ContextOfItems == context
+
+    def test_copying_deeply_nested_elements(self):
+        placement = None
+        for i in range(5000):
+            placement = self.file.createIfcLocalPlacement(PlacementRelTo=placement)
+        placement2 = subject.copy_deep(self.file, placement)
+        depth = 0
+        while placement2:
+            depth += 1
+            assert placement2.id() > 5000
+            placement2 = placement2.PlacementRelTo
+        assert depth == 5000
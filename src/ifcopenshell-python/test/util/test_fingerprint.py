@@ -0,0 +1,67 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+import test.bootstrap
+import ifcopenshell
+import ifcopenshell.guid
+import ifcopenshell.util.fingerprint as subject
+
+
+class TestHasher(test.bootstrap.IFC4):
+    def test_run(self):
+        point = self.file.createIfcCartesianPoint((1.0, 2.0, 3.0))
+        point2 = self.file.createIfcCartesianPoint((1.0, 2.0, 3.0))
+        point3 = self.file.createIfcCartesianPoint((1.0, 2.0, 4.0))
+        hasher = subject.Hasher()
+        assert hasher.get_digest(point) == hasher.get_digest(point2)
+        assert hasher.get_digest(point) != hasher.get_digest(point3)
+
+    def test_ignoring_step_ids_of_referenced_instances(self):
+        self.file.createIfcCartesianPoint((0.0, 0.0, 0.0))
+        placement = self.file.createIfcAxis2Placement3D(self.file.createIfcCartesianPoint((1.0, 0.0, 0.0)))
+        ifc_file = ifcopenshell.file()
+        placement2 = ifc_file.createIfcAxis2Placement3D(ifc_file.createIfcCartesianPoint((1.0, 0.0, 0.0)))
+        assert placement.Location.id() != placement2.Location.id()
+        assert subject.Hasher().get_digest(placement) == subject.Hasher().get_digest(placement2)
+
+    def test_detecting_changes_deep_in_a_subgraph(self):
+        location = self.file.createIfcCartesianPoint((1.0, 0.0, 0.0))
+        placement = self.file.createIfcLocalPlacement(None, self.file.createIfcAxis2Placement3D(location))
+        placement2 = self.file.createIfcLocalPlacement(placement, self.file.createIfcAxis2Placement3D(location))
+        digest = subject.Hasher().get_digest(placement2)
+        location.Coordinates = (2.0, 0.0, 0.0)
+        assert subject.Hasher().get_digest(placement2) != digest
+
+    def test_hashing_select_values_by_their_type(self):
+        value = self.file.createIfcPropertySingleValue("Foo", None, self.file.createIfcLabel("1"))
+        value2 = self.file.createIfcPropertySingleValue("Foo", None, self.file.createIfcText("1"))
+        hasher = subject.Hasher()
+        assert hasher.get_digest(value) != hasher.get_digest(value2)
+
+    def test_ignoring_classes(self):
+        pset = self.file.createIfcPropertySet(ifcopenshell.guid.new(), None, "Foo")
+        pset2 = self.file.createIfcPropertySet(pset.GlobalId, self.file.createIfcOwnerHistory(), "Foo")
+        assert subject.Hasher().get_digest(pset) != subject.Hasher().get_digest(pset2)
+        hasher = subject.Hasher(ignored_classes=["IfcOwnerHistory"])
+        assert hasher.get_digest(pset) == hasher.get_digest(pset2)
+
+    def test_combining_digests(self):
+        hasher = subject.Hasher()
+        assert hasher.combine("a", "b") == hasher.combine("a", "b")
+        assert hasher.combine("a", "b") != hasher.combine("b", "a")
+        assert hasher.get_digest(None) == hasher.combine()
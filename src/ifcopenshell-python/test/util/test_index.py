@@ -0,0 +1,124 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+import test.bootstrap
+import ifcopenshell.api
+import ifcopenshell.util.selector
+import ifcopenshell.util.index as subject
+
+
+class TestColumnIndex(test.bootstrap.IFC4):
+    def test_run(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Foo")
+        wall2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Bar")
+        index = subject.ColumnIndex(self.file, ["IfcWall"], ["Name"])
+        assert list(index.ids) == [wall.id(), wall2.id()]
+        assert index.get_column("Name").kind == "string"
+        assert list(index.ids[index.filter("Name", "equal", "Foo")]) == [wall.id()]
+        assert list(index.ids[index.filter("Name", "notequal", "Foo")]) == [wall2.id()]
+        assert list(index.ids[index.filter("Name", "regex", "^B")]) == [wall2.id()]
+
+    def test_filtering_numeric_properties(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        wall2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        wall3 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        for element, value in ((wall, 4.2), (wall2, 42.0)):
+            pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="Foo_Bar")
+            ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"Foo": value})
+        index = subject.ColumnIndex(self.file, ["IfcWall"], ["Foo_Bar.Foo"])
+        column = index.get_column("Foo_Bar.Foo")
+        assert column.kind == "number"
+        assert list(column.present) == [True, True, False]
+        assert list(index.ids[index.filter("Foo_Bar.Foo", "morethan", 5)]) == [wall2.id()]
+        assert list(index.ids[index.filter("Foo_Bar.Foo", "lessthanequalto", 42)]) == [wall.id(), wall2.id()]
+        assert list(index.ids[index.filter("Foo_Bar.Foo", "equal", None)]) == [wall3.id()]
+
+    def test_inheriting_properties_from_the_type(self):
+        element_type = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType")
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        wall2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        ifcopenshell.api.run("type.assign_type", self.file, related_object=wall, relating_type=element_type)
+        ifcopenshell.api.run("type.assign_type", self.file, related_object=wall2, relating_type=element_type)
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element_type, name="Foo_Bar")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"Foo": "Type"})
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=wall2, name="Foo_Bar")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"Foo": "Occurrence"})
+        index = subject.ColumnIndex(self.file, ["IfcWall"], ["Foo_Bar.Foo"])
+        assert list(index.get_column("Foo_Bar.Foo").values) == ["Type", "Occurrence"]
+        assert list(index.get_column("Foo_Bar.Foo", should_prefer_type=True).values) == ["Type", "Type"]
+
+    def test_evaluating_elements_not_in_the_index(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Foo")
+        slab = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcSlab", name="Foo")
+        index = subject.ColumnIndex(self.file, ["IfcWall"], ["Name"])
+        is_match, is_covered = index.evaluate([slab, wall], "Name", "equal", "Foo")
+        assert list(is_match) == [False, True]
+        assert list(is_covered) == [False, True]
+
+    def test_indexing_aggregates(self):
+        point = self.file.createIfcCartesianPoint((1.0, 2.0))
+        point2 = self.file.createIfcCartesianPoint((1.0, 2.0, 3.0))
+        index = subject.ColumnIndex(self.file, ["IfcCartesianPoint"], ["Coordinates"])
+        column = index.get_column("Coordinates")
+        assert column.kind == "object"
+        assert list(column.objects) == [(1.0, 2.0), (1.0, 2.0, 3.0)]
+
+
+class TestGetIndex(test.bootstrap.IFC4):
+    def test_run(self):
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        assert subject.get_index(self.file, "Name") is None
+        index = subject.ColumnIndex(self.file, ["IfcWall"], ["Name", "Foo_Bar.Foo"])
+        assert subject.get_index(self.file, "Name") is index
+        assert subject.get_index(self.file, ("Foo_Bar", "Foo")) is index
+        assert subject.get_index(self.file, "Description") is None
+        assert subject.get_index(ifcopenshell.file(), "Name") is None
+        index.unregister()
+        assert subject.get_index(self.file, "Name") is None
+
+    def test_using_an_index_in_the_selector(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Foobar")
+        wall2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Foobaz")
+        slab = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcSlab", name="Foobar")
+        subject.ColumnIndex(self.file, ["IfcWall"], ["Name"])
+        # Direct edits aren't tracked, so this change proves that the index is used
+        wall.Name = "Changed"
+        assert ifcopenshell.util.selector.Selector.parse(self.file, '.IfcWall[Name="Foobar"]') == [wall]
+        assert ifcopenshell.util.selector.Selector.parse(self.file, '.IfcWall[Name!="Foobar"]') == [wall2]
+        assert ifcopenshell.util.selector.Selector.parse(self.file, '.IfcSlab[Name="Foobar"]') == [slab]
+
+    def test_rebuilding_an_index_after_an_edit_using_the_api(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Foobar")
+        wall2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Foobaz")
+        subject.ColumnIndex(self.file, ["IfcWall"], ["Name", "Foo_Bar.Foo"])
+        ifcopenshell.api.run("attribute.edit_attributes", self.file, product=wall, attributes={"Name": "Changed"})
+        assert ifcopenshell.util.selector.Selector.parse(self.file, '.IfcWall[Name="Foobar"]') == []
+        assert ifcopenshell.util.selector.Selector.parse(self.file, '.IfcWall[Name="Changed"]') == [wall]
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=wall2, name="Foo_Bar")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"Foo": "Bar"})
+        assert ifcopenshell.util.selector.Selector.parse(self.file, '.IfcWall[Foo_Bar.Foo="Bar"]') == [wall2]
+
+    def test_rebuilding_an_index_after_an_undo(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Foobar")
+        index = subject.ColumnIndex(self.file, ["IfcWall"], ["Name"])
+        self.file.begin_transaction()
+        wall2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Foobar")
+        self.file.end_transaction()
+        assert list(index.ids[index.filter("Name", "equal", "Foobar")]) == [wall.id(), wall2.id()]
+        self.file.undo()
+        assert list(index.ids[index.filter("Name", "equal", "Foobar")]) == [wall.id()]
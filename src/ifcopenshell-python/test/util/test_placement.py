@@ -16,6 +16,7 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
+import numpy as np
 import ifcopenshell
 import test.bootstrap
 import ifcopenshell.util.placement as subject
@@ -41,3 +42,62 @@ class TestGetStoreyElevationIFC4(test.bootstrap.IFC4):
         assert subject.get_storey_elevation(storey) == 0.0
         building = self.file.createIfcBuilding()
         assert subject.get_storey_elevation(building) == 0.0
+
+
+class TestGetLocalPlacementIFC4(test.bootstrap.IFC4):
+    def create_placement(self, coordinates, parent=None):
+        return self.file.createIfcLocalPlacement(
+            parent, self.file.createIfcAxis2Placement3D(self.file.createIfcCartesianPoint(coordinates))
+        )
+
+    def test_run(self):
+        building = self.create_placement((10.0, 0.0, 0.0))
+        storey = self.create_placement((0.0, 0.0, 3.0), building)
+        wall = self.create_placement((1.0, 2.0, 0.0), storey)
+        assert subject.get_local_placement(wall)[:3, 3].tolist() == [11.0, 2.0, 3.0]
+
+    def test_returning_an_identity_matrix_for_no_placement(self):
+        assert subject.get_local_placement(None).tolist() == np.eye(4).tolist()
+
+    def test_caching_parent_placements(self):
+        building = self.create_placement((10.0, 0.0, 0.0))
+        storey = self.create_placement((0.0, 0.0, 3.0), building)
+        wall = self.create_placement((1.0, 2.0, 0.0), storey)
+        cache = {}
+        subject.get_local_placement(wall, cache=cache)
+        assert set(cache) == {building.id(), storey.id(), wall.id()}
+        cache[storey.id()] = np.eye(4)
+        assert subject.get_local_placement(wall, cache=cache)[:3, 3].tolist() == [11.0, 2.0, 3.0]
+        del cache[wall.id()]
+        assert subject.get_local_placement(wall, cache=cache)[:3, 3].tolist() == [1.0, 2.0, 0.0]
+
+
+class TestGetLocalPlacementsIFC4(test.bootstrap.IFC4):
+    def test_run(self):
+        storey = self.file.createIfcLocalPlacement(
+            None, self.file.createIfcAxis2Placement3D(self.file.createIfcCartesianPoint((0.0, 0.0, 3.0)))
+        )
+        walls = []
+        for i in range(3):
+            walls.append(self.file.createIfcWall())
+            walls[-1].ObjectPlacement = self.file.createIfcLocalPlacement(
+                storey, self.file.createIfcAxis2Placement3D(self.file.createIfcCartesianPoint((float(i), 0.0, 0.0)))
+            )
+        walls.append(self.file.createIfcWall())
+        matrices = subject.get_local_placements(walls)
+        assert matrices.shape == (4, 4, 4)
+        assert matrices[:3, :3, 3].tolist() == [[0.0, 0.0, 3.0], [1.0, 0.0, 3.0], [2.0, 0.0, 3.0]]
+        assert matrices[3].tolist() == np.eye(4).tolist()
+        for wall, matrix in zip(walls, matrices):
+            assert matrix.tolist() == subject.get_local_placement(wall.ObjectPlacement).tolist()
+
+    def test_sharing_a_cache(self):
+        wall = self.file.createIfcWall()
+        wall.ObjectPlacement = self.file.createIfcLocalPlacement(
+            None, self.file.createIfcAxis2Placement3D(self.file.createIfcCartesianPoint((1.0, 0.0, 0.0)))
+        )
+        cache = {}
+        subject.get_local_placements([wall], cache=cache)
+        assert wall.ObjectPlacement.id() in cache
+        cache[wall.ObjectPlacement.id()] = np.eye(4)
+        assert subject.get_local_placements([wall], cache=cache)[0].tolist() == np.eye(4).tolist()
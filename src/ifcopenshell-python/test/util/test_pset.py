@@ -17,6 +17,8 @@
 # along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
 
 """Run this test from src/ifcopenshell-python folder: pytest --durations=0 ifcopenshell/util/test_pset.py"""
+import ifcopenshell
+import ifcopenshell.guid
 from ifcopenshell.util import pset
 from ifcopenshell import util
 
@@ -48,3 +50,37 @@ class TestPsetQto:
         names = self.pset_qto.get_applicable_names("IfcWallType")
         assert len(names) == 5
         assert "Pset_WallCommon" in names
+
+    def test_getting_applicable_names_without_loading_templates(self, monkeypatch):
+        opened = []
+        ifc_open = ifcopenshell.open
+        monkeypatch.setattr(ifcopenshell, "open", lambda *args, **kwargs: opened.append(args) or ifc_open(*args))
+        pset_qto = util.pset.PsetQto("IFC4")
+        assert "Pset_WallCommon" in pset_qto.get_applicable_names("IfcWall")
+        assert pset_qto.is_templated("Pset_WallCommon")
+        assert not opened
+        assert pset_qto.get_by_name("Pset_WallCommon").Name == "Pset_WallCommon"
+        assert len(opened) == 1
+
+    def test_not_writing_a_missing_default_index(self, tmp_path, monkeypatch):
+        path = tmp_path / "Pset_IFC4_ADD2.ifc"
+        path.write_bytes(util.pset.PsetQto("IFC4").get_default_path().read_bytes())
+        pset_qto = util.pset.PsetQto("IFC4")
+        monkeypatch.setattr(pset_qto, "get_default_path", lambda: path)
+        assert "Pset_WallCommon" in pset_qto.get_applicable_names("IfcWall")
+        assert [p.name for p in tmp_path.iterdir()] == ["Pset_IFC4_ADD2.ifc"]
+
+    def test_adding_templates(self):
+        template = ifcopenshell.file()
+        template.createIfcPropertySetTemplate(
+            ifcopenshell.guid.new(), Name="Foo_Bar", TemplateType="PSET_OCCURRENCEDRIVEN", ApplicableEntity="IfcWall"
+        )
+        pset_qto = util.pset.PsetQto("IFC4")
+        pset_qto.add_template(template)
+        names = pset_qto.get_applicable_names("IfcWall")
+        assert "Pset_WallCommon" in names
+        assert names[-1] == "Foo_Bar"
+        assert "Foo_Bar" not in pset_qto.get_applicable_names("IfcSlab")
+        assert pset_qto.get_applicable("IfcWall")[-1].Name == "Foo_Bar"
+        pset_qto.reset_templates()
+        assert "Foo_Bar" not in pset_qto.get_applicable_names("IfcWall")
@@ -295,3 +295,25 @@ class TestSelector(test.bootstrap.IFC4):
         assert set(subject.Selector.parse(self.file, '.IfcWall[material.item.Material.Name="CON01"]')) == {element}
         assert set(subject.Selector.parse(self.file, '.IfcWall[material.item.Material.Name="CON02"]')) == {element}
         assert set(subject.Selector.parse(self.file, '.IfcWall[material.item.Material.Name="CON03"]')) == set()
+
+    def test_selecting_using_or_and_and(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        element.Name = "Foobar"
+        element2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcSlab")
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBeam")
+        assert set(subject.Selector.parse(self.file, ".IfcWall | .IfcSlab")) == {element, element2}
+        assert set(subject.Selector.parse(self.file, ".IfcWall | .IfcWall")) == {element}
+        assert set(subject.Selector.parse(self.file, '.IfcElement & .IfcElement[Name="Foobar"]')) == {element}
+        assert set(subject.Selector.parse(self.file, "(.IfcWall | .IfcSlab) & .IfcSlab")) == {element2}
+
+
+class TestCompileQuery(test.bootstrap.IFC4):
+    def test_run(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        query = subject.compile_query(".IfcWall")
+        assert query.execute(self.file) == [element]
+        assert query.execute(ifcopenshell.file()) == []
+
+    def test_reusing_a_cached_query(self):
+        assert subject.compile_query(".IfcWall") is subject.compile_query(".IfcWall")
+        assert subject.compile_query(".IfcWall") is not subject.compile_query(".IfcSlab")
@@ -0,0 +1,104 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2021 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+import datetime
+import test.bootstrap
+import ifcopenshell.api
+import ifcopenshell.util.date
+import ifcopenshell.util.sequence as subject
+
+
+class Bootstrap(test.bootstrap.IFC4):
+    def create_weekday_calendar(self):
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcProject")
+        calendar = ifcopenshell.api.run("sequence.add_work_calendar", self.file)
+        work_time = ifcopenshell.api.run("sequence.add_work_time", self.file, work_calendar=calendar)
+        pattern = ifcopenshell.api.run(
+            "sequence.assign_recurrence_pattern", self.file, parent=work_time, recurrence_type="WEEKLY"
+        )
+        ifcopenshell.api.run(
+            "sequence.edit_recurrence_pattern",
+            self.file,
+            recurrence_pattern=pattern,
+            attributes={"WeekdayComponent": [1, 2, 3, 4, 5]},
+        )
+        return calendar
+
+
+class TestCountWorkingDays(Bootstrap):
+    def test_run(self):
+        calendar = self.create_weekday_calendar()
+        # 2023-01-02 is a Monday
+        assert subject.count_working_days(datetime.date(2023, 1, 2), datetime.date(2023, 1, 15), calendar) == 10
+        assert subject.count_working_days(datetime.date(2023, 1, 7), datetime.date(2023, 1, 8), calendar) == 0
+        assert subject.count_working_days(datetime.date(2020, 1, 1), datetime.date(2029, 12, 31), calendar) == 2609
+
+    def test_counting_all_days_without_a_calendar(self):
+        assert subject.count_working_days(datetime.date(2023, 1, 2), datetime.date(2023, 1, 15), None) == 14
+
+    def test_counting_days_outside_of_work_times(self):
+        calendar = self.create_weekday_calendar()
+        ifcopenshell.api.run(
+            "sequence.edit_work_time",
+            self.file,
+            work_time=calendar.WorkingTimes[0],
+            attributes={"Finish": datetime.date(2023, 1, 9)},
+        )
+        assert subject.count_working_days(datetime.date(2023, 1, 2), datetime.date(2023, 1, 15), calendar) == 12
+
+    def test_recompiling_the_calendar_when_work_times_are_edited(self):
+        calendar = self.create_weekday_calendar()
+        assert subject.count_working_days(datetime.date(2023, 1, 2), datetime.date(2023, 1, 8), calendar) == 5
+        ifcopenshell.api.run(
+            "sequence.edit_recurrence_pattern",
+            self.file,
+            recurrence_pattern=calendar.WorkingTimes[0].RecurrencePattern,
+            attributes={"WeekdayComponent": [1, 2, 3, 4, 5, 6]},
+        )
+        assert subject.count_working_days(datetime.date(2023, 1, 2), datetime.date(2023, 1, 8), calendar) == 6
+
+
+class TestOffsetDate(Bootstrap):
+    def test_run(self):
+        calendar = self.create_weekday_calendar()
+        duration = datetime.timedelta(days=5)
+        # Friday, plus 5 working days, lands on the next Friday
+        assert subject.offset_date(datetime.date(2023, 1, 6), duration, "WORKTIME", calendar) == datetime.date(
+            2023, 1, 13
+        )
+
+    def test_offsetting_backwards(self):
+        calendar = self.create_weekday_calendar()
+        duration = datetime.timedelta(days=-5)
+        assert subject.offset_date(datetime.date(2023, 1, 13), duration, "WORKTIME", calendar) == datetime.date(
+            2023, 1, 6
+        )
+
+    def test_offsetting_by_elapsed_time(self):
+        calendar = self.create_weekday_calendar()
+        duration = datetime.timedelta(days=5)
+        assert subject.offset_date(datetime.date(2023, 1, 6), duration, "ELAPSEDTIME", calendar) == datetime.date(
+            2023, 1, 11
+        )
+
+    def test_offsetting_far_beyond_the_compiled_range(self):
+        calendar = self.create_weekday_calendar()
+        duration = datetime.timedelta(days=2609)
+        assert subject.offset_date(datetime.datetime(2020, 1, 1, 9), duration, "WORKTIME", calendar) == (
+            datetime.datetime(2030, 1, 1, 9)
+        )
@@ -0,0 +1,125 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+import numpy as np
+import ifcopenshell.util.shape as subject
+
+
+class Geometry:
+    def __init__(self, verts, faces):
+        self.verts = tuple(verts)
+        self.faces = tuple(faces)
+        self.edges = ()
+
+
+class Matrix:
+    def __init__(self, data):
+        self.data = tuple(data)
+
+
+class Transformation:
+    def __init__(self, data):
+        self.matrix = Matrix(data)
+
+
+class Shape:
+    def __init__(self, geometry, translation=(0.0, 0.0, 0.0)):
+        self.geometry = geometry
+        self.transformation = Transformation((1.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, *translation))
+
+
+def get_box(x, y, z):
+    verts = (0, 0, 0, x, 0, 0, x, y, 0, 0, y, 0, 0, 0, z, x, 0, z, x, y, z, 0, y, z)
+    faces = (0, 2, 1, 0, 3, 2, 4, 5, 6, 4, 6, 7, 0, 1, 5, 0, 5, 4, 1, 2, 6, 1, 6, 5, 2, 3, 7, 2, 7, 6, 3, 0, 4, 3, 4, 7)
+    return Geometry([float(v) for v in verts], faces)
+
+
+class TestGetVolume:
+    def test_run(self):
+        assert subject.get_volume(get_box(1, 2, 3)) == pytest.approx(6.0)
+
+
+class TestGetDimensions:
+    def test_run(self):
+        box = get_box(1, 2, 3)
+        assert subject.get_x(box) == pytest.approx(1.0)
+        assert subject.get_y(box) == pytest.approx(2.0)
+        assert subject.get_z(box) == pytest.approx(3.0)
+        assert subject.get_bbox_centroid(box) == pytest.approx((0.5, 1.0, 1.5))
+        assert subject.get_bottom_elevation(box) == 0.0
+        assert subject.get_top_elevation(box) == 3.0
+
+
+class TestGetAreas:
+    def test_run(self):
+        box = get_box(1, 2, 3)
+        assert subject.get_area(box) == pytest.approx(22.0)
+        assert subject.get_side_area(box, axis="X") == pytest.approx(6.0)
+        assert subject.get_footprint_area(box) == pytest.approx(2.0)
+        assert subject.get_outer_surface_area(box) == pytest.approx(18.0)
+        assert subject.get_footprint_perimeter(box) == pytest.approx(6.0)
+
+
+class TestGetFaces:
+    def test_run(self):
+        faces = subject.get_faces(get_box(1, 2, 3))
+        assert isinstance(faces, list)
+        assert faces[:2] == [[0, 2, 1], [0, 3, 2]]
+
+    def test_getting_an_array(self):
+        faces = subject.get_faces_array(get_box(1, 2, 3))
+        assert faces.shape == (12, 3)
+        assert faces[1].tolist() == [0, 3, 2]
+
+
+class TestGetEdges:
+    def test_run(self):
+        geometry = get_box(1, 2, 3)
+        geometry.edges = (0, 1, 1, 2)
+        assert subject.get_edges(geometry) == [[0, 1], [1, 2]]
+        assert subject.get_edges_array(geometry).shape == (2, 2)
+
+
+class TestGetShapeVertices:
+    def test_run(self):
+        shape = Shape(get_box(1, 2, 3), translation=(10.0, 0.0, 5.0))
+        vertices = subject.get_shape_vertices(shape, shape.geometry)
+        assert vertices.shape == (8, 3)
+        assert vertices[6].tolist() == [11.0, 2.0, 8.0]
+        assert subject.get_shape_bottom_elevation(shape, shape.geometry) == 5.0
+        assert subject.get_shape_top_elevation(shape, shape.geometry) == 8.0
+
+
+class TestGetBatchMetrics:
+    def test_run(self):
+        shapes = [Shape(get_box(1, 2, 3), translation=(10.0, 0.0, 5.0)), get_box(2, 2, 2), Geometry((), ())]
+        metrics = subject.get_batch_metrics(shapes)
+        assert metrics["volume"][:2] == pytest.approx([6.0, 8.0])
+        assert metrics["area"][:2] == pytest.approx([22.0, 24.0])
+        assert metrics["bbox_min"][:2].tolist() == [[10.0, 0.0, 5.0], [0.0, 0.0, 0.0]]
+        assert metrics["bbox_max"][:2].tolist() == [[11.0, 2.0, 8.0], [2.0, 2.0, 2.0]]
+        assert metrics["bottom_elevation"][:2].tolist() == [5.0, 0.0]
+        assert metrics["top_elevation"][:2].tolist() == [8.0, 2.0]
+        assert np.isnan(metrics["volume"][2])
+        assert np.isnan(metrics["bbox_min"][2]).all()
+
+    def test_no_shapes(self):
+        metrics = subject.get_batch_metrics([])
+        assert metrics["volume"].shape == (0,)
+        assert metrics["bbox_min"].shape == (0, 3)
@@ -0,0 +1,149 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2021 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import pytest
+import ifcopenshell
+import test.bootstrap
+import ifcopenshell.util.tabular as subject
+
+
+class TestGetColumnTypesIFC4(test.bootstrap.IFC4):
+    def test_run(self):
+        columns = subject.get_column_types("IFC4", "IfcCartesianPoint")
+        assert columns == {"id": "entity", "Coordinates": ("list", "real")}
+
+    def test_typing_references_and_enumerations(self):
+        assert subject.get_column_types("IFC4", "IfcSIUnit") == {
+            "id": "entity",
+            "UnitType": "enumeration",
+            "Prefix": "enumeration",
+            "Name": "enumeration",
+        }
+        columns = subject.get_column_types("IFC4", "IfcRelAssociatesMaterial")
+        assert columns["OwnerHistory"] == "entity"
+        assert columns["RelatedObjects"] == ("list", "entity")
+        assert columns["RelatingMaterial"] == "entity"
+
+    def test_typing_nested_aggregates(self):
+        assert subject.get_column_types("IFC4", "IfcCartesianPointList3D")["CoordList"] == ("list", ("list", "real"))
+
+    def test_typing_selects_of_values_as_selects(self):
+        assert subject.get_column_types("IFC4", "IfcPropertySingleValue")["NominalValue"] == "select"
+
+    def test_skipping_derived_attributes(self):
+        assert "Dim" not in subject.get_column_types("IFC4", "IfcDirection")
+        assert "Dimensions" not in subject.get_column_types("IFC4", "IfcSIUnit")
+
+
+class TestGetClassesIFC4(test.bootstrap.IFC4):
+    def test_run(self):
+        self.file.createIfcWall()
+        self.file.createIfcCartesianPoint((0.0, 0.0, 0.0))
+        self.file.createIfcCartesianPoint((1.0, 0.0, 0.0))
+        assert subject.get_classes(self.file) == {"IfcCartesianPoint": 2, "IfcWall": 1}
+
+
+class TestIterColumnsIFC4(test.bootstrap.IFC4):
+    def test_run(self):
+        point = self.file.createIfcCartesianPoint((1.0, 2.0, 3.0))
+        (columns, edges), *rest = subject.iter_columns(self.file, "IfcCartesianPoint")
+        assert not rest
+        assert columns == {"id": [point.id()], "Coordinates": [[1.0, 2.0, 3.0]]}
+        assert edges == {"src": [], "attribute": [], "dst": []}
+
+    def test_streaming_in_batches(self):
+        points = [self.file.createIfcCartesianPoint((float(i), 0.0, 0.0)) for i in range(5)]
+        batches = list(subject.iter_columns(self.file, "IfcCartesianPoint", batch_size=2))
+        assert [len(columns["id"]) for columns, _ in batches] == [2, 2, 1]
+        assert [i for columns, _ in batches for i in columns["id"]] == [p.id() for p in points]
+
+    def test_excluding_subtypes(self):
+        self.file.createIfcWall()
+        self.file.createIfcWallStandardCase()
+        (columns, _), *rest = subject.iter_columns(self.file, "IfcWall")
+        assert len(columns["id"]) == 1
+        assert "PredefinedType" in columns
+
+    def test_converting_references_to_ids_and_recording_edges(self):
+        wall = self.file.createIfcWall()
+        slab = self.file.createIfcSlab()
+        material = self.file.createIfcMaterial("Concrete")
+        rel = self.file.createIfcRelAssociatesMaterial(
+            ifcopenshell.guid.new(), RelatedObjects=[wall, slab], RelatingMaterial=material
+        )
+        (columns, edges), *rest = subject.iter_columns(self.file, "IfcRelAssociatesMaterial")
+        assert columns["OwnerHistory"] == [None]
+        assert columns["RelatedObjects"] == [[wall.id(), slab.id()]]
+        assert columns["RelatingMaterial"] == [material.id()]
+        assert edges == {
+            "src": [rel.id()] * 3,
+            "attribute": ["RelatedObjects", "RelatedObjects", "RelatingMaterial"],
+            "dst": [wall.id(), slab.id(), material.id()],
+        }
+
+    def test_converting_selects(self):
+        unit = self.file.createIfcSIUnit(None, "LENGTHUNIT", None, "METRE")
+        self.file.createIfcPropertySingleValue("A", None, self.file.createIfcLabel("Foo"))
+        self.file.createIfcPropertySingleValue("B", None, self.file.createIfcReal(1.5), unit)
+        self.file.createIfcPropertySingleValue("C", None, self.file.createIfcBoolean(True))
+        self.file.createIfcPropertySingleValue("D", None, None)
+        (columns, edges), *rest = subject.iter_columns(self.file, "IfcPropertySingleValue")
+        assert columns["NominalValue"] == [
+            {"type": "IfcLabel", "id": None, "number": None, "text": "Foo"},
+            {"type": "IfcReal", "id": None, "number": 1.5, "text": None},
+            {"type": "IfcBoolean", "id": None, "number": 1.0, "text": None},
+            None,
+        ]
+        assert columns["Unit"] == [None, unit.id(), None, None]
+        assert edges["dst"] == [unit.id()]
+
+    def test_converting_selected_entities(self):
+        pset = self.file.createIfcPropertySet(ifcopenshell.guid.new(), Name="Foo")
+        rel = self.file.createIfcRelDefinesByProperties(ifcopenshell.guid.new(), RelatingPropertyDefinition=pset)
+        (columns, edges), *rest = subject.iter_columns(self.file, "IfcRelDefinesByProperties")
+        assert columns["RelatingPropertyDefinition"] == [
+            {"type": "IfcPropertySet", "id": pset.id(), "number": None, "text": None}
+        ]
+        assert edges == {"src": [rel.id()], "attribute": ["RelatingPropertyDefinition"], "dst": [pset.id()]}
+
+    def test_converting_unknown_logicals_to_null(self):
+        self.file.createIfcBSplineCurveWithKnots(ClosedCurve="UNKNOWN", SelfIntersect=False)
+        self.file.createIfcBSplineCurveWithKnots(ClosedCurve=True, SelfIntersect=False)
+        (columns, _), *rest = subject.iter_columns(self.file, "IfcBSplineCurveWithKnots")
+        assert columns["ClosedCurve"] == [None, True]
+        assert columns["SelfIntersect"] == [False, False]
+
+
+class TestWriteParquetIFC4(test.bootstrap.IFC4):
+    def test_run(self, tmp_path):
+        pq = pytest.importorskip("pyarrow.parquet")
+        wall = self.file.createIfcWall(ifcopenshell.guid.new(), Name="Foo")
+        material = self.file.createIfcMaterial("Concrete")
+        self.file.createIfcRelAssociatesMaterial(
+            ifcopenshell.guid.new(), RelatedObjects=[wall], RelatingMaterial=material
+        )
+        assert subject.write_parquet(self.file, str(tmp_path)) == {
+            "IfcMaterial": 1,
+            "IfcRelAssociatesMaterial": 1,
+            "IfcWall": 1,
+        }
+        walls = pq.read_table(os.path.join(tmp_path, "IfcWall.parquet")).to_pylist()
+        assert walls[0]["id"] == wall.id()
+        assert walls[0]["Name"] == "Foo"
+        edges = pq.read_table(os.path.join(tmp_path, "edges", "IfcRelAssociatesMaterial.parquet")).to_pylist()
+        assert [e["dst"] for e in edges] == [wall.id(), material.id()]
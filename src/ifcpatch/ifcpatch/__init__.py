@@ -19,12 +19,17 @@
 # along with IfcPatch.  If not, see <http://www.gnu.org/licenses/>.
 
 import ifcopenshell
+import ifcopenshell.util.file
 import logging
 import os
+import sys
+import time
 import typing
 import inspect
+import zipfile
 import collections
 import importlib
+from pathlib import Path
 
 
 def execute(args):
@@ -81,13 +86,112 @@ def execute(args):
     return output
 
 
+def pipeline(recipes, file, input=None, log=None):
+    """Execute several patch recipes in sequence on the same model
+
+    The output of each recipe is given directly to the next recipe without
+    writing and reopening the model in between. If a recipe outputs a string
+    and is not the last recipe, the string is parsed as an IFC model for the
+    next recipe.
+
+    Along with the output, a report is returned. For each recipe, the report
+    records how long the recipe took in seconds, the resident memory of the
+    process in bytes before and after the recipe, the peak resident memory of
+    the process so far in bytes, and the number of entities in the model before
+    and after the recipe. Memory is None if this is unknown on your platform.
+
+    Note that the peak is cumulative over the lifetime of the process, not
+    just the recipe. A recipe which raises the peak is therefore one which
+    used more memory than anything before it.
+
+    :param recipes: A list of dictionaries, each with a "recipe" name and
+        optionally a list of "arguments", as you would pass to execute().
+    :type recipes: list[dict]
+    :param file: An IFC model to apply the patch recipes to.
+    :type file: ifcopenshell.file.file
+    :param input: A filepath to the incoming IFC file, for recipes which need
+        to know it.
+    :type input: str,optional
+    :param log: A filepath to a logfile.
+    :type log: str,optional
+    :return: A tuple of the result of the last patch, and the report.
+    :rtype: tuple[ifcopenshell.file.file|str, list[dict]]
+
+    Example:
+
+    .. code:: python
+
+        output, report = ifcpatch.pipeline(
+            [
+                {"recipe": "ResetAbsoluteCoordinates", "arguments": []},
+                {"recipe": "ExtractElements", "arguments": [".IfcWall"]},
+                {"recipe": "Optimise"},
+            ],
+            ifcopenshell.open("input.ifc"),
+            input="input.ifc",
+        )
+        ifcpatch.write(output, "output.ifc")
+        print(report[0]["time"])
+    """
+    output = file
+    report = []
+    for step in recipes:
+        if isinstance(output, str):
+            output = ifcopenshell.file.from_string(output)
+        total_entities = get_total_entities(output)
+        rss = get_current_rss()
+        start = time.perf_counter()
+        args = {"input": input, "file": output, "recipe": step["recipe"], "arguments": step.get("arguments", [])}
+        if log:
+            args["log"] = log
+        output = execute(args)
+        report.append(
+            {
+                "recipe": step["recipe"],
+                "arguments": args["arguments"],
+                "time": time.perf_counter() - start,
+                "rss_before": rss,
+                "rss_after": get_current_rss(),
+                "cumulative_peak_rss": get_peak_rss(),
+                "entities_before": total_entities,
+                "entities_after": None if isinstance(output, str) else get_total_entities(output),
+            }
+        )
+    return output, report
+
+
+def get_total_entities(ifc_file):
+    return len(ifc_file.wrapped_data.entity_names())
+
+
+def get_current_rss():
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None  # Only Linux is supported
+
+
+def get_peak_rss():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
 def write(output, filepath):
     """Write the output of an IFC patch to a file
 
     Typically a patch output would be a patched IFC model file object, or as a
     string. This function lets you agnostically write that output to a filepath.
 
-    :param output: The results from ifcpatch.execute()
+    If the filepath ends with .ifcZIP, the output is compressed as it is
+    written.
+
+    :param output: The results from ifcpatch.execute() or ifcpatch.pipeline()
     :type output: ifcopenshell.file.file,str
     :param filepath: A filepath to where the results of the patched model should
         be written to.
@@ -96,8 +200,14 @@ def write(output, filepath):
     :rtype: None
     """
     if isinstance(output, str):
-        with open(filepath, "w") as text_file:
-            text_file.write(output)
+        if ifcopenshell.util.file.guess_format(Path(filepath)) == ".ifcZIP":
+            with zipfile.ZipFile(filepath, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+                with zip_file.open(Path(filepath).with_suffix(".ifc").name, "w", force_zip64=True) as text_file:
+                    for i in range(0, len(output), 1 << 20):
+                        text_file.write(output[i : i + (1 << 20)].encode("utf-8"))
+        else:
+            with open(filepath, "w") as text_file:
+                text_file.write(output)
     else:
         output.write(filepath)
 
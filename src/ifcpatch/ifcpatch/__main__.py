@@ -18,6 +18,7 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcPatch.  If not, see <http://www.gnu.org/licenses/>.
 
+import json
 import argparse
 import ifcpatch
 import ifcopenshell
@@ -25,16 +26,34 @@ import ifcopenshell
 parser = argparse.ArgumentParser(description="Patches IFC files to fix badly formatted data")
 parser.add_argument("-i", "--input", type=str, required=True, help="The IFC file to patch")
 parser.add_argument("-o", "--output", type=str, help="The output file to save the patched IFC")
-parser.add_argument("-r", "--recipe", type=str, required=True, help="Name of the recipe to use when patching")
+group = parser.add_mutually_exclusive_group(required=True)
+group.add_argument("-r", "--recipe", type=str, help="Name of the recipe to use when patching")
+group.add_argument(
+    "-p",
+    "--pipeline",
+    type=str,
+    help='A JSON file listing recipes to run in sequence, e.g. [{"recipe": "Optimise", "arguments": []}]',
+)
 parser.add_argument("-l", "--log", type=str, help="Specify a log file", default="ifcpatch.log")
 parser.add_argument("-a", "--arguments", nargs="+", help="Specify custom arguments to the patch recipe")
+parser.add_argument("--report", type=str, help="A JSON file to save a timing and memory report of a pipeline")
 args = vars(parser.parse_args())
 
 print("# Loading IFC file ...")
 args["file"] = ifcopenshell.open(args["input"])
 
 print("# Patching ...")
-output = ifcpatch.execute(args)
+if args["pipeline"]:
+    with open(args["pipeline"], "r") as pipeline_file:
+        recipes = json.load(pipeline_file)
+    output, report = ifcpatch.pipeline(recipes, args["file"], input=args["input"], log=args["log"])
+    for step in report:
+        print("{} finished in {:.2f} seconds".format(step["recipe"], step["time"]))
+    if args["report"]:
+        with open(args["report"], "w") as report_file:
+            json.dump(report, report_file, indent=4)
+else:
+    output = ifcpatch.execute(args)
 
 print("# Writing patched file ...")
 if not args["output"]:
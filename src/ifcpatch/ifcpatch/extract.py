@@ -0,0 +1,234 @@
+# IfcPatch - IFC patching utiliy
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcPatch.
+#
+# IfcPatch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcPatch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcPatch.  If not, see <http://www.gnu.org/licenses/>.
+
+import ifcopenshell
+import ifcopenshell.util.element
+import ifcopenshell.ifcopenshell_wrapper as ifcopenshell_wrapper
+
+
+class Extractor:
+    def __init__(self, file):
+        """Extracts a subset of elements, and everything they need, into new models
+
+        The elements are extracted along with their parts, such as the parts
+        of an assembly, stair or curtain wall, and their ports. Their spatial
+        containers, aggregates and nests are extracted all the way up to the
+        project, but other objects within those are not. Openings and types of
+        elements are also extracted. Everything these objects reference is
+        extracted, such as placements, representations, contexts, units and
+        owner histories. So are their properties, materials, classifications
+        and the styles of their representation items.
+
+        Relationships are extracted if they involve an extracted object. Any
+        objects which are not extracted are removed from the relationship, and
+        the relationship is skipped if nothing is left to relate. The result is
+        computed as a single closure and copied in one pass, so shared
+        resources such as contexts, materials and styles are only visited once.
+
+        :param file: The IFC model to extract from.
+        :type file: ifcopenshell.file.file
+
+        Example:
+
+        .. code:: python
+
+            extractor = ifcpatch.extract.Extractor(model)
+            walls = extractor.extract(model.by_type("IfcWall"))
+            walls.write("walls.ifc")
+        """
+        self.file = file
+
+    def extract(self, elements):
+        """Extracts elements into a new model
+
+        :param elements: The elements to extract.
+        :type elements: list[ifcopenshell.entity_instance.entity_instance]
+        :return: A new model containing the extracted elements
+        :rtype: ifcopenshell.file.file
+        """
+        objects = self.get_objects(elements)
+        return self.copy(self.get_closure(objects), objects)
+
+    def get_objects(self, elements):
+        """Gets the ids of all the objects that need extracting with elements
+
+        :param elements: The elements to extract.
+        :type elements: list[ifcopenshell.entity_instance.entity_instance]
+        :return: The ids of the elements, their parts, ports, parents,
+            openings and types
+        :rtype: set[int]
+        """
+        objects = set()
+        queue = list(self.file.by_type("IfcProject")) + self.get_parts(elements)
+        while queue:
+            element = queue.pop()
+            if element.id() in objects:
+                continue
+            objects.add(element.id())
+            for rel in getattr(element, "ContainedInStructure", None) or []:
+                queue.append(rel.RelatingStructure)
+            for rel in getattr(element, "Decomposes", None) or []:
+                queue.append(rel.RelatingObject)
+            for rel in getattr(element, "Nests", None) or []:
+                queue.append(rel.RelatingObject)
+            for rel in getattr(element, "HasOpenings", None) or []:
+                queue.append(rel.RelatedOpeningElement)
+            element_type = ifcopenshell.util.element.get_type(element)
+            if element_type:
+                queue.append(element_type)
+        return objects
+
+    def get_parts(self, elements):
+        """Gets elements along with all their parts and ports
+
+        :param elements: The elements to extract.
+        :type elements: list[ifcopenshell.entity_instance.entity_instance]
+        :return: The elements, and everything which decomposes or is nested by
+            them, recursively
+        :rtype: list[ifcopenshell.entity_instance.entity_instance]
+        """
+        parts = {}
+        queue = list(elements)
+        while queue:
+            element = queue.pop()
+            if element.id() in parts:
+                continue
+            parts[element.id()] = element
+            for rel in getattr(element, "IsDecomposedBy", None) or []:
+                queue.extend(rel.RelatedObjects)
+            for rel in getattr(element, "IsNestedBy", None) or []:
+                queue.extend(rel.RelatedObjects)
+            # Ports are connected rather than nested in IFC2X3
+            for rel in getattr(element, "HasPorts", None) or []:
+                queue.append(rel.RelatingPort)
+        return list(parts.values())
+
+    def get_closure(self, objects):
+        """Gets the ids of all instances that need extracting with objects
+
+        :param objects: The ids of the objects to extract, as returned by
+            get_objects()
+        :type objects: set[int]
+        :return: The ids of all instances to extract
+        :rtype: set[int]
+        """
+        closure = set()
+        queue = [self.file.wrapped_data.by_id(i) for i in objects]
+        while queue:
+            instance = queue.pop()
+            if instance.id() in closure:
+                continue
+            closure.add(instance.id())
+            queue.extend(self.get_references(instance, objects))
+            queue.extend(self.get_dependents(instance, objects))
+        return closure
+
+    def get_references(self, instance, objects):
+        values = [instance.get_argument(i) for i in range(len(instance))]
+        while values:
+            value = values.pop()
+            if isinstance(value, ifcopenshell_wrapper.entity_instance):
+                if not value.id():
+                    continue
+                elif value.id() in objects or not value.is_a("IfcObjectDefinition"):
+                    yield value
+            elif isinstance(value, tuple):
+                values.extend(value)
+
+    def get_dependents(self, instance, objects):
+        # Instances which reference an extracted instance but are still part of what is being extracted
+        if instance.is_a("IfcObjectDefinition"):
+            for inverse in self.file.wrapped_data.get_inverse(instance):
+                if inverse.is_a("IfcRelationship") and self.is_relationship_extracted(inverse, objects):
+                    yield inverse
+        elif instance.is_a("IfcRepresentationItem"):
+            yield from self.get_inverse_attribute(instance, "StyledByItem")
+        elif instance.is_a("IfcMaterialDefinition"):
+            for name in ("HasExternalReferences", "HasProperties", "HasRepresentation"):
+                yield from self.get_inverse_attribute(instance, name)
+
+    def get_inverse_attribute(self, instance, name):
+        value = self.file.by_id(instance.id())
+        return [v.wrapped_data for v in getattr(value, name, None) or []]
+
+    def is_relationship_extracted(self, rel, objects):
+        for i in range(len(rel)):
+            value = rel.get_argument(i)
+            if isinstance(value, ifcopenshell_wrapper.entity_instance):
+                if value.is_a("IfcObjectDefinition") and value.id() not in objects:
+                    return False
+            elif isinstance(value, tuple) and value:
+                if not any(self.is_value_extracted(v, objects) for v in value):
+                    return False
+        return True
+
+    def is_value_extracted(self, value, objects):
+        if isinstance(value, ifcopenshell_wrapper.entity_instance) and value.is_a("IfcObjectDefinition"):
+            return value.id() in objects
+        return True
+
+    def copy(self, closure, objects):
+        """Copies instances into a new model
+
+        :param closure: The ids of all instances to copy, as returned by
+            get_closure()
+        :type closure: set[int]
+        :param objects: The ids of the objects to extract, as returned by
+            get_objects()
+        :type objects: set[int]
+        :return: A new model
+        :rtype: ifcopenshell.file.file
+        """
+        new = ifcopenshell.file(schema=self.file.schema)
+        mapping = {}
+        for instance in self.get_topological_order(closure, objects):
+            new_instance = mapping[instance.id()] = new.create_entity(instance.is_a())
+            for i in range(len(instance)):
+                value = self.map_value(new, mapping, instance.get_argument(i))
+                # Derived attributes cannot be set, not even to null
+                if value is not None:
+                    new_instance[i] = value
+        return new
+
+    def get_topological_order(self, closure, objects):
+        # Iterative post-order traversal, so that references are always copied first
+        visited = set()
+        for i in sorted(closure):
+            if i in visited:
+                continue
+            stack = [(self.file.wrapped_data.by_id(i), False)]
+            while stack:
+                instance, is_expanded = stack.pop()
+                if is_expanded:
+                    yield instance
+                elif instance.id() not in visited:
+                    visited.add(instance.id())
+                    stack.append((instance, True))
+                    for reference in self.get_references(instance, objects):
+                        if reference.id() not in visited:
+                            stack.append((reference, False))
+
+    def map_value(self, new, mapping, value):
+        if isinstance(value, ifcopenshell_wrapper.entity_instance):
+            if not value.id():
+                return new.create_entity(value.is_a(), value.get_argument(0))
+            return mapping.get(value.id())
+        elif isinstance(value, tuple):
+            # Objects which are not extracted are removed from relationships
+            return [v for v in (self.map_value(new, mapping, v) for v in value) if v is not None]
+        return value
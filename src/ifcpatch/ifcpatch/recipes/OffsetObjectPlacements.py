@@ -89,15 +89,15 @@ class Patcher:
             self.angle_type = None
 
     def patch(self):
-        absolute_placements = []
+        absolute_placements = {}
 
         for product in self.file.by_type("IfcProduct"):
             if not product.ObjectPlacement:
                 continue
             absolute_placement = self.get_absolute_placement(product.ObjectPlacement)
             if absolute_placement.is_a("IfcLocalPlacement"):
-                absolute_placements.append(absolute_placement)
-        absolute_placements = set(absolute_placements)
+                absolute_placements[absolute_placement.id()] = absolute_placement
+        absolute_placements = list(absolute_placements.values())
 
         transformation = self.identity_matrix()
         if self.angle_type == "2D":
@@ -112,14 +112,15 @@ class Patcher:
         transformation[1][3] += float(self.y)
         transformation[2][3] += float(self.z)
 
-        for placement in absolute_placements:
-            placement.RelativePlacement = self.get_relative_placement(
-                transformation @ ifcopenshell.util.placement.get_local_placement(placement)
-            )
+        # Resolve all matrices before any placement is edited, as edits invalidate the cache
+        cache = {}
+        matrices = [ifcopenshell.util.placement.get_local_placement(p, cache=cache) for p in absolute_placements]
+        for placement, matrix in zip(absolute_placements, matrices):
+            placement.RelativePlacement = self.get_relative_placement(transformation @ matrix)
 
     def get_absolute_placement(self, object_placement):
-        if object_placement.PlacementRelTo:
-            return self.get_absolute_placement(object_placement.PlacementRelTo)
+        while object_placement.PlacementRelTo:
+            object_placement = object_placement.PlacementRelTo
         return object_placement
 
     def identity_matrix(self):
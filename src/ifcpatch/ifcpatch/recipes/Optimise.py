@@ -16,13 +16,18 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcPatch.  If not, see <http://www.gnu.org/licenses/>.
 
+import hashlib
 import ifcopenshell
-import ifcopenshell.util.element
-from toposort import toposort_flatten as toposort
+import ifcopenshell.ifcopenshell_wrapper as ifcopenshell_wrapper
+from collections import namedtuple
+
+# Attribute values of instances being merged, where references are replaced by ids in the optimised file
+reference = namedtuple("reference", ("id",))
+typed_value = namedtuple("typed_value", ("type", "value"))
 
 
 class Patcher:
-    def __init__(self, src, file, logger):
+    def __init__(self, src, file, logger, use_digests: bool = False):
         """Optimise the filesize of an IFC model
 
         It is possible to non-losslessly optimise the filesize of an IFC model.
@@ -37,63 +42,105 @@ class Patcher:
         affects filesize and has minimal impact on load times. Large filesizes
         can usually be solved through other means. Consult the BlenderBIM Add-on
         documentation on dealing with large models for more details.
-        
-        Warning: this optimise recipe is very, very slow. Please consider using
-        RecycleNonRootedElements instead.
+
+        Instances are visited once, children before parents. Two instances are
+        merged if they have the same class and the same attribute values after
+        their own references have been merged. Identical points, directions,
+        geometry, styles and so on are therefore collapsed in a single pass.
+        Rooted elements are never merged as their GlobalIds differ.
+
+        :param use_digests: If set to True, instances are remembered by a fixed
+            size digest of their attributes rather than by the attributes
+            themselves. This bounds the memory used for deduplication, which is
+            useful for very large models, at the cost of slightly slower
+            processing.
+        :type use_digests: bool
 
         Example:
 
         .. code:: python
 
             ifcpatch.execute({"input": model, "recipe": "Optimise", "arguments": []})
+
+            # Use less memory for very large models
+            ifcpatch.execute({"input": model, "recipe": "Optimise", "arguments": [True]})
         """
         self.src = src
         self.file = file
         self.logger = logger
+        self.use_digests = use_digests
         self.optimized_file = ifcopenshell.file(schema=self.file.schema)
 
     def patch(self):
-        def generate_instances_and_references():
-            """
-            Generator which yields an entity id and
-            the set of all of its references contained in its attributes.
-            """
-            for inst in self.file:
-                yield inst.id(), set(i.id() for i in self.file.traverse(inst)[1:] if i.id())
-
-        instance_mapping = {}
-
-        def map_value(v):
-            """
-            Recursive function which replicates an entity instance, with
-            its attributes, mapping references to already registered
-            instances. Indeed, because of the toposort we know that
-            forward attribute value instances are mapped before the instances
-            that reference them.
-            """
-            if isinstance(v, (list, tuple)):
-                # lists are recursively traversed
-                return type(v)(map(map_value, v))
-            elif isinstance(v, ifcopenshell.entity_instance):
-                if v.id() == 0:
-                    # express simple types are not part of the toposort and just copied
-                    return self.optimized_file.create_entity(v.is_a(), v[0])
-
-                return instance_mapping[v]
-            else:
-                # a plain python value can just be returned
-                return v
-
-        info_to_id = {}
-
-        for id in toposort(dict(generate_instances_and_references())):
-            inst = self.file[id]
-            info = inst.get_info(include_identifier=False, recursive=True, return_type=frozenset)
-            if info in info_to_id:
-                mapped = instance_mapping[inst] = instance_mapping[self.file[info_to_id[info]]]
-
-            else:
-                info_to_id[info] = id
-                instance_mapping[inst] = self.optimized_file.create_entity(inst.is_a(), *map(map_value, inst))
-
+        # Maps ids in the original file to ids in the optimised file
+        self.mapping = {}
+        # Maps keys of unique instances to their id in the optimised file
+        self.keys = {}
+
+        total = len(self.file.wrapped_data.entity_names())
+        for i, element in enumerate(self.file.iter_all(), 1):
+            if element.id() not in self.mapping:
+                self.optimise(element.wrapped_data)
+            if i % 100000 == 0:
+                self.logger.info(f"Optimised {i}/{total} instances")
+
+        self.logger.info(f"Reduced {total} instances to {len(self.keys)} instances")
         self.file = self.optimized_file
+
+    def optimise(self, instance):
+        # Iterative post-order traversal, so that references are always mapped first
+        stack = [(instance, False)]
+        while stack:
+            instance, is_expanded = stack.pop()
+            if is_expanded:
+                if instance.id() not in self.mapping:
+                    self.mapping[instance.id()] = self.create_instance(instance)
+            elif instance.id() not in self.mapping:
+                stack.append((instance, True))
+                for reference in self.get_references(instance):
+                    if reference.id() not in self.mapping:
+                        stack.append((reference, False))
+
+    def get_references(self, instance):
+        values = [instance.get_argument(i) for i in range(len(instance))]
+        while values:
+            value = values.pop()
+            if isinstance(value, ifcopenshell_wrapper.entity_instance):
+                if value.id():
+                    yield value
+            elif isinstance(value, tuple):
+                values.extend(value)
+
+    def create_instance(self, instance):
+        values = tuple(self.get_key(instance.get_argument(i)) for i in range(len(instance)))
+        key = (instance.is_a(), values)
+        if self.use_digests:
+            key = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).digest()
+        new_id = self.keys.get(key)
+        if new_id is None:
+            new = self.optimized_file.create_entity(instance.is_a())
+            for i, value in enumerate(values):
+                # Null values are skipped as derived attributes cannot be set, even to null
+                if value is not None:
+                    new[i] = self.get_value(value)
+            new_id = self.keys[key] = new.id()
+        return new_id
+
+    def get_key(self, value):
+        if isinstance(value, ifcopenshell_wrapper.entity_instance):
+            if value.id():
+                return reference(self.mapping[value.id()])
+            # Express simple types, such as IfcLabel in a select
+            return typed_value(value.is_a(), value.get_argument(0))
+        elif isinstance(value, tuple):
+            return tuple(self.get_key(v) for v in value)
+        return value
+
+    def get_value(self, key):
+        if isinstance(key, reference):
+            return self.optimized_file.by_id(key.id)
+        elif isinstance(key, typed_value):
+            return self.optimized_file.create_entity(key.type, key.value)
+        elif isinstance(key, tuple):
+            return [self.get_value(k) for k in key]
+        return key
@@ -90,9 +90,7 @@ class Patcher:
         self.args = [x for x in [a, b, c, d] if x is not None]
 
     def patch(self):
-        placement_coord_ids = set()
-        for placement in self.file.by_type("IfcObjectPlacement"):
-            [placement_coord_ids.add(e.id()) for e in self.file.traverse(placement) if e.is_a("IfcCartesianPoint")]
+        placement_coord_ids = self.get_placement_coord_ids()
 
         # Arbitrary threshold based on experience
         self.threshold = 1000000
@@ -139,6 +137,21 @@ class Patcher:
                 point.Coordinates[2] + offset_point[2],
             )
 
+    def get_placement_coord_ids(self):
+        # Parent placements are shared by many placements, so walk each instance only once
+        coord_ids = set()
+        visited = set()
+        queue = list(self.file.by_type("IfcObjectPlacement"))
+        while queue:
+            element = queue.pop()
+            if element.id() in visited:
+                continue
+            visited.add(element.id())
+            if element.is_a("IfcCartesianPoint"):
+                coord_ids.add(element.id())
+            queue.extend(self.file.traverse(element, max_levels=1)[1:])
+        return coord_ids
+
     def is_point_far_away(self, point):
         if hasattr(point, "Coordinates"):
             return (
@@ -16,6 +16,9 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcPatch.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
+import ifcpatch.extract
+
 
 class Patcher:
     def __init__(self, src, file, logger, output_dir=None):
@@ -25,9 +28,15 @@ class Patcher:
         format of {i}-{name}.ifc, where {i} is an ascending number starting from
         0 and {name} is the name of the storey.
 
+        Each new model contains the elements contained in the storey, along
+        with their parts and ports. Elements in other storeys are left out, but
+        all other products, such as storeys, spaces, grids and annotations, are
+        kept in every model. All storeys are extracted from the model in
+        memory, so the source file is only read once.
+
         :param output_dir: Specifies an output directory where the new IFC models will be saved.
         :type output_dir: str
-           
+
         Example:
 
         .. code:: python
@@ -39,43 +48,20 @@ class Patcher:
         self.logger = logger
         self.output_dir = output_dir
 
-
     def patch(self):
-        import ifcopenshell
-        from shutil import copyfile
-
-        storeys = self.file.by_type("IfcBuildingStorey")
-        for i, storey in enumerate(storeys):
-            dest = "{}-{}.ifc".format(i, storey.Name) if self.output_dir == None else "{}/{}-{}.ifc".format(self.output_dir,i, storey.Name)
-            copyfile(self.src, dest)
-            old_ifc = ifcopenshell.open(dest)
-            new_ifc = ifcopenshell.file(schema=self.file.schema)
-            if self.file.schema == "IFC2X3":
-                elements = old_ifc.by_type("IfcProject") + old_ifc.by_type("IfcProduct")
-            else:
-                elements = old_ifc.by_type("IfcContext") + old_ifc.by_type("IfcProduct")
-            inverse_elements = []
-            for element in elements:
-                if element.is_a("IfcElement") and not self.is_in_storey(element, storey):
-                    element.Representation = None
-                    continue
-                if element.is_a("IfcElement"):
-                    styled_rep_items = [
-                        i for i in old_ifc.traverse(element) if i.is_a("IfcRepresentationItem") and i.StyledByItem
-                    ]
-                    [new_ifc.add(i.StyledByItem[0]) for i in styled_rep_items]
-                new_ifc.add(element)
-                inverse_elements.extend(old_ifc.get_inverse(element))
-            for inverse_element in inverse_elements:
-                new_ifc.add(inverse_element)
-            for element in new_ifc.by_type("IfcElement"):
-                if not self.is_in_storey(element, storey):
-                    new_ifc.remove(element)
-            new_ifc.write(dest)
+        extractor = ifcpatch.extract.Extractor(self.file)
+        # Ports are extracted with the elements they belong to
+        products = [
+            p for p in self.file.by_type("IfcProduct") if not p.is_a("IfcElement") and not p.is_a("IfcPort")
+        ]
+        for i, storey in enumerate(self.file.by_type("IfcBuildingStorey")):
+            dest = "{}-{}.ifc".format(i, storey.Name)
+            if self.output_dir is not None:
+                dest = os.path.join(self.output_dir, dest)
+            extractor.extract(products + self.get_storey_elements(storey)).write(dest)
 
-    def is_in_storey(self, element, storey):
-        return (
-            element.ContainedInStructure
-            and element.ContainedInStructure[0].RelatingStructure.is_a("IfcBuildingStorey")
-            and element.ContainedInStructure[0].RelatingStructure.GlobalId == storey.GlobalId
-        )
+    def get_storey_elements(self, storey):
+        elements = []
+        for rel in storey.ContainsElements or []:
+            elements.extend(rel.RelatedElements)
+        return elements
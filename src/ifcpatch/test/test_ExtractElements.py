@@ -25,6 +25,6 @@ import ifcopenshell
 class TestExtractElements:
     def test_getting_the_psets_of_a_product_as_a_dictionary(self):
         ifc = ifcopenshell.open(os.path.join(os.getcwd(), "test", "files", "basic.ifc"))
-        output = ifcpatch.execute({"input": ifc, "recipe": "ExtractElements", "arguments": [".IfcWall"]})
+        output = ifcpatch.execute({"input": ifc, "file": ifc, "recipe": "ExtractElements", "arguments": [".IfcWall"]})
         assert output.by_type("IfcWall")
         assert not output.by_type("IfcSlab")
@@ -0,0 +1,70 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pytest
+import ifcpatch
+import ifcopenshell
+import ifcopenshell.guid
+
+
+class TestOptimise:
+    def create_placement(self, ifc, coordinates):
+        location = ifc.createIfcCartesianPoint(coordinates)
+        axis = ifc.createIfcDirection((0.0, 0.0, 1.0))
+        ref_direction = ifc.createIfcDirection((1.0, 0.0, 0.0))
+        return ifc.createIfcLocalPlacement(None, ifc.createIfcAxis2Placement3D(location, axis, ref_direction))
+
+    @pytest.mark.parametrize("use_digests", [False, True])
+    def test_collapsing_duplicate_instances(self, use_digests):
+        ifc = ifcopenshell.file(schema="IFC4")
+        walls = []
+        for i in range(3):
+            wall = ifc.createIfcWall(ifcopenshell.guid.new(), Name=f"Wall {i}")
+            wall.ObjectPlacement = self.create_placement(ifc, (0.0, 0.0, 0.0) if i < 2 else (1.0, 0.0, 0.0))
+            walls.append(wall)
+        output = ifcpatch.execute(
+            {"input": "input.ifc", "file": ifc, "recipe": "Optimise", "arguments": [use_digests]}
+        )
+        assert len(output.by_type("IfcCartesianPoint")) == 2
+        assert len(output.by_type("IfcDirection")) == 2
+        assert len(output.by_type("IfcAxis2Placement3D")) == 2
+        assert len(output.by_type("IfcLocalPlacement")) == 2
+        new_walls = output.by_type("IfcWall")
+        assert [(w.GlobalId, w.Name) for w in new_walls] == [(w.GlobalId, w.Name) for w in walls]
+        assert new_walls[0].ObjectPlacement == new_walls[1].ObjectPlacement
+        assert new_walls[0].ObjectPlacement != new_walls[2].ObjectPlacement
+        assert new_walls[2].ObjectPlacement.RelativePlacement.Location.Coordinates == (1.0, 0.0, 0.0)
+
+    @pytest.mark.parametrize("use_digests", [False, True])
+    def test_keeping_rooted_elements_unchanged(self, use_digests):
+        ifc = ifcopenshell.open(os.path.join(os.getcwd(), "test", "files", "basic.ifc"))
+        output = ifcpatch.execute(
+            {"input": "basic.ifc", "file": ifc, "recipe": "Optimise", "arguments": [use_digests]}
+        )
+        assert len(output.wrapped_data.entity_names()) < len(ifc.wrapped_data.entity_names())
+        assert len(output.by_type("IfcDirection")) < len(ifc.by_type("IfcDirection"))
+        old_roots = {e.GlobalId: e for e in ifc.by_type("IfcRoot")}
+        new_roots = {e.GlobalId: e for e in output.by_type("IfcRoot")}
+        assert new_roots.keys() == old_roots.keys()
+        for global_id, element in new_roots.items():
+            old_element = old_roots[global_id]
+            assert element.is_a() == old_element.is_a()
+            assert element.get_info(recursive=True, include_identifier=False) == old_element.get_info(
+                recursive=True, include_identifier=False
+            )
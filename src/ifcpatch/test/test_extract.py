@@ -0,0 +1,229 @@
+# IfcPatch - IFC patching utiliy
+# Copyright (C) 2023 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcPatch.
+#
+# IfcPatch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcPatch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcPatch.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import pytest
+import ifcpatch
+import ifcpatch.extract
+import ifcopenshell
+import ifcopenshell.api
+import ifcopenshell.util.element
+
+
+class Model:
+    def __init__(self):
+        self.ifc = ifc = ifcopenshell.file(schema="IFC4")
+        self.project = self.create("IfcProject", "Project")
+        ifcopenshell.api.run("unit.assign_unit", ifc)
+        model = ifcopenshell.api.run("context.add_context", ifc, context_type="Model")
+        self.body = ifcopenshell.api.run(
+            "context.add_context",
+            ifc,
+            context_type="Model",
+            context_identifier="Body",
+            target_view="MODEL_VIEW",
+            parent=model,
+        )
+        site = self.create("IfcSite", "Site")
+        building = self.create("IfcBuilding", "Building")
+        self.ground = self.create("IfcBuildingStorey", "Ground")
+        self.level = self.create("IfcBuildingStorey", "Level 1")
+        ifcopenshell.api.run("aggregate.assign_object", ifc, product=site, relating_object=self.project)
+        ifcopenshell.api.run("aggregate.assign_object", ifc, product=building, relating_object=site)
+        ifcopenshell.api.run("aggregate.assign_object", ifc, product=self.ground, relating_object=building)
+        ifcopenshell.api.run("aggregate.assign_object", ifc, product=self.level, relating_object=building)
+
+        self.space = self.create("IfcSpace", "Room")
+        ifcopenshell.api.run("aggregate.assign_object", ifc, product=self.space, relating_object=self.ground)
+
+        self.wall_type = self.create("IfcWallType", "Wall Type")
+        self.wall = self.create("IfcWall", "Wall")
+        self.other_wall = self.create("IfcWall", "Other Wall")
+        self.slab = self.create("IfcSlab", "Slab")
+        ifcopenshell.api.run("type.assign_type", ifc, related_object=self.wall, relating_type=self.wall_type)
+        for element in (self.wall, self.other_wall):
+            ifcopenshell.api.run("spatial.assign_container", ifc, product=element, relating_structure=self.ground)
+        ifcopenshell.api.run("spatial.assign_container", ifc, product=self.slab, relating_structure=self.level)
+
+        pset = ifcopenshell.api.run("pset.add_pset", ifc, product=self.wall_type, name="Pset_WallCommon")
+        ifcopenshell.api.run("pset.edit_pset", ifc, pset=pset, properties={"IsExternal": True})
+        pset = ifcopenshell.api.run("pset.add_pset", ifc, product=self.wall, name="Pset_WallCommon")
+        ifcopenshell.api.run("pset.edit_pset", ifc, pset=pset, properties={"Reference": "W01"})
+
+        self.concrete = ifcopenshell.api.run("material.add_material", ifc, name="Concrete")
+        ifcopenshell.api.run("material.assign_material", ifc, product=self.wall_type, material=self.concrete)
+        ifcopenshell.api.run("material.assign_material", ifc, product=self.slab, material=self.concrete)
+
+        self.style = ifcopenshell.api.run("style.add_style", ifc, name="Grey")
+        self.add_representation(self.wall)
+
+        self.group = ifcopenshell.api.run("group.add_group", ifc, Name="Group")
+        ifcopenshell.api.run("group.assign_group", ifc, products=[self.wall, self.slab], group=self.group)
+
+    def add_assembly(self):
+        self.assembly = self.create("IfcElementAssembly", "Assembly")
+        ifcopenshell.api.run(
+            "spatial.assign_container", self.ifc, product=self.assembly, relating_structure=self.ground
+        )
+        for name in ("Beam", "Column"):
+            part = self.create("Ifc" + name, name)
+            ifcopenshell.api.run("aggregate.assign_object", self.ifc, product=part, relating_object=self.assembly)
+            self.add_representation(part)
+
+    def add_duct(self):
+        self.duct = self.create("IfcDuctSegment", "Duct")
+        ifcopenshell.api.run("spatial.assign_container", self.ifc, product=self.duct, relating_structure=self.level)
+        self.port = ifcopenshell.api.run("system.add_port", self.ifc, element=self.duct)
+        self.port.Name = "Port"
+
+    def create(self, ifc_class, name):
+        return ifcopenshell.api.run("root.create_entity", self.ifc, ifc_class=ifc_class, name=name)
+
+    def add_representation(self, element):
+        points = self.ifc.createIfcCartesianPointList3D(((0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0)))
+        item = self.ifc.createIfcTriangulatedFaceSet(points, None, None, ((1, 2, 3),))
+        self.ifc.createIfcStyledItem(item, (self.style,))
+        representation = self.ifc.createIfcShapeRepresentation(self.body, "Body", "Tessellation", (item,))
+        element.Representation = self.ifc.createIfcProductDefinitionShape(None, None, (representation,))
+
+
+def get_element(ifc, element):
+    return ifc.by_guid(element.GlobalId)
+
+
+class TestExtractor:
+    def test_extracting_elements_with_their_spatial_parents_and_types(self):
+        model = Model()
+        output = ifcpatch.extract.Extractor(model.ifc).extract([model.wall])
+        assert {e.Name for e in output.by_type("IfcProduct")} == {"Site", "Building", "Ground", "Wall"}
+        assert [e.Name for e in output.by_type("IfcProject")] == ["Project"]
+        wall = get_element(output, model.wall)
+        assert ifcopenshell.util.element.get_type(wall).Name == "Wall Type"
+        assert ifcopenshell.util.element.get_container(wall).Name == "Ground"
+        storey = wall.ContainedInStructure[0].RelatingStructure
+        assert ifcopenshell.util.element.get_aggregate(storey).Name == "Building"
+
+    def test_extracting_properties_materials_and_styles(self):
+        model = Model()
+        output = ifcpatch.extract.Extractor(model.ifc).extract([model.wall])
+        wall = get_element(output, model.wall)
+        assert ifcopenshell.util.element.get_psets(wall, psets_only=True)["Pset_WallCommon"]["Reference"] == "W01"
+        wall_type = ifcopenshell.util.element.get_type(wall)
+        assert ifcopenshell.util.element.get_psets(wall_type)["Pset_WallCommon"]["IsExternal"] is True
+        assert ifcopenshell.util.element.get_material(wall).Name == "Concrete"
+        assert len(output.by_type("IfcMaterial")) == 1
+        item = wall.Representation.Representations[0].Items[0]
+        assert item.StyledByItem[0].Styles[0].Name == "Grey"
+        assert item.Coordinates.CoordList == model.wall.Representation.Representations[0].Items[0].Coordinates.CoordList
+        assert wall.Representation.Representations[0].ContextOfItems.ContextIdentifier == "Body"
+        assert len(output.by_type("IfcGeometricRepresentationContext")) == 2
+        assert output.by_type("IfcUnitAssignment")
+
+    def test_removing_objects_which_are_not_extracted_from_relationships(self):
+        model = Model()
+        output = ifcpatch.extract.Extractor(model.ifc).extract([model.wall])
+        wall = get_element(output, model.wall)
+        rel = wall.ContainedInStructure[0]
+        assert rel.RelatedElements == (wall,)
+        assert output.by_guid(rel.GlobalId)
+        rel = ifcopenshell.util.element.get_type(wall).HasAssociations[0]
+        assert [e.Name for e in rel.RelatedObjects] == ["Wall Type"]
+        building = output.by_type("IfcBuilding")[0]
+        assert [e.Name for e in building.IsDecomposedBy[0].RelatedObjects] == ["Ground"]
+
+    def test_skipping_relationships_with_objects_which_are_not_extracted(self):
+        model = Model()
+        output = ifcpatch.extract.Extractor(model.ifc).extract([model.wall])
+        assert not get_element(output, model.wall).HasAssignments
+        assert not output.by_type("IfcRelAssignsToGroup")
+        assert not output.by_type("IfcGroup")
+
+    def test_skipping_relationships_with_nothing_left_to_relate(self):
+        model = Model()
+        output = ifcpatch.extract.Extractor(model.ifc).extract([model.other_wall])
+        assert not output.by_type("IfcRelAssignsToGroup")
+        assert not output.by_type("IfcGroup")
+        assert not output.by_type("IfcRelDefinesByType")
+        assert not output.by_type("IfcWallType")
+        assert not output.by_type("IfcRelAssociatesMaterial")
+        assert not output.by_type("IfcMaterial")
+        assert not output.by_type("IfcStyledItem")
+        assert len(output.by_type("IfcRelDefinesByProperties")) == 0
+        assert [e.Name for e in output.by_type("IfcWall")] == ["Other Wall"]
+
+    def test_extracting_the_parts_of_assemblies(self):
+        model = Model()
+        model.add_assembly()
+        output = ifcpatch.extract.Extractor(model.ifc).extract([model.assembly])
+        assert {e.Name for e in output.by_type("IfcElement")} == {"Assembly", "Beam", "Column"}
+        assembly = get_element(output, model.assembly)
+        assert {e.Name for e in assembly.IsDecomposedBy[0].RelatedObjects} == {"Beam", "Column"}
+        assert all(e.Representation for e in output.by_type("IfcBeam") + output.by_type("IfcColumn"))
+
+    def test_extracting_ports(self):
+        model = Model()
+        model.add_duct()
+        output = ifcpatch.extract.Extractor(model.ifc).extract([model.duct])
+        duct = get_element(output, model.duct)
+        assert [e.Name for e in duct.IsNestedBy[0].RelatedObjects] == ["Port"]
+
+    def test_not_extracting_the_children_of_spatial_parents(self):
+        model = Model()
+        model.add_assembly()
+        output = ifcpatch.extract.Extractor(model.ifc).extract([model.wall])
+        assert not output.by_type("IfcElementAssembly")
+        assert not output.by_type("IfcSpace")
+
+    def test_extracting_many_subsets_from_the_same_model(self):
+        model = Model()
+        extractor = ifcpatch.extract.Extractor(model.ifc)
+        first = extractor.extract([model.wall])
+        second = extractor.extract([model.slab])
+        assert [e.Name for e in first.by_type("IfcElement")] == ["Wall"]
+        assert [e.Name for e in second.by_type("IfcElement")] == ["Slab"]
+        assert ifcopenshell.util.element.get_material(get_element(second, model.slab)).Name == "Concrete"
+        assert len(model.ifc.by_type("IfcElement")) == 3
+
+
+class TestSplitByBuildingStorey:
+    def test_splitting_a_model_into_one_file_per_storey(self, tmp_path):
+        model = Model()
+        model.add_assembly()
+        model.add_duct()
+        model.create("IfcAnnotation", "Annotation")
+        ifcpatch.execute(
+            {"input": "input.ifc", "file": model.ifc, "recipe": "SplitByBuildingStorey", "arguments": [str(tmp_path)]}
+        )
+        assert sorted(os.listdir(tmp_path)) == ["0-Ground.ifc", "1-Level 1.ifc"]
+
+        ground = ifcopenshell.open(str(tmp_path / "0-Ground.ifc"))
+        assert {e.Name for e in ground.by_type("IfcElement")} == {"Wall", "Other Wall", "Assembly", "Beam", "Column"}
+        assert not ground.by_type("IfcPort")
+        assert ground.by_type("IfcWallType")
+
+        level = ifcopenshell.open(str(tmp_path / "1-Level 1.ifc"))
+        assert {e.Name for e in level.by_type("IfcElement")} == {"Slab", "Duct"}
+        assert [e.Name for e in level.by_type("IfcPort")] == ["Port"]
+        assert not level.by_type("IfcWallType")
+        assert ifcopenshell.util.element.get_material(level.by_type("IfcSlab")[0]).Name == "Concrete"
+
+        # Products which aren't elements are kept in every storey, as they always have been
+        for output in (ground, level):
+            assert {e.Name for e in output.by_type("IfcBuildingStorey")} == {"Ground", "Level 1"}
+            assert [e.Name for e in output.by_type("IfcSpace")] == ["Room"]
+            assert [e.Name for e in output.by_type("IfcAnnotation")] == ["Annotation"]
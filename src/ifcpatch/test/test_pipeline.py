@@ -0,0 +1,44 @@
+# IfcOpenShell - IFC toolkit and geometry engine
+# Copyright (C) 2022 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcOpenShell.
+#
+# IfcOpenShell is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcOpenShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcOpenShell.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import ifcpatch
+import ifcopenshell
+
+
+class TestPipeline:
+    def test_running_recipes_in_sequence(self):
+        ifc = ifcopenshell.open(os.path.join(os.getcwd(), "test", "files", "basic.ifc"))
+        total_entities = len(ifc.wrapped_data.entity_names())
+        output, report = ifcpatch.pipeline(
+            [{"recipe": "RegenerateGlobalIds", "arguments": [True]}, {"recipe": "Optimise"}], ifc
+        )
+        assert [r["recipe"] for r in report] == ["RegenerateGlobalIds", "Optimise"]
+        assert report[0]["entities_before"] == report[0]["entities_after"] == total_entities
+        assert report[1]["entities_after"] == len(output.wrapped_data.entity_names())
+        assert report[1]["entities_after"] <= total_entities
+        assert all(r["time"] >= 0 for r in report)
+
+    def test_reporting_memory(self):
+        ifc = ifcopenshell.open(os.path.join(os.getcwd(), "test", "files", "basic.ifc"))
+        output, report = ifcpatch.pipeline([{"recipe": "Optimise"}], ifc)
+        if report[0]["cumulative_peak_rss"] is None:
+            return  # Unsupported platform
+        assert report[0]["cumulative_peak_rss"] > 0
+        assert report[0]["rss_before"] > 0
+        assert report[0]["rss_after"] > 0
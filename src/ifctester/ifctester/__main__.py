@@ -36,6 +36,9 @@ parser.add_argument(
 parser.add_argument(
     "-o", "--output", help="Output file supported by Json reporting"
 )
+parser.add_argument(
+    "-j", "--workers", type=int, help="Number of processes to use when checking requirements", default=None
+)
 args = parser.parse_args()
 
 start = time.time()
@@ -43,7 +46,7 @@ specs = ids.open(args.ids)
 ifc = ifcopenshell.open(args.ifc)
 print("Finished loading:", time.time() - start)
 start = time.time()
-specs.validate(ifc)
+specs.validate(ifc, workers=args.workers, filepath=args.ifc)
 print("Finished validating:", time.time() - start)
 start = time.time()
 
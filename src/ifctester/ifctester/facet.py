@@ -19,6 +19,7 @@
 import re
 import builtins
 import ifcopenshell.util.unit
+import ifcopenshell.util.index
 import ifcopenshell.util.element
 import ifcopenshell.util.classification
 from xmlschema.validators import identities
@@ -178,6 +179,20 @@ class Attribute(Facet):
         ]
         super().__init__(name, value, minOccurs, maxOccurs, instructions)
 
+    def filter(self, ifc_file, elements):
+        index = ifcopenshell.util.index.get_index(ifc_file, self.name) if isinstance(self.name, str) else None
+        if not index or self.minOccurs == 0 or self.maxOccurs == 0:
+            return super().filter(ifc_file, elements)
+        # The index can cheaply rule out elements with an empty or different
+        # value. Anything else is checked in full.
+        column = index.get_column(self.name)
+        is_excluded = column.is_empty()
+        if isinstance(self.value, str) and column.kind == "string":
+            is_excluded |= (column.values != self.value).astype(bool)
+        rows, is_in_index = index.get_rows(elements)
+        is_excluded = (is_excluded & column.covered)[rows] & is_in_index
+        return [e for i, e in enumerate(elements) if not is_excluded[i] and self(e)]
+
     def __call__(self, inst, logger=None):
         if self.minOccurs == 0 and self.maxOccurs != 0:
             return AttributeResult(True)
@@ -471,6 +486,23 @@ class Property(Facet):
         ]
         super().__init__(propertySet, name, value, measure, uri, minOccurs, maxOccurs, instructions)
 
+    def filter(self, ifc_file, elements):
+        index = None
+        if isinstance(self.propertySet, str) and isinstance(self.name, str):
+            index = ifcopenshell.util.index.get_index(ifc_file, (self.propertySet, self.name))
+        if not index or self.minOccurs == 0 or self.maxOccurs == 0:
+            return super().filter(ifc_file, elements)
+        # The index can cheaply rule out elements without a value or with a
+        # different string value. Anything else is checked in full, since
+        # measures and units need to be checked too.
+        column = index.get_column((self.propertySet, self.name))
+        is_excluded = ~column.present | (column.objects == "").astype(bool)
+        if isinstance(self.value, str) and column.kind == "string":
+            is_excluded |= (column.values != self.value).astype(bool)
+        rows, is_in_index = index.get_rows(elements)
+        is_excluded = (is_excluded & column.covered)[rows] & is_in_index
+        return [e for i, e in enumerate(elements) if not is_excluded[i] and self(e)]
+
     def __call__(self, inst, logger=None):
         if self.minOccurs == 0 and self.maxOccurs != 0:
             return PropertyResult(True)
@@ -17,7 +17,10 @@
 # along with IfcTester.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import pickle
 import datetime
+import ifcopenshell
+import concurrent.futures
 from xmlschema import XMLSchema
 from xmlschema import etree_tostring
 from xml.etree import ElementTree as ET
@@ -26,6 +29,7 @@ from .facet import Entity, Attribute, Classification, Property, PartOf, Material
 
 cwd = os.path.dirname(os.path.realpath(__file__))
 schema = None
+worker_file = None
 
 
 def open(filepath, validate=False):
@@ -112,10 +116,84 @@ class Ids:
         ET.ElementTree(get_schema().encode(self.asdict())).write(filepath, encoding="utf-8", xml_declaration=True)
         return get_schema().is_valid(filepath)
 
-    def validate(self, ifc_file, filter_version=False):
+    def validate(self, ifc_file, filter_version=False, workers=None, filepath=None):
+        """Validates an IFC against all specifications
+
+        :param ifc_file: The IFC file to validate
+        :type ifc_file: ifcopenshell.file.file
+        :param filter_version: Whether or not to skip specifications which do
+            not apply to the schema of the IFC file
+        :type filter_version: bool
+        :param workers: If more than one, requirements are checked in a pool
+            of this many processes. Results are identical to a serial run.
+        :type workers: int,optional
+        :param filepath: The path the IFC file was loaded from. If provided,
+            each worker process opens the file from disk. Otherwise, the file
+            is serialised and sent to each worker.
+        :type filepath: str,optional
+        """
+        if not workers or workers < 2:
+            for specification in self.specifications:
+                specification.reset_status()
+                specification.validate(ifc_file, filter_version=filter_version)
+            return
+
+        chunks = []
         for specification in self.specifications:
             specification.reset_status()
-            specification.validate(ifc_file, filter_version=filter_version)
+            if filter_version and ifc_file.schema not in specification.ifcVersion:
+                continue
+            specification.applicable_entities.extend(specification.get_applicable_entities(ifc_file))
+            element_ids = [e.id() for e in specification.applicable_entities]
+            # Facets are snapshotted now, as they collect entity instances
+            # (which cannot be sent to other processes) while merging.
+            requirements = pickle.dumps(specification.requirements)
+            chunk_size = max(1, -(-len(element_ids) // (workers * 4)))
+            for i in range(0, len(element_ids), chunk_size):
+                chunks.append((specification, requirements, element_ids[i : i + chunk_size]))
+
+        source = (filepath, None) if filepath else (None, ifc_file.to_string())
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=load_worker_file, initargs=source
+        ) as executor:
+            futures = [
+                executor.submit(validate_requirements, requirements, element_ids)
+                for specification, requirements, element_ids in chunks
+            ]
+            # Results are merged in submission order so that the failures are
+            # ordered exactly as they would be when validating serially.
+            for (specification, requirements, element_ids), future in zip(chunks, futures):
+                for element_id, facet_index, reason in future.result():
+                    element = ifc_file.by_id(element_id)
+                    facet = specification.requirements[facet_index]
+                    specification.failed_entities.add(element)
+                    facet.failed_entities.append(element)
+                    facet.failed_reasons.append(reason)
+
+        for specification in self.specifications:
+            if filter_version and ifc_file.schema not in specification.ifcVersion:
+                continue
+            specification.set_status()
+
+
+def load_worker_file(filepath=None, data=None):
+    global worker_file
+    if filepath:
+        worker_file = ifcopenshell.open(filepath)
+    else:
+        worker_file = ifcopenshell.file.from_string(data)
+
+
+def validate_requirements(requirements, element_ids):
+    requirements = pickle.loads(requirements)
+    failures = []
+    for element_id in element_ids:
+        element = worker_file.by_id(element_id)
+        for i, facet in enumerate(requirements):
+            result = facet(element)
+            if not bool(result):
+                failures.append((element_id, i, str(result)))
+    return failures
 
 
 class Specification:
@@ -194,12 +272,25 @@ class Specification:
         for facet in self.requirements:
             facet.status = None
             facet.failed_entities.clear()
+            facet.failed_reasons.clear()
         self.status = None
 
     def validate(self, ifc_file, filter_version=False):
         if filter_version and ifc_file.schema not in self.ifcVersion:
             return
 
+        for element in self.get_applicable_entities(ifc_file):
+            self.applicable_entities.append(element)
+            for facet in self.requirements:
+                result = facet(element)
+                if not bool(result):
+                    self.failed_entities.add(element)
+                    facet.failed_entities.append(element)
+                    facet.failed_reasons.append(str(result))
+
+        self.set_status()
+
+    def get_applicable_entities(self, ifc_file):
         elements = []
         
         for i, facet in enumerate(self.applicability):
@@ -211,6 +302,7 @@ class Specification:
                 elements = list(ifc_file)
             elements = facet.filter(ifc_file, elements)
 
+        results = []
         for element in elements:
             is_applicable = True
             for facet in self.applicability:
@@ -219,16 +311,11 @@ class Specification:
                 if not bool(facet(element)):
                     is_applicable = False
                     break
-            if not is_applicable:
-                continue
-            self.applicable_entities.append(element)
-            for facet in self.requirements:
-                result = facet(element)
-                if not bool(result):
-                    self.failed_entities.add(element)
-                    facet.failed_entities.append(element)
-                    facet.failed_reasons.append(str(result))
+            if is_applicable:
+                results.append(element)
+        return results
 
+    def set_status(self):
         for facet in self.requirements:
             if facet.minOccurs != 0:
                 facet.status = not bool(facet.failed_entities)
@@ -20,6 +20,7 @@
 import uuid
 import ifcopenshell
 import ifcopenshell.api
+import ifcopenshell.util.index
 from ifctester.facet import Entity, Attribute, Classification, Property, PartOf, Material, Restriction
 
 
@@ -662,6 +663,16 @@ class TestAttribute:
             expected=True,
         )
 
+    def test_filtering_using_a_column_index(self):
+        ifc = ifcopenshell.file()
+        wall = ifc.createIfcWall(Name="Foobar")
+        wall2 = ifc.createIfcWall(Name="Foobaz")
+        wall3 = ifc.createIfcWall()
+        slab = ifc.createIfcSlab(Name="Foobar")
+        ifcopenshell.util.index.ColumnIndex(ifc, ["IfcWall"], ["Name"])
+        assert Attribute(name="Name").filter(ifc, [wall, wall2, wall3, slab]) == [wall, wall2, slab]
+        assert Attribute(name="Name", value="Foobar").filter(ifc, [wall, wall2, wall3, slab]) == [wall, slab]
+
 
 class TestClassification:
     def test_creating_a_classification_facet(self):
@@ -1227,6 +1238,20 @@ class TestProperty:
         run("Properties can be overriden by an occurrence 1/2", facet=facet, inst=wall, expected=True)
         run("Properties can be overriden by an occurrence 2/2", facet=facet, inst=wall_type, expected=False)
 
+    def test_filtering_using_a_column_index(self):
+        ifc = self.setup_ifc()
+        wall = ifcopenshell.api.run("root.create_entity", ifc, ifc_class="IfcWall")
+        wall2 = ifcopenshell.api.run("root.create_entity", ifc, ifc_class="IfcWall")
+        wall3 = ifcopenshell.api.run("root.create_entity", ifc, ifc_class="IfcWall")
+        for element, value in ((wall, "Bar"), (wall2, "Baz")):
+            pset = ifcopenshell.api.run("pset.add_pset", ifc, product=element, name="Foo_Bar")
+            ifcopenshell.api.run("pset.edit_pset", ifc, pset=pset, properties={"Foo": value})
+        ifcopenshell.util.index.ColumnIndex(ifc, ["IfcWall"], ["Foo_Bar.Foo"])
+        facet = Property(propertySet="Foo_Bar", name="Foo", measure="IfcLabel")
+        assert facet.filter(ifc, [wall, wall2, wall3]) == [wall, wall2]
+        facet = Property(propertySet="Foo_Bar", name="Foo", value="Bar", measure="IfcLabel")
+        assert facet.filter(ifc, [wall, wall2, wall3]) == [wall]
+
     def setup_ifc(self):
         ifc = ifcopenshell.file()
         ifc.createIfcProject()
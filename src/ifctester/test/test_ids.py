@@ -215,6 +215,46 @@ class TestIds:
         assert spec.requirements[0].failed_entities == [wall]
         assert spec2.requirements[0].failed_entities == [wall]
 
+    def test_validating_twice(self):
+        specs = ids.Ids(title="Title")
+        spec = ids.Specification(name="Name")
+        spec.applicability.append(ids.Entity(name="IFCWALL"))
+        spec.requirements.append(ids.Attribute(name="Name", value="Waldo"))
+        specs.specifications.append(spec)
+
+        model = ifcopenshell.file()
+        wall = model.createIfcWall()
+        specs.validate(model)
+        failed_reasons = list(spec.requirements[0].failed_reasons)
+        specs.validate(model)
+
+        assert spec.requirements[0].failed_entities == [wall]
+        assert spec.requirements[0].failed_reasons == failed_reasons
+        assert len(failed_reasons) == 1
+
+    def test_validating_using_multiple_processes(self):
+        specs = ids.Ids(title="Title")
+        spec = ids.Specification(name="Name")
+        spec.applicability.append(ids.Entity(name="IFCWALL"))
+        spec.requirements.append(ids.Attribute(name="Name", value="Waldo"))
+        spec.requirements.append(ids.Attribute(name="Description"))
+        specs.specifications.append(spec)
+
+        model = ifcopenshell.file()
+        walls = [
+            model.createIfcWall(Name="Waldo" if i % 3 else None, Description="Foo" if i % 2 else None)
+            for i in range(20)
+        ]
+        specs.validate(model)
+        failed_entities = [list(f.failed_entities) for f in spec.requirements]
+        failed_reasons = [list(f.failed_reasons) for f in spec.requirements]
+
+        specs.validate(model, workers=2)
+        assert spec.status is False
+        assert spec.applicable_entities == walls
+        assert [f.failed_entities for f in spec.requirements] == failed_entities
+        assert [f.failed_reasons for f in spec.requirements] == failed_reasons
+
 
 class TestSpecification:
     def test_create_specification_with_minimal_information(self):
@@ -152,6 +152,20 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 		return keys;
 	}
 
+	std::vector<unsigned> by_type_ids(const std::string& t, bool include_subtypes) {
+		aggregate_of_instance::ptr insts = include_subtypes
+			? $self->instances_by_type(t)
+			: $self->instances_by_type_excl_subtypes(t);
+		std::vector<unsigned> ids;
+		if (insts) {
+			ids.reserve(insts->size());
+			for (aggregate_of_instance::it it = insts->begin(); it != insts->end(); ++it) {
+				ids.push_back((*it)->data().id());
+			}
+		}
+		return ids;
+	}
+
 	std::vector<std::string> types() const {
 		const size_t n = std::distance($self->types_begin(), $self->types_end());
 		std::vector<std::string> ts;